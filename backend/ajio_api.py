@@ -1,5 +1,6 @@
+from .dom import parse_html
+from .scheduler import RateLimited
 from .search_providers import _get_html, _headless_html, _norm_price, _jsonld_product
-from bs4 import BeautifulSoup
 import json
 import re
 
@@ -10,7 +11,8 @@ def fetch_ajio_product(url: str):
         if len(html) < 5000:
             html = _headless_html(url, wait_for="div.prod-content") or html
             
-        jld = _jsonld_product(html, "https://www.ajio.com", "Ajio")
+        soup = parse_html(html)
+        jld = _jsonld_product(soup, "https://www.ajio.com", "Ajio")
         if jld and jld.get("title") != "Unavailable":
             return {
                 "title": jld["title"],
@@ -19,13 +21,12 @@ def fetch_ajio_product(url: str):
                 "source": "Ajio Scraper"
             }
 
-        soup = BeautifulSoup(html, "html.parser")
-        
         # Try finding preloaded state
-        for script in soup.find_all("script"):
-            if script.string and "window.__PRELOADED_STATE__" in script.string:
+        for script in soup.select("script"):
+            text = script.get_text()
+            if "window.__PRELOADED_STATE__" in text:
                 try:
-                    json_text = script.string.split("window.__PRELOADED_STATE__ = ")[1].split(";")[0]
+                    json_text = text.split("window.__PRELOADED_STATE__ = ")[1].split(";")[0]
                     data = json.loads(json_text)
                     product = data.get("product", {}).get("productDetails", {})
                     return {
@@ -52,6 +53,8 @@ def fetch_ajio_product(url: str):
             "source": "Ajio Scraper"
         }
 
+    except RateLimited:
+        raise
     except Exception as e:
         return {
             "title": "Unavailable",
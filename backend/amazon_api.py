@@ -1,11 +1,14 @@
-import requests
-from bs4 import BeautifulSoup
-import json
 try:
     from curl_cffi import requests as curl_requests
 except Exception:
     curl_requests = None
-from urllib.parse import urlparse
+
+from .dom import parse_html
+from .latency import LATENCY
+from .redirects import resolve_short_link
+from .scheduler import RateLimited, host_key
+from .search_providers import fetch_timeout
+from .sessions import http_get, impersonated_get
 
 HEADERS = {
     "User-Agent": (
@@ -20,52 +23,46 @@ HEADERS = {
 }
 
 def _jsonld_pick(soup):
-    scripts = soup.find_all("script", {"type": "application/ld+json"})
-    for s in scripts:
-        if not s.string:
-            continue
-        try:
-            data = json.loads(s.string)
-            if isinstance(data, list):
-                for d in data:
-                    if isinstance(d, dict) and d.get("@type") == "Product":
-                        name = d.get("name")
-                        offers = d.get("offers") or {}
-                        price = offers.get("price") or offers.get("priceSpecification", {}).get("price")
-                        image = d.get("image")
-                        if isinstance(image, list):
-                            image = image[0] if image else ""
-                        return name, str(price) if price else None, image
-            if isinstance(data, dict) and data.get("@type") == "Product":
-                name = data.get("name")
-                offers = data.get("offers") or {}
-                price = offers.get("price") or offers.get("priceSpecification", {}).get("price")
-                image = data.get("image")
-                if isinstance(image, list):
-                    image = image[0] if image else ""
-                return name, str(price) if price else None, image
-        except:
-            continue
+    for data in soup.jsonld():
+        if isinstance(data, list):
+            for d in data:
+                if isinstance(d, dict) and d.get("@type") == "Product":
+                    name = d.get("name")
+                    offers = d.get("offers") or {}
+                    price = offers.get("price") or offers.get("priceSpecification", {}).get("price")
+                    image = d.get("image")
+                    if isinstance(image, list):
+                        image = image[0] if image else ""
+                    return name, str(price) if price else None, image
+        if isinstance(data, dict) and data.get("@type") == "Product":
+            name = data.get("name")
+            offers = data.get("offers") or {}
+            price = offers.get("price") or offers.get("priceSpecification", {}).get("price")
+            image = data.get("image")
+            if isinstance(image, list):
+                image = image[0] if image else ""
+            return name, str(price) if price else None, image
     return None, None, None
 def fetch_amazon_product(url: str):
     try:
-        parsed = urlparse(url)
-        if "amzn" in parsed.netloc:
-            try:
-                redir = requests.get(url, headers={**HEADERS, "Referer": "https://www.amazon.in/"}, allow_redirects=True, timeout=10)
-                url = redir.url or url
-            except:
-                pass
+        url = resolve_short_link(url)
         html = ""
+        host = host_key(url)
         if curl_requests:
-            r = curl_requests.get(url, impersonate="chrome", timeout=10)
+            r = LATENCY.timed(
+                f"fetch:{host}:impersonate", fetch_timeout(host, "impersonate"),
+                impersonated_get, url, impersonate="chrome",
+            )
             html = r.text
         else:
-            response = requests.get(url, headers={**HEADERS, "Referer": "https://www.amazon.in/"}, timeout=10)
+            response = LATENCY.timed(
+                f"fetch:{host}:requests", fetch_timeout(host, "requests"),
+                http_get, url, headers={**HEADERS, "Referer": "https://www.amazon.in/"},
+            )
             if response.status_code != 200:
                 return fallback("Blocked by Amazon")
             html = response.text
-        soup = BeautifulSoup(html, "html.parser")
+        soup = parse_html(html)
 
         # Title
         title_el = soup.select_one("#productTitle")
@@ -77,7 +74,7 @@ def fetch_amazon_product(url: str):
 
         # Image
         img_el = soup.select_one("#landingImage") or soup.select_one("#imgTagWrapperId img")
-        image = img_el["src"] if img_el and img_el.has_attr("src") else ""
+        image = img_el.get("src", "") if img_el else ""
         if not title or not price:
             jt, jp, ji = _jsonld_pick(soup)
             title = title or jt or "Unavailable"
@@ -93,6 +90,8 @@ def fetch_amazon_product(url: str):
             "source": "Amazon Scraper"
         }
 
+    except RateLimited:
+        raise
     except Exception as e:
         return fallback(str(e))
 
@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from collections import deque
+
+# ===================== CONFIG =====================
+
+# Outcomes older than WINDOW seconds stop counting.
+WINDOW = float(os.getenv("PRICEPILOT_BREAKER_WINDOW", "300"))
+# Below MIN_CALLS outcomes in the window the breaker never opens.
+MIN_CALLS = int(os.getenv("PRICEPILOT_BREAKER_MIN_CALLS", "5"))
+# Open when this share of recent calls failed...
+ERROR_RATE = float(os.getenv("PRICEPILOT_BREAKER_ERROR_RATE", "0.5"))
+# ...or this share took longer than SLOW_MS.
+SLOW_MS = float(os.getenv("PRICEPILOT_BREAKER_SLOW_MS", "8000"))
+SLOW_RATE = float(os.getenv("PRICEPILOT_BREAKER_SLOW_RATE", "0.8"))
+# Seconds an open breaker fails fast before letting one probe through.
+COOLDOWN = float(os.getenv("PRICEPILOT_BREAKER_COOLDOWN", "60"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Rolling-window circuit breaker for one provider.
+
+    closed: calls go through and their outcome and latency are recorded.
+    open: allow() is False until cooldown has passed since it opened.
+    half_open: exactly one probe call is allowed; success closes the breaker
+    with a clean window, failure re-opens it for another cooldown.
+    """
+
+    def __init__(self, name: str, window: float = WINDOW, min_calls: int = MIN_CALLS,
+                 error_rate: float = ERROR_RATE, slow_ms: float = SLOW_MS,
+                 slow_rate: float = SLOW_RATE, cooldown: float = COOLDOWN, clock=time.monotonic):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_ms = slow_ms
+        self.slow_rate = slow_rate
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._calls = deque()  # (ts, ok, elapsed_ms)
+        self._state = CLOSED
+        self._opened_at = None
+        self._probing = False
+        self._last_error = None
+        self._stats = {"opened": 0, "short_circuited": 0, "probes": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(self._clock())
+
+    def _current_state(self, now):
+        if self._state == OPEN and now - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go out now. In half_open this hands out the
+        single probe, so callers that get True must record() the outcome."""
+        with self._lock:
+            state = self._current_state(self._clock())
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                self._stats["probes"] += 1
+                return True
+            self._stats["short_circuited"] += 1
+            return False
+
+    def release(self):
+        """Hand back an allow() that never reached the provider, so a
+        half_open probe can be taken again; no outcome is recorded."""
+        with self._lock:
+            self._probing = False
+
+    def record(self, ok: bool, elapsed_ms: float, error: str = None):
+        with self._lock:
+            now = self._clock()
+            if not ok:
+                self._last_error = error
+            state = self._current_state(now)
+            if state == HALF_OPEN:
+                self._probing = False
+                if ok and elapsed_ms < self.slow_ms:
+                    self._state = CLOSED
+                    self._calls.clear()
+                else:
+                    self._open(now)
+                return
+            if state == OPEN:
+                return  # a straggler from before the breaker opened
+            self._calls.append((now, ok, elapsed_ms))
+            self._trim(now)
+            failures, slow, total = self._counts()
+            if total >= self.min_calls and (
+                failures / total >= self.error_rate or slow / total >= self.slow_rate
+            ):
+                self._open(now)
+
+    def _open(self, now):
+        self._state = OPEN
+        self._opened_at = now
+        self._stats["opened"] += 1
+
+    def _trim(self, now):
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._calls.popleft()
+
+    def _counts(self):
+        failures = sum(1 for _, ok, _ in self._calls if not ok)
+        slow = sum(1 for _, _, ms in self._calls if ms >= self.slow_ms)
+        return failures, slow, len(self._calls)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            now = self._clock()
+            state = self._current_state(now)
+            self._trim(now)
+            failures, slow, total = self._counts()
+            latencies = sorted(ms for _, _, ms in self._calls)
+            data = {
+                "source": self.name,
+                "state": state,
+                "calls": total,
+                "error_rate": round(failures / total, 3) if total else 0.0,
+                "slow_rate": round(slow / total, 3) if total else 0.0,
+                "median_ms": round(latencies[len(latencies) // 2], 1) if latencies else None,
+                "last_error": self._last_error,
+                "retry_in_s": round(max(self.cooldown - (now - self._opened_at), 0), 1) if state == OPEN else None,
+            }
+            data.update(self._stats)
+        return data
@@ -0,0 +1,225 @@
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError
+
+from .scheduler import HOST_LIMITER, RateLimited
+
+try:
+    from playwright.sync_api import sync_playwright
+except Exception:
+    sync_playwright = None
+
+UA = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/124.0.0.0 Safari/537.36"
+)
+LAUNCH_ARGS = ["--no-sandbox", "--disable-blink-features=AutomationControlled"]
+
+# ===================== CONFIG =====================
+
+# Browsers kept alive; also the number of headless fetches that can run at once.
+POOL_SIZE = int(os.getenv("PRICEPILOT_BROWSER_POOL_SIZE", "2"))
+# A browser is relaunched after this many pages so leaked memory is returned.
+RECYCLE_AFTER = int(os.getenv("PRICEPILOT_BROWSER_RECYCLE_PAGES", "50"))
+# Request types aborted before they hit the network; the HTML is all we read.
+BLOCKED_RESOURCES = frozenset(
+    t.strip() for t in os.getenv("PRICEPILOT_BROWSER_BLOCK", "image,font,media").split(",") if t.strip()
+)
+# How long a fetch may wait for a free browser before giving up.
+QUEUE_TIMEOUT = float(os.getenv("PRICEPILOT_BROWSER_QUEUE_TIMEOUT", "10"))
+
+_STOP = object()
+
+
+class _Job:
+    __slots__ = ("url", "wait_for", "timeout_ms", "future")
+
+    def __init__(self, url, wait_for, timeout_ms):
+        self.url = url
+        self.wait_for = wait_for
+        self.timeout_ms = timeout_ms
+        self.future = Future()
+
+
+class BrowserPool:
+    """Long-lived headless Chromium instances for rendering JS-only pages.
+
+    Playwright's sync API is bound to the thread that started it, so each
+    browser lives in its own worker thread and fetch() hands jobs over a
+    queue. Every job gets a fresh context (no shared cookies) that is closed
+    afterwards. Browsers are relaunched after RECYCLE_AFTER pages, and after
+    a crash or a context that fails to close. Workers start on first use.
+    """
+
+    def __init__(self, size: int = POOL_SIZE, recycle_after: int = RECYCLE_AFTER,
+                 blocked_resources=BLOCKED_RESOURCES, playwright_factory=None):
+        self.size = size
+        self.recycle_after = recycle_after
+        self.blocked_resources = frozenset(blocked_resources)
+        self._factory = playwright_factory or sync_playwright
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stats = {
+            "fetches": 0,
+            "failures": 0,
+            "queue_timeouts": 0,
+            "launches": 0,
+            "recycles": 0,
+            "crashes": 0,
+            "blocked_requests": 0,
+            "busy": 0,
+        }
+
+    @property
+    def available(self) -> bool:
+        return self._factory is not None
+
+    def start(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(len(self._threads), self.size):
+                t = threading.Thread(target=self._run, name=f"browser-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def stop(self, timeout: float = 10.0):
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(_STOP)
+        for t in threads:
+            t.join(timeout)
+
+    def fetch(self, url: str, wait_for: str = "", timeout_ms: int = 15000,
+              queue_timeout: float = QUEUE_TIMEOUT):
+        """Rendered HTML of url, or None if it could not be fetched."""
+        if not self.available:
+            return None
+        try:
+            HOST_LIMITER.acquire(url)
+        except RateLimited:
+            return None
+        if len(self._threads) < self.size:
+            self.start()
+        job = _Job(url, wait_for, timeout_ms)
+        self._queue.put(job)
+        # Navigation plus the wait_for window, on top of time spent queued.
+        budget = queue_timeout + timeout_ms / 1000 + 8
+        try:
+            return job.future.result(timeout=budget)
+        except TimeoutError:
+            if job.future.cancel():
+                self._count("queue_timeouts")
+            return None
+        except Exception:
+            return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            data = dict(self._stats)
+            data["browsers"] = sum(1 for t in self._threads if t.is_alive())
+        data["size"] = self.size
+        data["queue_depth"] = self._queue.qsize()
+        return data
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def _run(self):
+        playwright = browser = None
+        pages = 0
+        try:
+            while True:
+                job = self._queue.get()
+                if job is _STOP:
+                    break
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+                self._count("busy")
+                try:
+                    if playwright is None:
+                        playwright = self._factory().start()
+                    if browser is not None and (pages >= self.recycle_after or not browser.is_connected()):
+                        if pages >= self.recycle_after:
+                            self._count("recycles")
+                        browser = self._close(browser)
+                    if browser is None:
+                        browser = playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
+                        self._count("launches")
+                        pages = 0
+                    pages += 1
+                    html, healthy = self._render(browser, job)
+                    self._count("fetches")
+                    if html is None:
+                        self._count("failures")
+                    if not healthy:
+                        self._count("crashes")
+                        browser = self._close(browser)
+                    job.future.set_result(html)
+                except Exception as e:
+                    logging.warning(f"browser_pool worker error url={job.url} error={e}")
+                    self._count("failures")
+                    self._count("crashes")
+                    browser = self._close(browser)
+                    if not job.future.done():
+                        job.future.set_result(None)
+                finally:
+                    self._count("busy", -1)
+        finally:
+            self._close(browser)
+            if playwright is not None:
+                try:
+                    playwright.stop()
+                except Exception:
+                    pass
+
+    def _render(self, browser, job):
+        """(html or None, browser still healthy)."""
+        context = browser.new_context(user_agent=UA, viewport={"width": 1366, "height": 768}, locale="en-IN")
+        html = None
+        try:
+            if self.blocked_resources:
+                context.route("**/*", self._route)
+            page = context.new_page()
+            page.goto(job.url, wait_until="domcontentloaded", timeout=job.timeout_ms)
+            if job.wait_for:
+                try:
+                    page.wait_for_selector(job.wait_for, timeout=8000)
+                except Exception:
+                    pass
+            else:
+                page.wait_for_timeout(2000)
+            html = page.content()
+        except Exception as e:
+            logging.info(f"browser_pool fetch failed url={job.url} error={e}")
+        try:
+            context.close()
+        except Exception:
+            return html, False
+        if html is not None and len(html) <= 500:
+            html = None
+        return html, browser.is_connected()
+
+    def _route(self, route):
+        if route.request.resource_type in self.blocked_resources:
+            self._count("blocked_requests")
+            route.abort()
+        else:
+            route.continue_()
+
+    @staticmethod
+    def _close(browser):
+        if browser is not None:
+            try:
+                browser.close()
+            except Exception:
+                pass
+        return None
+
+
+BROWSER_POOL = BrowserPool()
@@ -0,0 +1,548 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, NamedTuple, Optional
+from urllib.parse import urlparse
+
+from .database import open_connection
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    stored_at: float
+    expires_at: float
+    size: int
+
+
+def _approx_size(value) -> int:
+    """Serialized size in bytes; close enough to budget JSON-like results."""
+    try:
+        return len(json.dumps(value, default=str, separators=(",", ":")))
+    except (TypeError, ValueError):
+        return len(repr(value))
+
+
+class CacheBackend:
+    """Common interface for the search caches.
+
+    Subclasses implement _load/_store/_delete/_clear; hit/miss accounting,
+    the periodic sweeper and stats() live here.
+
+    Coroutines must use aget/aget_entry/aset: for backends that do disk or
+    network I/O (BLOCKING) those run in a worker thread, so a slow cache
+    never stalls the event loop.
+    """
+
+    BLOCKING = True
+
+    def __init__(self, ttl: float = 3600, sweep_interval: float = 60):
+        self.ttl = ttl
+        # Wall clock for stored_at/expires_at; tests swap in a fake one.
+        self.clock = time.time
+        self.sweep_interval = sweep_interval
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "sets": 0, "evictions": 0, "expirations": 0, "errors": 0}
+        self._sweeper = None
+        self._stop = threading.Event()
+
+    def get(self, key, default=None):
+        entry = self.get_entry(key)
+        return entry.value if entry is not None else default
+
+    def get_entry(self, key) -> Optional[CacheEntry]:
+        try:
+            entry = self._load(key, self.clock())
+        except Exception as e:
+            self._count("errors")
+            logging.warning(f"cache_error op=get backend={type(self).__name__} error={e}")
+            entry = None
+        self._count("hits" if entry is not None else "misses")
+        return entry
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        now = self.clock()
+        entry = CacheEntry(value, now, now + (self.ttl if ttl is None else ttl), _approx_size(value))
+        try:
+            self._store(key, entry)
+        except Exception as e:
+            self._count("errors")
+            logging.warning(f"cache_error op=set backend={type(self).__name__} error={e}")
+            return
+        self._count("sets")
+
+    async def aget(self, key, default=None):
+        entry = await self.aget_entry(key)
+        return entry.value if entry is not None else default
+
+    async def aget_entry(self, key) -> Optional[CacheEntry]:
+        if not self.BLOCKING:
+            return self.get_entry(key)
+        return await asyncio.to_thread(self.get_entry, key)
+
+    async def aset(self, key, value, ttl: Optional[float] = None):
+        if not self.BLOCKING:
+            return self.set(key, value, ttl)
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+    def delete(self, key):
+        self._delete(key)
+
+    def clear(self):
+        self._clear()
+
+    def __contains__(self, key):
+        return self.get_entry(key) is not None
+
+    def sweep(self) -> int:
+        """Drop expired entries; returns how many were removed."""
+        return 0
+
+    def start_sweeper(self):
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="cache-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            data = dict(self._stats)
+        lookups = data["hits"] + data["misses"]
+        data["hit_ratio"] = round(data["hits"] / lookups, 4) if lookups else 0.0
+        data["backend"] = type(self).__name__
+        return data
+
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            self._stats[name] += n
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                logging.warning(f"cache_sweep_failed backend={type(self).__name__} error={e}")
+
+    def _load(self, key, now) -> Optional[CacheEntry]:
+        raise NotImplementedError
+
+    def _store(self, key, entry: CacheEntry):
+        raise NotImplementedError
+
+    def _delete(self, key):
+        raise NotImplementedError
+
+    def _clear(self):
+        raise NotImplementedError
+
+
+class TTLCache(CacheBackend):
+    """In-process LRU cache with per-entry TTL and an entry/byte budget.
+
+    Expired entries are dropped on read and by the sweeper, and the least
+    recently used entries are evicted once either budget is exceeded.
+    """
+
+    BLOCKING = False
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: float = 3600, sweep_interval: float = 60):
+        super().__init__(ttl=ttl, sweep_interval=sweep_interval)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def sweep(self) -> int:
+        now = self.clock()
+        with self._lock:
+            expired = [k for k, e in self._data.items() if e.expires_at <= now]
+            for key in expired:
+                self._remove(key)
+        self._count("expirations", len(expired))
+        return len(expired)
+
+    def stats(self) -> dict:
+        data = super().stats()
+        with self._lock:
+            data["entries"] = len(self._data)
+            data["bytes"] = self._bytes
+        data["max_entries"] = self.max_entries
+        data["max_bytes"] = self.max_bytes
+        return data
+
+    def _load(self, key, now):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= now:
+                self._remove(key)
+                self._count("expirations")
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def _store(self, key, entry):
+        if entry.size > self.max_bytes:
+            return
+        evicted = 0
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = entry
+            self._bytes += entry.size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._data)))
+                evicted += 1
+        if evicted:
+            self._count("evictions", evicted)
+
+    def _delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def _clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        entry = self._data.pop(key)
+        self._bytes -= entry.size
+
+
+class SQLiteCache(CacheBackend):
+    """Cache stored in a SQLite file, shared by every worker on the host and
+    kept across restarts. Values are stored as JSON; each write replaces the
+    row atomically.
+
+    Like TTLCache it keeps an entry and byte budget per namespace: a write
+    that takes the namespace over budget first drops expired rows, then the
+    least recently used ones. Reads refresh a row's access time at most once
+    per ACCESS_RESOLUTION seconds so hot keys don't turn every read into a
+    write. The file is opened on first use; path=None resolves cache_db_path().
+    """
+
+    ACCESS_RESOLUTION = 60
+
+    def __init__(self, path: Optional[str] = None, namespace: str = "default", max_entries: int = 100000,
+                 max_bytes: int = 64 * 1024 * 1024, ttl: float = 3600, sweep_interval: float = 60):
+        super().__init__(ttl=ttl, sweep_interval=sweep_interval)
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._ready = False
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self._init_lock:
+                if self.path is None:
+                    self.path = cache_db_path()
+                conn = self._local.conn = open_connection(self.path)
+                if not self._ready:
+                    self._create_table(conn)
+                    self._ready = True
+        return conn
+
+    @staticmethod
+    def _create_table(conn):
+        with conn:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(cache_entries)")]
+            if columns and "accessed_at" not in columns:
+                # Pre-LRU layout; cached data is disposable.
+                conn.execute("DROP TABLE cache_entries")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT,
+                    key TEXT,
+                    value TEXT,
+                    stored_at REAL,
+                    expires_at REAL,
+                    accessed_at REAL,
+                    size INTEGER,
+                    PRIMARY KEY (namespace, key)
+                ) WITHOUT ROWID
+            """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_entries_expiry ON cache_entries (expires_at)"
+            )
+            # Covers the budget totals and the LRU scan without reading values.
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_entries_lru ON cache_entries (namespace, accessed_at, size)"
+            )
+
+    def sweep(self) -> int:
+        with self._conn() as conn:
+            removed = self._expire(conn, self.clock())
+            evicted = self._evict(conn)
+        self._count("expirations", removed)
+        self._count("evictions", evicted)
+        return removed
+
+    def _expire(self, conn, now) -> int:
+        return conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?",
+            (self.namespace, now),
+        ).rowcount
+
+    def _usage(self, conn):
+        return conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+            (self.namespace,),
+        ).fetchone()
+
+    def _over_budget(self, entries, size) -> bool:
+        return entries > self.max_entries or size > self.max_bytes
+
+    def _evict(self, conn) -> int:
+        """Drop least recently used rows until the namespace is within budget."""
+        entries, size = self._usage(conn)
+        if not self._over_budget(entries, size):
+            return 0
+        victims = []
+        rows = conn.execute(
+            "SELECT key, size FROM cache_entries WHERE namespace = ? ORDER BY accessed_at",
+            (self.namespace,),
+        )
+        for key, row_size in rows:
+            if not self._over_budget(entries, size):
+                break
+            victims.append((self.namespace, key))
+            entries -= 1
+            size -= row_size
+        conn.executemany("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", victims)
+        return len(victims)
+
+    def stats(self) -> dict:
+        data = super().stats()
+        try:
+            data["entries"], data["bytes"] = self._usage(self._conn())
+        except sqlite3.Error:
+            pass
+        data["max_entries"] = self.max_entries
+        data["max_bytes"] = self.max_bytes
+        data["path"] = self.path
+        return data
+
+    def _load(self, key, now):
+        conn = self._conn()
+        row = conn.execute(
+            """
+            SELECT value, stored_at, expires_at, accessed_at FROM cache_entries
+            WHERE namespace = ? AND key = ? AND expires_at > ?
+        """,
+            (self.namespace, key, now),
+        ).fetchone()
+        if row is None:
+            return None
+        value, stored_at, expires_at, accessed_at = row
+        if now - accessed_at >= self.ACCESS_RESOLUTION:
+            with conn:
+                conn.execute(
+                    "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, self.namespace, key),
+                )
+        return CacheEntry(json.loads(value), stored_at, expires_at, len(value))
+
+    def _store(self, key, entry):
+        value = json.dumps(entry.value, default=str)
+        if len(value) > self.max_bytes:
+            return
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, value, entry.stored_at, entry.expires_at,
+                 entry.stored_at, len(value)),
+            )
+            removed = evicted = 0
+            if self._over_budget(*self._usage(conn)):
+                removed = self._expire(conn, entry.stored_at)
+                evicted = self._evict(conn)
+        self._count("expirations", removed)
+        self._count("evictions", evicted)
+
+    def _delete(self, key):
+        with self._conn() as conn:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            )
+
+    def _clear(self):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+
+
+class RedisError(Exception):
+    pass
+
+
+class _RespConnection:
+    """Just enough of the Redis wire protocol (RESP2) for the cache."""
+
+    def __init__(self, host, port, db=0, password=None, timeout=2.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.file = self.sock.makefile("rb")
+        if password:
+            self.command("AUTH", password)
+        if db:
+            self.command("SELECT", db)
+
+    def command(self, *args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self.sock.sendall(b"".join(parts))
+        return self._read()
+
+    def _read(self):
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            n = int(rest)
+            if n < 0:
+                return None
+            data = self.file.read(n + 2)
+            return data[:-2]
+        if kind == b"*":
+            n = int(rest)
+            return None if n < 0 else [self._read() for _ in range(n)]
+        raise RedisError(f"unexpected reply: {line!r}")
+
+    def close(self):
+        try:
+            self.file.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RedisCache(CacheBackend):
+    """Cache on a Redis-protocol server (Redis, Valkey, KeyDB, ...).
+
+    Entries are JSON envelopes written with SET ... PX, so expiry is handled
+    by the server and replacement is atomic. Connection failures degrade to
+    cache misses."""
+
+    def __init__(self, url: str = "redis://localhost:6379/0", namespace: str = "default",
+                 ttl: float = 3600, timeout: float = 2.0):
+        super().__init__(ttl=ttl)
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.db = int((parsed.path or "/0").lstrip("/") or 0)
+        self.password = parsed.password
+        self.timeout = timeout
+        self.prefix = f"pricepilot:{namespace}:"
+        self._local = threading.local()
+
+    def _command(self, *args):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _RespConnection(
+                self.host, self.port, self.db, self.password, self.timeout
+            )
+        try:
+            return conn.command(*args)
+        except (OSError, ConnectionError):
+            conn.close()
+            self._local.conn = None
+            raise
+
+    def start_sweeper(self):
+        # The server expires keys itself.
+        pass
+
+    def _load(self, key, now):
+        raw = self._command("GET", self.prefix + key)
+        if raw is None:
+            return None
+        env = json.loads(raw)
+        if env["e"] <= now:
+            return None
+        return CacheEntry(env["v"], env["s"], env["e"], len(raw))
+
+    def _store(self, key, entry):
+        ttl_ms = int((entry.expires_at - entry.stored_at) * 1000)
+        if ttl_ms <= 0:
+            return
+        payload = json.dumps({"v": entry.value, "s": entry.stored_at, "e": entry.expires_at}, default=str)
+        self._command("SET", self.prefix + key, payload, "PX", ttl_ms)
+
+    def _delete(self, key):
+        self._command("DEL", self.prefix + key)
+
+    def _clear(self):
+        cursor = "0"
+        while True:
+            cursor, keys = self._command("SCAN", cursor, "MATCH", self.prefix + "*", "COUNT", 500)
+            cursor = cursor.decode() if isinstance(cursor, bytes) else str(cursor)
+            if keys:
+                self._command("DEL", *keys)
+            if cursor == "0":
+                break
+
+
+CACHE_BACKEND = os.getenv("PRICEPILOT_CACHE_BACKEND", "sqlite").lower()
+# A relative PRICEPILOT_CACHE_DB lives under PRICEPILOT_DATA_DIR (default
+# ~/.cache/pricepilot), never in whatever directory the server started in.
+DATA_DIR = os.getenv("PRICEPILOT_DATA_DIR") or os.path.join(
+    os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "pricepilot"
+)
+CACHE_DB = os.getenv("PRICEPILOT_CACHE_DB", "search_cache.db")
+REDIS_URL = os.getenv("PRICEPILOT_REDIS_URL", "redis://localhost:6379/0")
+
+
+def cache_db_path() -> str:
+    if os.path.isabs(CACHE_DB) or CACHE_DB == ":memory:":
+        return CACHE_DB
+    os.makedirs(DATA_DIR, exist_ok=True)
+    return os.path.join(DATA_DIR, CACHE_DB)
+
+
+def make_cache(namespace: str, ttl: float, max_entries: int = 2000,
+               max_bytes: int = 64 * 1024 * 1024, sweep_interval: float = 300,
+               backend: Optional[str] = None) -> CacheBackend:
+    """Build the configured cache backend (PRICEPILOT_CACHE_BACKEND):
+    "sqlite" (default, shared on-disk file), "redis" or "memory"."""
+    backend = (backend or CACHE_BACKEND).lower()
+    if backend == "redis":
+        return RedisCache(REDIS_URL, namespace=namespace, ttl=ttl)
+    if backend == "sqlite":
+        return SQLiteCache(namespace=namespace, max_entries=max_entries, max_bytes=max_bytes,
+                           ttl=ttl, sweep_interval=sweep_interval)
+    return TTLCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl,
+                    sweep_interval=sweep_interval)
@@ -0,0 +1,196 @@
+import re
+import unicodedata
+from typing import List
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+# ===================== SEARCH QUERIES =====================
+
+# Spellings of a unit -> canonical suffix. Matched only right after a number.
+UNIT_ALIASES = {
+    "gb": "gb", "gig": "gb", "gigs": "gb", "gigabyte": "gb", "gigabytes": "gb",
+    "tb": "tb", "terabyte": "tb", "terabytes": "tb",
+    "mb": "mb", "megabyte": "mb", "megabytes": "mb",
+    "mah": "mah",
+    "w": "w", "watt": "w", "watts": "w",
+    "hz": "hz", "mp": "mp", "k": "k",
+    "inch": "inch", "inches": "inch", '"': "inch", "''": "inch",
+    "cm": "cm", "mm": "mm",
+    "kg": "kg", "kgs": "kg", "g": "g", "gm": "g", "gms": "g", "grams": "g",
+    "l": "l", "ltr": "l", "litre": "l", "litres": "l", "liter": "l", "liters": "l",
+    "ml": "ml",
+}
+
+# Only filler that never changes which product is meant. Words like "new",
+# "best", "latest" or "india" are parts of brand and model names (New
+# Balance, India Gate), so they stay in the key.
+STOPWORDS = {
+    "a", "an", "the", "for", "with", "of",
+    "buy", "online", "price", "prices",
+}
+
+_UNITS_RE = "|".join(
+    sorted((re.escape(u) for u in UNIT_ALIASES), key=len, reverse=True)
+)
+_NUMBER_UNIT = re.compile(r"(\d+(?:\.\d+)?)\s*(" + _UNITS_RE + r")(?![a-z0-9])")
+# Covers both 10,000 and Indian-style 1,29,999 grouping.
+_THOUSANDS = re.compile(r"(?<=\d),(?=\d)")
+_TOKEN = re.compile(r"\d+(?:\.\d+)?[a-z0-9]*|[a-z0-9]+")
+
+
+def query_terms(query: str, spell_plus: bool = True) -> List[str]:
+    """Canonical tokens of a search query, in their original order.
+
+    Lowercases and NFKC-folds the text, joins numbers to their units with a
+    single spelling ("128 GB", "128gb", "128 gigs" -> "128gb"; 55" -> 55inch),
+    drops digit-group separators and leading zeros, spells "+" as "plus"
+    (with spell_plus=False it only separates tokens, as in the catalog's
+    FTS index) and removes shopping stopwords (unless nothing else is left).
+    """
+    text = unicodedata.normalize("NFKC", str(query or "")).lower()
+    text = text.replace("”", '"').replace("″", '"')
+    text = _THOUSANDS.sub("", text)
+    text = text.replace("+", " plus " if spell_plus else " ")
+    text = _NUMBER_UNIT.sub(lambda m: f" {_number(m.group(1))}{UNIT_ALIASES[m.group(2)]} ", text)
+    tokens = []
+    for tok in _TOKEN.findall(text):
+        if tok[0].isdigit() and re.fullmatch(r"[0-9.]+", tok):
+            tok = _number(tok)
+        tokens.append(tok)
+    kept = [t for t in tokens if t not in STOPWORDS]
+    return kept or tokens
+
+
+def canonical_query(query: str) -> str:
+    """Order-insensitive cache/single-flight key for a search query."""
+    return " ".join(sorted(set(query_terms(query))))
+
+
+def split_number_unit(term: str):
+    """'128gb' -> ('128', 'gb'); None for terms that are not number+unit."""
+    m = re.fullmatch(r"(\d+(?:\.\d+)?)([a-z]+)", term)
+    if m and m.group(2) in UNIT_ALIASES.values():
+        return m.group(1), m.group(2)
+    return None
+
+
+def _number(text: str) -> str:
+    if "." in text:
+        whole, frac = text.split(".", 1)
+        frac = frac.rstrip("0")
+        whole = whole.lstrip("0") or "0"
+        return f"{whole}.{frac}" if frac else whole
+    return text.lstrip("0") or "0"
+
+
+# ===================== PRODUCT URLS =====================
+
+# Query parameters that only track the click on any site. Anything else may
+# be what selects the product on an unknown shop, so it is kept.
+TRACKING_PARAMS = {
+    "gclid", "gbraid", "wbraid", "dclid", "fbclid", "msclkid", "yclid", "srsltid",
+    "igshid", "mc_cid", "mc_eid", "_gl",
+}
+TRACKING_PREFIXES = ("utm_", "_ga")
+
+# Tracking parameters specific to a retailer, keyed by registrable domain
+# suffix; these names (tag, store, sr, fm, ...) can mean something elsewhere.
+RETAILER_TRACKING = {
+    "amazon": (
+        {
+            "ref", "ref_", "tag", "linkcode", "linkid", "camp", "creative", "creativeasin",
+            "ascsubtag", "_encoding", "psc", "th", "smid", "qid", "sr", "keywords", "crid",
+            "sprefix", "dib", "dib_tag", "content-id",
+        },
+        ("pf_rd_", "pd_rd_"),
+    ),
+    "flipkart.com": (
+        {
+            "lid", "marketplace", "store", "srno", "otracker", "otracker1", "fm", "iid",
+            "ssid", "qh", "ppt", "ppn", "affid", "affextparam1", "affextparam2", "cmpid",
+        },
+        (),
+    ),
+    "snapdeal.com": ({"ref", "cmpid", "spm"}, ()),
+    "myntra.com": ({"ref", "cmpid", "spm"}, ()),
+    "ajio.com": ({"ref", "cmpid", "spm"}, ()),
+    "croma.com": ({"ref", "cmpid", "spm"}, ()),
+}
+
+SHORT_LINK_HOSTS = {"amzn.to", "amzn.in", "amzn.eu", "a.co", "fkrt.it", "fkrt.cc", "myntr.it"}
+
+_AMAZON_ASIN = re.compile(
+    r"/(?:dp|gp/product|gp/aw/d|gp/offer-listing|exec/obidos/asin|o/asin)/([A-Z0-9]{10})(?:[/?]|$)",
+    re.IGNORECASE,
+)
+
+
+def is_short_link(url: str) -> bool:
+    """True for retailer link shorteners (amzn.to, fkrt.it, ...)."""
+    host = (urlparse(url).hostname or "").lower()
+    return host.removeprefix("www.") in SHORT_LINK_HOSTS
+
+
+def canonical_url(url: str) -> str:
+    """One URL per product for history, cache and dedup keys.
+
+    Amazon links reduce to /dp/<ASIN>, Flipkart to the product path plus
+    pid, Myntra to the style id and Ajio to /p/<code>. Anything else keeps
+    its path with tracking parameters and the fragment removed. Short links
+    and non-http strings are returned unchanged; resolve short links first
+    with redirects.resolve_short_link().
+    """
+    raw = (url or "").strip()
+    if not raw.lower().startswith(("http://", "https://")):
+        return raw
+    parsed = urlparse(raw)
+    host = (parsed.hostname or "").lower()
+    if not host or host.removeprefix("www.") in SHORT_LINK_HOSTS:
+        return raw
+    path = re.sub(r"/{2,}", "/", parsed.path or "/")
+    params = parse_qsl(parsed.query, keep_blank_values=False)
+
+    if ".amazon." in "." + host:
+        m = _AMAZON_ASIN.search(path + "/")
+        if m:
+            domain = host.split("amazon.", 1)[1]
+            return f"https://www.amazon.{domain}/dp/{m.group(1).upper()}"
+    elif host.endswith("flipkart.com"):
+        if path.startswith("/dl/"):
+            path = path[3:]
+        pid = dict((k.lower(), v) for k, v in params).get("pid")
+        if "/p/" in path:
+            base = f"https://www.flipkart.com{path.rstrip('/')}"
+            return f"{base}?pid={pid}" if pid else base
+    elif host.endswith("myntra.com"):
+        m = re.search(r"/(\d{5,})(?:/buy)?/?$", path)
+        if m:
+            return f"https://www.myntra.com/{m.group(1)}"
+    elif host.endswith("ajio.com"):
+        m = re.search(r"/p/([A-Za-z0-9_]+)", path)
+        if m:
+            return f"https://www.ajio.com/p/{m.group(1)}"
+
+    names, prefixes = _tracking_rules(host)
+    kept = sorted((k, v) for k, v in params if k.lower() not in names and not k.lower().startswith(prefixes))
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = f"?{urlencode(kept)}" if kept else ""
+    scheme = parsed.scheme.lower()
+    # A non-default port is a different server, so it stays; credentials do not.
+    netloc = parsed.netloc.rsplit("@", 1)[-1].lower()
+    netloc = netloc.removesuffix({"http": ":80", "https": ":443"}[scheme])
+    return f"{scheme}://{netloc}{path}{query}"
+
+
+def _tracking_rules(host: str):
+    names, prefixes = TRACKING_PARAMS, TRACKING_PREFIXES
+    for site, (extra_names, extra_prefixes) in RETAILER_TRACKING.items():
+        if _on_site(host, site):
+            names, prefixes = names | extra_names, prefixes + extra_prefixes
+    return names, prefixes
+
+
+def _on_site(host: str, site: str) -> bool:
+    if site == "amazon":  # every amazon.<tld> storefront
+        return ".amazon." in "." + host
+    return host == site or host.endswith("." + site)
@@ -1,11 +1,162 @@
+import logging
+import os
+import re
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
+from itertools import islice
 
-DB_NAME = "price_history.db"
+from .canonical import canonical_url, query_terms, split_number_unit
+from .processing import DataProcessor
 
+DB_NAME = os.getenv("PRICEPILOT_DB", "price_history.db")
 
-def init_db():
-    conn = sqlite3.connect(DB_NAME)
+# One long-lived connection per thread instead of connect/close per call.
+# Set PRICEPILOT_DB_POOL=false to fall back to a fresh connection per call.
+DB_POOL = os.getenv("PRICEPILOT_DB_POOL", "true").lower() != "false"
+STATEMENT_CACHE_SIZE = 256
+PRAGMAS = [
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("temp_store", "MEMORY"),
+    ("cache_size", -16000),
+    ("mmap_size", 64 * 1024 * 1024),
+    ("busy_timeout", 5000),
+]
+
+_local = threading.local()
+_pool_lock = threading.Lock()
+_pool = set()
+_pool_generation = 0
+
+
+def open_connection(path):
+    # check_same_thread is off so close_connections() can close connections
+    # owned by worker threads; each connection is still used by one thread.
+    conn = sqlite3.connect(
+        path,
+        timeout=5.0,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=False,
+    )
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+def get_connection():
+    """Return this thread's pooled connection, opening it on first use."""
+    conn = getattr(_local, "conn", None)
+    if (
+        conn is not None
+        and _local.path == DB_NAME
+        and _local.generation == _pool_generation
+    ):
+        return conn
+    if conn is not None:
+        with _pool_lock:
+            _pool.discard(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    conn = open_connection(DB_NAME)
+    with _pool_lock:
+        _pool.add(conn)
+        _local.generation = _pool_generation
+    _local.conn = conn
+    _local.path = DB_NAME
+    return conn
+
+
+def close_connections():
+    """Close every pooled connection, e.g. on shutdown or after DB_NAME changes."""
+    global _pool_generation
+    with _pool_lock:
+        conns = list(_pool)
+        _pool.clear()
+        _pool_generation += 1
+    for conn in conns:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+def pool_stats():
+    with _pool_lock:
+        return {"pooled": DB_POOL, "open_connections": len(_pool), "db": DB_NAME}
+
+
+@contextmanager
+def connection():
+    """Yield a connection for reads; pooled unless DB_POOL is disabled."""
+    if not DB_POOL:
+        conn = open_connection(DB_NAME)
+        try:
+            yield conn
+        finally:
+            conn.close()
+        return
+    yield get_connection()
+
+
+@contextmanager
+def transaction():
+    """Yield a connection and commit on success, roll back on error."""
+    with connection() as conn:
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+
+# Upgrading an existing database rewrites whole tables, which would block
+# the first worker on a large file and race between workers. Startup only
+# migrates a brand-new (empty) database unless PRICEPILOT_AUTO_MIGRATE=true;
+# otherwise run `python -m backend.manage migrate` before deploying. The app
+# refuses to start on an older schema: its read and write paths need the
+# current tables and columns.
+AUTO_MIGRATE = os.getenv("PRICEPILOT_AUTO_MIGRATE", "false").lower() == "true"
+
+
+class SchemaOutdated(RuntimeError):
+    pass
+
+
+def init_db(run_migrations=None):
+    """Create missing tables and bring or check the schema version.
+
+    run_migrations=None (app startup) migrates when AUTO_MIGRATE is set or
+    the database is empty, and otherwise raises SchemaOutdated if the schema
+    is behind. True always migrates; False only creates the tables, for
+    maintenance commands that migrate themselves."""
+    with transaction() as conn:
+        _create_schema(conn)
+    if run_migrations is None:
+        run_migrations = AUTO_MIGRATE or _is_empty()
+        if not run_migrations and schema_version() < SCHEMA_VERSION:
+            raise SchemaOutdated(
+                f"database schema is at version {schema_version()}, expected {SCHEMA_VERSION}; "
+                "run `python -m backend.manage migrate` (or set PRICEPILOT_AUTO_MIGRATE=true)"
+            )
+    if run_migrations:
+        migrate()
+
+
+def _is_empty():
+    with connection() as conn:
+        return schema_version() < SCHEMA_VERSION and not any(
+            conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone()
+            for table in ("price_history", "product_catalog")
+        )
+
+
+def _create_schema(conn):
     cursor = conn.cursor()
     cursor.execute(
         """
@@ -36,109 +187,844 @@ def init_db():
         )
     """
     )
-    conn.commit()
-    conn.close()
 
 
-def save_price(product_url, title, price):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute(
+# ===================== MIGRATIONS =====================
+# Schema version lives in PRAGMA user_version. Every migration is idempotent
+# and commits in batches, so it can run against a live database and resume
+# where it left off if interrupted.
+
+MIGRATION_BATCH_SIZE = 5000
+
+
+def _to_minor(price):
+    value = DataProcessor.normalize_price(price)
+    if value is None:
+        return None
+    return int(round(value * 100))
+
+
+def _from_minor(price_minor):
+    if price_minor % 100 == 0:
+        return price_minor // 100
+    return price_minor / 100
+
+
+def _ts_from_iso(date):
+    try:
+        return int(datetime.fromisoformat(date).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+
+def _ts_to_iso(ts):
+    return datetime.fromtimestamp(ts).isoformat()
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _migrate_typed_history(batch_size, progress):
+    """v2: integer minor-unit prices, epoch timestamps, (product_url, ts) index."""
+    with transaction() as conn:
+        cols = _columns(conn, "price_history")
+        if "price_minor" not in cols:
+            conn.execute("ALTER TABLE price_history ADD COLUMN price_minor INTEGER")
+        if "ts" not in cols:
+            conn.execute("ALTER TABLE price_history ADD COLUMN ts INTEGER")
+
+    last_id = 0
+    while True:
+        with transaction() as conn:
+            rows = conn.execute(
+                """
+                SELECT id, price, date
+                FROM price_history
+                WHERE id > ? AND ts IS NULL
+                ORDER BY id
+                LIMIT ?
+            """,
+                (last_id, batch_size),
+            ).fetchall()
+            if not rows:
+                break
+            updates = []
+            for row_id, price, date in rows:
+                # Unparseable dates get ts=0 so the row is not revisited.
+                updates.append((_to_minor(price), _ts_from_iso(date) or 0, row_id))
+            conn.executemany(
+                "UPDATE price_history SET price_minor = ?, ts = ? WHERE id = ?",
+                updates,
+            )
+            last_id = rows[-1][0]
+        if progress:
+            progress("price_history", last_id)
+
+    with transaction() as conn:
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_price_history_url_ts
+            ON price_history (product_url, ts)
         """
-        INSERT INTO price_history (product_url, title, price, date)
-        VALUES (?, ?, ?, ?)
-    """,
-        (product_url, title, price, datetime.now().isoformat()),
+        )
+
+
+def _fts5_available(conn):
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp._fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _migrate_catalog_fts(batch_size, progress):
+    """v3: FTS5 index over product_catalog(title, brand, category), kept in
+    sync by triggers. Skipped when SQLite is built without FTS5, in which
+    case catalog search keeps using LIKE."""
+    with transaction() as conn:
+        if not _fts5_available(conn):
+            logging.warning("SQLite has no FTS5; catalog search uses LIKE scans")
+            return
+        conn.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS product_catalog_fts USING fts5(
+                title,
+                brand,
+                category,
+                content='product_catalog',
+                content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """
+        )
+        conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS product_catalog_fts_ai
+            AFTER INSERT ON product_catalog BEGIN
+                INSERT INTO product_catalog_fts (rowid, title, brand, category)
+                VALUES (new.id, new.title, new.brand, new.category);
+            END
+        """
+        )
+        conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS product_catalog_fts_ad
+            AFTER DELETE ON product_catalog BEGIN
+                INSERT INTO product_catalog_fts (product_catalog_fts, rowid, title, brand, category)
+                VALUES ('delete', old.id, old.title, old.brand, old.category);
+            END
+        """
+        )
+        conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS product_catalog_fts_au
+            AFTER UPDATE OF title, brand, category ON product_catalog BEGIN
+                INSERT INTO product_catalog_fts (product_catalog_fts, rowid, title, brand, category)
+                VALUES ('delete', old.id, old.title, old.brand, old.category);
+                INSERT INTO product_catalog_fts (rowid, title, brand, category)
+                VALUES (new.id, new.title, new.brand, new.category);
+            END
+        """
+        )
+        conn.execute("INSERT INTO product_catalog_fts (product_catalog_fts) VALUES ('rebuild')")
+    if progress:
+        progress("product_catalog_fts", None)
+
+
+def _migrate_price_latest(batch_size, progress):
+    """v4: price_latest holds each product's current price and when it was
+    last observed, which change-point storage compares new prices against."""
+    with transaction() as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS price_latest (
+                product_url TEXT PRIMARY KEY,
+                title TEXT,
+                price_minor INTEGER,
+                ts INTEGER,
+                last_seen_ts INTEGER
+            ) WITHOUT ROWID
+        """
+        )
+
+    last_url = ""
+    while True:
+        with transaction() as conn:
+            rows = conn.execute(
+                """
+                SELECT product_url, title, price_minor, MAX(ts)
+                FROM price_history
+                WHERE product_url > ? AND price_minor IS NOT NULL
+                GROUP BY product_url
+                ORDER BY product_url
+                LIMIT ?
+            """,
+                (last_url, batch_size),
+            ).fetchall()
+            if not rows:
+                break
+            conn.executemany(
+                """
+                INSERT OR IGNORE INTO price_latest
+                    (product_url, title, price_minor, ts, last_seen_ts)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                [(url, title, price, ts, ts) for url, title, price, ts in rows],
+            )
+            last_url = rows[-1][0]
+        if progress:
+            progress("price_latest", last_url)
+
+
+def _migrate_price_rollup(batch_size, progress):
+    """v5: hourly/daily/weekly min/max/sum/count/last per product, rebuilt
+    from existing history and then maintained by save_prices()."""
+    with transaction() as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS price_rollup (
+                product_url TEXT,
+                resolution TEXT,
+                bucket_ts INTEGER,
+                min_minor INTEGER,
+                max_minor INTEGER,
+                sum_minor INTEGER,
+                count INTEGER,
+                last_minor INTEGER,
+                last_ts INTEGER,
+                PRIMARY KEY (product_url, resolution, bucket_ts)
+            ) WITHOUT ROWID
+        """
+        )
+        # Restart from scratch if a previous run was interrupted, otherwise
+        # the batches it already applied would be counted twice.
+        conn.execute("DELETE FROM price_rollup")
+
+    last_id = 0
+    while True:
+        with transaction() as conn:
+            rows = conn.execute(
+                """
+                SELECT id, product_url, price_minor, ts
+                FROM price_history
+                WHERE id > ? AND price_minor IS NOT NULL
+                ORDER BY id
+                LIMIT ?
+            """,
+                (last_id, batch_size),
+            ).fetchall()
+            if not rows:
+                break
+            _update_rollups(conn, [(url, price, ts) for _, url, price, ts in rows])
+            last_id = rows[-1][0]
+        if progress:
+            progress("price_rollup", last_id)
+
+
+def _migrate_price_stats(batch_size, progress):
+    """v6: running count/sum/min/max/EWMA/last per product for deal scoring."""
+    with transaction() as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS price_stats (
+                product_url TEXT PRIMARY KEY,
+                count INTEGER,
+                sum_minor INTEGER,
+                min_minor INTEGER,
+                max_minor INTEGER,
+                ewma_minor REAL,
+                last_minor INTEGER,
+                last_ts INTEGER
+            ) WITHOUT ROWID
+        """
+        )
+    backfill_price_stats(batch_size, progress)
+
+
+def _migrate_canonical_urls(batch_size, progress):
+    """v7: re-key history recorded under raw URLs (tracking params, Amazon
+    ref= paths, Flipkart lid/marketplace variants) to canonical_url(), then
+    rebuild the per-product tables so split series merge."""
+    changed = 0
+    last_id = 0
+    while True:
+        with transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, product_url FROM price_history WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, batch_size),
+            ).fetchall()
+            if not rows:
+                break
+            updates = []
+            for row_id, url in rows:
+                canonical = canonical_url(url)
+                if canonical != url:
+                    updates.append((canonical, row_id))
+            conn.executemany("UPDATE price_history SET product_url = ? WHERE id = ?", updates)
+            changed += len(updates)
+            last_id = rows[-1][0]
+        if progress:
+            progress("price_history.product_url", last_id)
+    if not changed:
+        return
+    with transaction() as conn:
+        conn.execute("DELETE FROM price_latest")
+    _migrate_price_latest(batch_size, progress)
+    _migrate_price_rollup(batch_size, progress)
+    backfill_price_stats(batch_size, progress)
+
+
+MIGRATIONS = [
+    (2, _migrate_typed_history),
+    (3, _migrate_catalog_fts),
+    (4, _migrate_price_latest),
+    (5, _migrate_price_rollup),
+    (6, _migrate_price_stats),
+    (7, _migrate_canonical_urls),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version():
+    with connection() as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(batch_size=MIGRATION_BATCH_SIZE, progress=None):
+    """Bring the database up to SCHEMA_VERSION; returns the versions applied."""
+    applied = []
+    current = schema_version()
+    for version, step in MIGRATIONS:
+        if version <= current:
+            continue
+        step(batch_size, progress)
+        with transaction() as conn:
+            conn.execute(f"PRAGMA user_version = {version}")
+        applied.append(version)
+    return applied
+
+
+_INSERT_PRICE_SQL = """
+    INSERT INTO price_history (product_url, title, price_minor, ts)
+    VALUES (?, ?, ?, ?)
+"""
+
+
+# ===================== ROLLUPS =====================
+
+# resolution -> (bucket seconds, alignment offset). Weeks start on Monday
+# (1970-01-05 00:00 UTC); hours and days align to the epoch.
+ROLLUP_TIERS = {
+    "hour": (3600, 0),
+    "day": (86400, 0),
+    "week": (7 * 86400, 4 * 86400),
+}
+MAX_HISTORY_POINTS = int(os.getenv("PRICEPILOT_HISTORY_MAX_POINTS", "500"))
+
+_UPSERT_ROLLUP_SQL = """
+    INSERT INTO price_rollup (
+        product_url, resolution, bucket_ts,
+        min_minor, max_minor, sum_minor, count, last_minor, last_ts
+    ) VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?)
+    ON CONFLICT(product_url, resolution, bucket_ts) DO UPDATE SET
+        min_minor = MIN(min_minor, excluded.min_minor),
+        max_minor = MAX(max_minor, excluded.max_minor),
+        sum_minor = sum_minor + excluded.sum_minor,
+        count = count + 1,
+        last_minor = CASE WHEN excluded.last_ts >= last_ts
+                          THEN excluded.last_minor ELSE last_minor END,
+        last_ts = MAX(last_ts, excluded.last_ts)
+"""
+
+
+def _bucket(ts, resolution):
+    size, offset = ROLLUP_TIERS[resolution]
+    return ts - ((ts - offset) % size)
+
+
+def _update_rollups(conn, observations):
+    """Fold (product_url, price_minor, ts) observations into every tier."""
+    conn.executemany(
+        _UPSERT_ROLLUP_SQL,
+        [
+            (url, resolution, _bucket(ts, resolution), price, price, price, price, ts)
+            for url, price, ts in observations
+            for resolution in ROLLUP_TIERS
+        ],
     )
-    conn.commit()
-    conn.close()
 
 
-def get_price_history(product_url):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute(
+# ===================== RUNNING STATS =====================
+
+# Weight of the newest observation in price_stats.ewma_minor.
+EWMA_ALPHA = float(os.getenv("PRICEPILOT_EWMA_ALPHA", "0.3"))
+
+_UPSERT_STATS_SQL = """
+    INSERT INTO price_stats (
+        product_url, count, sum_minor, min_minor, max_minor,
+        ewma_minor, last_minor, last_ts
+    ) VALUES (?, 1, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(product_url) DO UPDATE SET
+        count = count + 1,
+        sum_minor = sum_minor + excluded.sum_minor,
+        min_minor = MIN(min_minor, excluded.min_minor),
+        max_minor = MAX(max_minor, excluded.max_minor),
+        ewma_minor = ewma_minor + ? * (excluded.ewma_minor - ewma_minor),
+        last_minor = CASE WHEN excluded.last_ts >= last_ts
+                          THEN excluded.last_minor ELSE last_minor END,
+        last_ts = MAX(last_ts, excluded.last_ts)
+"""
+
+
+def _update_stats(conn, observations):
+    conn.executemany(
+        _UPSERT_STATS_SQL,
+        [
+            (url, price, price, price, price, price, ts, EWMA_ALPHA)
+            for url, price, ts in observations
+        ],
+    )
+
+
+def get_price_stats(product_url):
+    """Running price statistics for a product, or None if never seen."""
+    product_url = canonical_url(product_url)
+    with connection() as conn:
+        row = conn.execute(
+            """
+            SELECT count, sum_minor, min_minor, max_minor, ewma_minor, last_minor, last_ts
+            FROM price_stats
+            WHERE product_url = ?
+        """,
+            (product_url,),
+        ).fetchone()
+    if not row or not row[0]:
+        return None
+    count, total, low, high, ewma, last, last_ts = row
+    return {
+        "count": count,
+        "average": total / count / 100,
+        "min": _from_minor(low),
+        "max": _from_minor(high),
+        "ewma": round(ewma / 100, 2),
+        "last": _from_minor(last),
+        "last_seen": _ts_to_iso(last_ts),
+    }
+
+
+def backfill_price_stats(batch_size=MIGRATION_BATCH_SIZE, progress=None):
+    """Rebuild price_stats for every product. Count/sum/min/max come from the
+    weekly rollup (every observation, even in change-point mode); EWMA and
+    last price are replayed from the stored history."""
+    with transaction() as conn:
+        conn.execute("DELETE FROM price_stats")
+    last_url = ""
+    rebuilt = 0
+    while True:
+        with transaction() as conn:
+            totals = conn.execute(
+                """
+                SELECT product_url, SUM(count), SUM(sum_minor), MIN(min_minor), MAX(max_minor)
+                FROM price_rollup
+                WHERE resolution = 'week' AND product_url > ?
+                GROUP BY product_url
+                ORDER BY product_url
+                LIMIT ?
+            """,
+                (last_url, batch_size),
+            ).fetchall()
+            if not totals:
+                break
+            rows = []
+            for url, count, total, low, high in totals:
+                ewma = last = last_ts = None
+                for price, ts in conn.execute(
+                    """
+                    SELECT price_minor, ts FROM price_history
+                    WHERE product_url = ? AND price_minor IS NOT NULL
+                    ORDER BY ts ASC, id ASC
+                """,
+                    (url,),
+                ):
+                    ewma = price if ewma is None else ewma + EWMA_ALPHA * (price - ewma)
+                    last, last_ts = price, ts
+                if last is None:
+                    continue
+                rows.append((url, count, total, low, high, ewma, last, last_ts))
+            conn.executemany(
+                "INSERT INTO price_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            rebuilt += len(rows)
+            last_url = totals[-1][0]
+        if progress:
+            progress("price_stats", last_url)
+    return rebuilt
+
+
+# ===================== PRICE HISTORY =====================
+
+# "all" appends every observation; "changes" appends a row only when a
+# product's price differs from price_latest and otherwise just bumps its
+# last_seen_ts, so repeated searches do not pile up identical rows.
+HISTORY_MODE = os.getenv("PRICEPILOT_HISTORY_MODE", "all").lower()
+
+
+def save_price(product_url, title, price):
+    save_prices([(product_url, title, price, int(time.time()))])
+
+
+def save_prices(observations):
+    """Store (product_url, title, price, ts) observations in one transaction.
+    URLs are stored in canonical_url() form."""
+    rows = [
+        (canonical_url(product_url), title, _to_minor(price), int(ts))
+        for product_url, title, price, ts in observations
+    ]
+    rows = [row for row in rows if row[2] is not None]
+    if not rows:
+        return 0
+    changes_only = HISTORY_MODE == "changes"
+    with transaction() as conn:
+        typed = [(url, price, ts) for url, _, price, ts in rows]
+        _update_rollups(conn, typed)
+        _update_stats(conn, typed)
+        for product_url, title, price_minor, ts in rows:
+            latest = conn.execute(
+                "SELECT price_minor, ts, last_seen_ts FROM price_latest WHERE product_url = ?",
+                (product_url,),
+            ).fetchone()
+            if latest and latest[0] == price_minor:
+                conn.execute(
+                    "UPDATE price_latest SET last_seen_ts = MAX(last_seen_ts, ?), title = ? WHERE product_url = ?",
+                    (ts, title, product_url),
+                )
+                if changes_only:
+                    continue
+            elif latest is None or ts >= latest[2]:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO price_latest
+                        (product_url, title, price_minor, ts, last_seen_ts)
+                    VALUES (?, ?, ?, ?, ?)
+                """,
+                    (product_url, title, price_minor, ts, ts),
+                )
+            conn.execute(_INSERT_PRICE_SQL, (product_url, title, price_minor, ts))
+    return len(rows)
+
+
+def get_price_history(product_url, resolution="raw", since=None, until=None,
+                      max_points=MAX_HISTORY_POINTS):
+    """Price series for a product between optional epoch bounds.
+
+    resolution is "raw", one of ROLLUP_TIERS, or "auto", which returns raw
+    points when there are at most max_points of them and otherwise the
+    finest tier that fits, merging weekly buckets if even those do not.
+    """
+    product_url = canonical_url(product_url)
+    since = int(since) if since is not None else 0
+    until = int(until) if until is not None else 2 ** 62
+    with connection() as conn:
+        if resolution == "auto":
+            resolution = _pick_resolution(conn, product_url, since, until, max_points)
+        if resolution == "raw":
+            return _raw_history(conn, product_url, since, until)
+        if resolution not in ROLLUP_TIERS:
+            raise ValueError(f"unknown resolution: {resolution}")
+        buckets = _rollup_history(conn, product_url, resolution, since, until)
+    if len(buckets) > max_points:
+        buckets = _merge_buckets(buckets, max_points)
+    return [_bucket_point(b) for b in buckets]
+
+
+def _raw_history(conn, product_url, since, until):
+    rows = conn.execute(
         """
-        SELECT price, date
+        SELECT price_minor, ts
         FROM price_history
-        WHERE product_url = ?
-        ORDER BY date ASC
+        WHERE product_url = ? AND ts BETWEEN ? AND ? AND price_minor IS NOT NULL
+        ORDER BY ts ASC, id ASC
     """,
+        (product_url, since, until),
+    ).fetchall()
+    latest = conn.execute(
+        "SELECT price_minor, last_seen_ts FROM price_latest WHERE product_url = ?",
         (product_url,),
-    )
-    rows = cursor.fetchall()
-    conn.close()
-
-    history = []
-    for price, date in rows:
-        clean_price = "".join(ch for ch in price if ch.isdigit())
-        if clean_price:
-            history.append(
-                {
-                    "price": int(clean_price),
-                    "date": date,
-                }
-            )
+    ).fetchone()
 
-    return history
+    # Change-point rows only mark where the price moved; close the series
+    # with the last time the current price was seen.
+    if (
+        rows
+        and latest
+        and rows[-1][1] < latest[1] <= until
+        and latest[0] == rows[-1][0]
+    ):
+        rows.append(latest)
 
+    return [
+        {
+            "price": _from_minor(price_minor),
+            "date": _ts_to_iso(ts),
+        }
+        for price_minor, ts in rows
+    ]
 
-def bulk_upsert_products(source, products):
-    if not products:
-        return 0
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+
+def _pick_resolution(conn, product_url, since, until, max_points):
+    raw_count = conn.execute(
+        """
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM price_history
+            WHERE product_url = ? AND ts BETWEEN ? AND ?
+            LIMIT ?
+        )
+    """,
+        (product_url, since, until, max_points + 1),
+    ).fetchone()[0]
+    if raw_count <= max_points:
+        return "raw"
+    first, last = conn.execute(
+        """
+        SELECT MIN(ts), MAX(ts) FROM price_history
+        WHERE product_url = ? AND ts BETWEEN ? AND ?
+    """,
+        (product_url, since, until),
+    ).fetchone()
+    span = (last or 0) - (first or 0)
+    for resolution, (size, _) in ROLLUP_TIERS.items():
+        if span // size + 1 <= max_points:
+            return resolution
+    return "week"
+
+
+def _rollup_history(conn, product_url, resolution, since, until):
+    rows = conn.execute(
+        """
+        SELECT bucket_ts, min_minor, max_minor, sum_minor, count, last_minor, last_ts
+        FROM price_rollup
+        WHERE product_url = ? AND resolution = ? AND bucket_ts BETWEEN ? AND ?
+        ORDER BY bucket_ts ASC
+    """,
+        (product_url, resolution, _bucket(since, resolution), until),
+    ).fetchall()
+    keys = ("bucket_ts", "min", "max", "sum", "count", "last", "last_ts")
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def _merge_buckets(buckets, max_points):
+    group = -(-len(buckets) // max_points)
+    merged = []
+    for i in range(0, len(buckets), group):
+        chunk = buckets[i:i + group]
+        merged.append(
+            {
+                "bucket_ts": chunk[0]["bucket_ts"],
+                "min": min(b["min"] for b in chunk),
+                "max": max(b["max"] for b in chunk),
+                "sum": sum(b["sum"] for b in chunk),
+                "count": sum(b["count"] for b in chunk),
+                "last": chunk[-1]["last"],
+                "last_ts": chunk[-1]["last_ts"],
+            }
+        )
+    return merged
+
+
+def _bucket_point(bucket):
+    avg = int(round(bucket["sum"] / bucket["count"]))
+    return {
+        "price": _from_minor(avg),
+        "date": _ts_to_iso(bucket["bucket_ts"]),
+        "min": _from_minor(bucket["min"]),
+        "max": _from_minor(bucket["max"]),
+        "avg": _from_minor(avg),
+        "last": _from_minor(bucket["last"]),
+        "count": bucket["count"],
+    }
+
+
+def compact_history(batch_size=MIGRATION_BATCH_SIZE, progress=None):
+    """Delete rows that repeat the previous price of the same product,
+    converting an "all" history into change points. Returns rows deleted."""
+    deleted = 0
+    last_url = ""
+    while True:
+        with connection() as conn:
+            urls = [
+                row[0]
+                for row in conn.execute(
+                    """
+                    SELECT DISTINCT product_url FROM price_history
+                    WHERE product_url > ?
+                    ORDER BY product_url
+                    LIMIT ?
+                """,
+                    (last_url, batch_size),
+                )
+            ]
+        if not urls:
+            break
+        for url in urls:
+            with transaction() as conn:
+                rows = conn.execute(
+                    """
+                    SELECT id, price_minor FROM price_history
+                    WHERE product_url = ? AND price_minor IS NOT NULL
+                    ORDER BY ts ASC, id ASC
+                """,
+                    (url,),
+                ).fetchall()
+                repeats = [
+                    (row_id,)
+                    for (row_id, price), (_, prev) in zip(rows[1:], rows)
+                    if price == prev
+                ]
+                conn.executemany("DELETE FROM price_history WHERE id = ?", repeats)
+            deleted += len(repeats)
+        last_url = urls[-1]
+        if progress:
+            progress("price_history", last_url)
+    return deleted
+
+
+# ===================== PRODUCT CATALOG =====================
+
+_UPSERT_PRODUCT_SQL = """
+    INSERT INTO product_catalog (
+        source,
+        external_id,
+        title,
+        price,
+        currency,
+        url,
+        image,
+        category,
+        brand,
+        updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(source, external_id) DO UPDATE SET
+        title=excluded.title,
+        price=excluded.price,
+        currency=excluded.currency,
+        url=excluded.url,
+        image=excluded.image,
+        category=excluded.category,
+        brand=excluded.brand,
+        updated_at=excluded.updated_at
+"""
+
+
+BULK_CHUNK_SIZE = int(os.getenv("PRICEPILOT_BULK_CHUNK_SIZE", "1000"))
+
+
+def bulk_upsert_products(source, products, chunk_size=BULK_CHUNK_SIZE):
+    """Upsert catalog records from any iterable, committing every chunk_size
+    rows so memory and write-lock hold time stay bounded. Returns the row
+    count of each committed chunk."""
     now = datetime.now().isoformat()
-    count = 0
-    for p in products:
-        cursor.execute(
-            """
-            INSERT INTO product_catalog (
-                source,
-                external_id,
-                title,
-                price,
-                currency,
-                url,
-                image,
-                category,
-                brand,
-                updated_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(source, external_id) DO UPDATE SET
-                title=excluded.title,
-                price=excluded.price,
-                currency=excluded.currency,
-                url=excluded.url,
-                image=excluded.image,
-                category=excluded.category,
-                brand=excluded.brand,
-                updated_at=excluded.updated_at
-        """,
-            (
-                source,
-                p.get("external_id"),
-                p.get("title"),
-                p.get("price"),
-                p.get("currency"),
-                p.get("url"),
-                p.get("image"),
-                p.get("category"),
-                p.get("brand"),
-                now,
-            ),
+    rows = (
+        (
+            source,
+            p.get("external_id"),
+            p.get("title"),
+            p.get("price"),
+            p.get("currency"),
+            p.get("url"),
+            p.get("image"),
+            p.get("category"),
+            p.get("brand"),
+            now,
         )
-        count += 1
-    conn.commit()
-    conn.close()
-    return count
+        for p in products or ()
+    )
+    counts = []
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        with transaction() as conn:
+            conn.executemany(_UPSERT_PRODUCT_SQL, chunk)
+        counts.append(len(chunk))
+    return counts
+
+
+_CATALOG_COLUMNS = (
+    "source",
+    "external_id",
+    "title",
+    "price",
+    "currency",
+    "url",
+    "image",
+    "category",
+    "brand",
+    "updated_at",
+)
+
+# bm25() column weights for (title, brand, category); mirrors the 3/4/2
+# substring scoring the LIKE fallback uses.
+FTS_WEIGHTS = (3.0, 4.0, 2.0)
+
+
+def _has_fts(conn):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'product_catalog_fts'"
+    ).fetchone()
+    return row is not None
+
+
+def _fts_query(query):
+    # Every canonical term must match (AND), as a prefix so
+    # "airdope" still finds "airdopes". "128gb" also matches titles that
+    # spell it "128 GB". Bare numbers match exactly, so "iphone 1" does not
+    # find "iPhone 15". "+" only separates tokens, as in the index ("s24+"
+    # is the token "s24"). Terms are quoted to neutralise FTS syntax.
+    parts = []
+    for term in query_terms(query, spell_plus=False):
+        split = split_number_unit(term)
+        if split:
+            parts.append(f'("{term}"* OR "{split[0]} {split[1]}"*)')
+        elif re.fullmatch(r"[0-9.]+", term):
+            parts.append(f'"{term}"')
+        else:
+            parts.append(f'"{term}"*')
+    return " AND ".join(parts)
 
 
 def search_products_by_name(query, limit=10):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with connection() as conn:
+        if _has_fts(conn):
+            return _search_products_fts(conn, query, limit)
+        return _search_products_like(conn, query, limit)
+
+
+def _search_products_fts(conn, query, limit):
+    match = _fts_query(query)
+    if not match:
+        return []
+    columns = ", ".join("c." + col for col in _CATALOG_COLUMNS)
+    weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+    rows = conn.execute(
+        f"""
+        SELECT {columns}
+        FROM product_catalog_fts f
+        JOIN product_catalog c ON c.id = f.rowid
+        WHERE product_catalog_fts MATCH ?
+        ORDER BY bm25(product_catalog_fts, {weights}), c.updated_at DESC
+        LIMIT ?
+    """,
+        (match, int(limit)),
+    ).fetchall()
+    return [dict(zip(_CATALOG_COLUMNS, row)) for row in rows]
+
+
+def _search_products_like(conn, query, limit):
     pattern = "%" + query + "%"
-    cursor.execute(
+    rows = conn.execute(
         """
         SELECT source,
                external_id,
@@ -158,9 +1044,7 @@ def search_products_by_name(query, limit=10):
         LIMIT 200
     """,
         (pattern, pattern, pattern),
-    )
-    rows = cursor.fetchall()
-    conn.close()
+    ).fetchall()
     terms = [t for t in str(query).lower().split() if t]
     scored = []
     for row in rows:
@@ -0,0 +1,161 @@
+import functools
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# ===================== ENGINES =====================
+# Retail pages are 1-2 MB, so the HTML parser is the main CPU cost of a
+# scrape. The fastest installed engine is used: selectolax (lexbor), then
+# lxml (with cssselect), then BeautifulSoup's pure-Python html.parser.
+# PRICEPILOT_HTML_PARSER=selectolax|lxml|bs4 forces one.
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as _SelectolaxParser
+except Exception:
+    try:
+        from selectolax.parser import HTMLParser as _SelectolaxParser
+    except Exception:
+        _SelectolaxParser = None
+
+try:
+    import lxml.html as _lxml_html
+    from lxml.cssselect import CSSSelector as _CSSSelector
+except Exception:
+    _lxml_html = None
+    _CSSSelector = None
+
+from bs4 import BeautifulSoup
+
+AVAILABLE = [
+    name for name, ok in (
+        ("selectolax", _SelectolaxParser is not None),
+        ("lxml", _CSSSelector is not None),
+        ("bs4", True),
+    ) if ok
+]
+
+
+def _pick_engine():
+    """PRICEPILOT_HTML_PARSER if it is installed, else the fastest installed
+    engine; bs4 is a hard dependency, so there is always one."""
+    wanted = os.getenv("PRICEPILOT_HTML_PARSER", "auto").lower()
+    if wanted == "auto":
+        return AVAILABLE[0]
+    if wanted not in AVAILABLE:
+        logger.warning(f"HTML parser {wanted!r} is not installed; using {AVAILABLE[0]}")
+        return AVAILABLE[0]
+    return wanted
+
+
+ENGINE = _pick_engine()
+
+
+class Node:
+    """One element, with the subset of the bs4 Tag API the scrapers use:
+    select_one, select, get_text, get and item access for attributes."""
+
+    __slots__ = ("_el", "_engine")
+
+    def __init__(self, el, engine):
+        self._el = el
+        self._engine = engine
+
+    def select_one(self, selector: str):
+        if self._engine == "selectolax":
+            el = self._el.css_first(selector)
+        elif self._engine == "lxml":
+            found = _css(selector)(self._el)
+            el = found[0] if found else None
+        else:
+            el = self._el.select_one(selector)
+        return Node(el, self._engine) if el is not None else None
+
+    def select(self, selector: str):
+        if self._engine == "selectolax":
+            found = self._el.css(selector)
+        elif self._engine == "lxml":
+            found = _css(selector)(self._el)
+        else:
+            found = self._el.select(selector)
+        return [Node(el, self._engine) for el in found]
+
+    def get_text(self, strip: bool = False) -> str:
+        if self._engine == "selectolax":
+            return self._el.text(strip=strip)
+        if self._engine == "lxml":
+            parts = self._el.itertext()
+            return "".join(p.strip() for p in parts) if strip else "".join(parts)
+        return self._el.get_text(strip=strip)
+
+    def get(self, name: str, default=None):
+        """Attribute value as a string ("class" included), or default when
+        the attribute is missing. A valueless attribute (<input disabled>)
+        is present but its value differs by engine: "" on selectolax and
+        bs4, the attribute's own name on lxml ("disabled"), so only test
+        such attributes for presence."""
+        if self._engine == "selectolax":
+            attributes = self._el.attributes
+            if name not in attributes:
+                return default
+            value = attributes[name]
+            return "" if value is None else value
+        return self._el.get(name, default)
+
+    def __getitem__(self, name: str):
+        value = self.get(name)
+        if value is None:
+            raise KeyError(name)
+        return value
+
+
+@functools.lru_cache(maxsize=256)
+def _css(selector: str):
+    return _CSSSelector(selector, translator="html")
+
+
+class Document(Node):
+    """A parsed page. JSON-LD blocks are decoded once, on first use, so the
+    JSON-LD and CSS-selector paths of a scraper share one parse."""
+
+    __slots__ = ("_jsonld",)
+
+    def __init__(self, el, engine):
+        super().__init__(el, engine)
+        self._jsonld = None
+
+    def jsonld(self) -> list:
+        """Decoded application/ld+json blocks; ones that fail to decode are skipped."""
+        if self._jsonld is None:
+            self._jsonld = []
+            for script in self.select("script[type='application/ld+json']"):
+                text = script.get_text().strip()
+                if not text:
+                    continue
+                try:
+                    self._jsonld.append(json.loads(text))
+                except ValueError:
+                    continue
+        return self._jsonld
+
+
+def parse_html(html, engine: str = None) -> Document:
+    """Parse html (or pass an already parsed Document through)."""
+    if isinstance(html, Document):
+        return html
+    engine = engine or ENGINE
+    html = html or ""
+    if engine == "selectolax":
+        return Document(_SelectolaxParser(html), engine)
+    if engine == "lxml":
+        if not html.strip():
+            html = "<html></html>"
+        try:
+            root = _lxml_html.document_fromstring(html)
+        except ValueError:
+            # str input with an XML encoding declaration
+            root = _lxml_html.document_fromstring(html.encode("utf-8"))
+        return Document(root, engine)
+    # multi_valued_attributes=None: "class" is a string, as on the other engines.
+    return Document(BeautifulSoup(html, "html.parser", multi_valued_attributes=None), engine)
@@ -1,5 +1,6 @@
 import requests
-from bs4 import BeautifulSoup
+from .dom import parse_html
+from .scheduler import RateLimited
 from .search_providers import _get_html, _headless_html, _norm_price, _jsonld_product
 
 def fetch_flipkart_product(url: str):
@@ -8,7 +9,8 @@ def fetch_flipkart_product(url: str):
         if len(html) < 2000: # Blocked or low content
             html = _headless_html(url, wait_for="span.B_NuCI") or html
             
-        jld = _jsonld_product(html, "https://www.flipkart.com", "Flipkart")
+        soup = parse_html(html)
+        jld = _jsonld_product(soup, "https://www.flipkart.com", "Flipkart")
         if jld and jld.get("title") != "Unavailable":
             return {
                 "title": jld["title"],
@@ -17,8 +19,6 @@ def fetch_flipkart_product(url: str):
                 "source": "Flipkart Scraper"
             }
 
-        soup = BeautifulSoup(html, "html.parser")
-        
         # Updated selectors
         title_tag = (
             soup.select_one("span.B_NuCI") or 
@@ -48,6 +48,8 @@ def fetch_flipkart_product(url: str):
             "source": "Flipkart Scraper"
         }
 
+    except RateLimited:
+        raise
     except Exception as e:
         return {
             "title": "Unavailable",
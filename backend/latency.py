@@ -0,0 +1,140 @@
+import bisect
+import os
+import threading
+import time
+
+# ===================== CONFIG =====================
+
+# Log-spaced bucket bounds from 1 ms to 2 min; each is 20% above the last,
+# so any percentile is reported to within 20%.
+BUCKET_RATIO = 1.2
+MIN_MS = 1.0
+MAX_MS = 120_000.0
+# Once a histogram holds this much weight every bucket is halved, so old
+# observations fade and the estimates follow the provider's current speed.
+DECAY_AT = float(os.getenv("PRICEPILOT_LATENCY_DECAY_AT", "1000"))
+# Percentiles are not trusted until this many observations have been seen.
+MIN_SAMPLES = int(os.getenv("PRICEPILOT_LATENCY_MIN_SAMPLES", "20"))
+# Adaptive timeouts allow this percentile of a key's latency times HEADROOM.
+TIMEOUT_PERCENTILE = float(os.getenv("PRICEPILOT_TIMEOUT_PERCENTILE", "0.99"))
+TIMEOUT_HEADROOM = float(os.getenv("PRICEPILOT_TIMEOUT_HEADROOM", "1.5"))
+
+
+def _bounds():
+    bounds = []
+    b = MIN_MS
+    while b < MAX_MS:
+        bounds.append(round(b, 3))
+        b *= BUCKET_RATIO
+    bounds.append(MAX_MS)
+    return bounds
+
+
+_BOUNDS = _bounds()
+
+
+class LatencyHistogram:
+    """Streaming latency histogram with exponential decay."""
+
+    __slots__ = ("counts", "weight", "samples")
+
+    def __init__(self):
+        self.counts = [0.0] * (len(_BOUNDS) + 1)
+        self.weight = 0.0
+        self.samples = 0
+
+    def observe(self, ms: float):
+        self.counts[bisect.bisect_left(_BOUNDS, ms)] += 1
+        self.weight += 1
+        self.samples += 1
+        if self.weight >= DECAY_AT:
+            self.counts = [c / 2 for c in self.counts]
+            self.weight /= 2
+
+    def percentile(self, q: float) -> float:
+        """Upper bound (ms) of the bucket holding the q-quantile."""
+        if not self.weight:
+            return 0.0
+        target = q * self.weight
+        seen = 0.0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target and c:
+                return _BOUNDS[i] if i < len(_BOUNDS) else MAX_MS
+        return MAX_MS
+
+
+class LatencyTracker:
+    """Latency histograms keyed by what was timed, e.g. "fetch:amazon.in:impersonate"."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._timeouts = {}
+
+    def observe(self, key: str, ms: float):
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = LatencyHistogram()
+            hist.observe(ms)
+
+    def percentile(self, key: str, q: float, min_samples: int = MIN_SAMPLES):
+        """q-quantile in ms, or None until key has min_samples observations."""
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None or hist.samples < min_samples:
+                return None
+            return hist.percentile(q)
+
+    def timeout(self, key: str, default: float, low: float, high: float) -> float:
+        """Timeout in seconds for the next call timed under key: its
+        TIMEOUT_PERCENTILE latency times TIMEOUT_HEADROOM within [low, high],
+        or default until the key has enough samples.
+
+        Callers should observe() the time a call was cut off at, so a
+        provider that slows down past its timeout pushes the estimate up
+        instead of timing out forever."""
+        learned = self.percentile(key, TIMEOUT_PERCENTILE)
+        value = default if learned is None else learned * TIMEOUT_HEADROOM / 1000
+        value = round(min(max(value, low), high), 3)
+        with self._lock:
+            self._timeouts[key] = value
+        return value
+
+    def timed(self, key: str, timeout: float, fn, *args, **kwargs):
+        """fn(*args, timeout=timeout, **kwargs), observing how long it took
+        under key; a call that fails at its timeout is observed at the cut-off."""
+        started = time.monotonic()
+        try:
+            result = fn(*args, timeout=timeout, **kwargs)
+        except Exception:
+            elapsed = time.monotonic() - started
+            if elapsed >= timeout * 0.95:
+                self.observe(key, elapsed * 1000)
+            raise
+        self.observe(key, (time.monotonic() - started) * 1000)
+        return result
+
+    def snapshot(self) -> dict:
+        empty = LatencyHistogram()
+        with self._lock:
+            data = {}
+            for key in sorted(set(self._histograms) | set(self._timeouts)):
+                hist = self._histograms.get(key, empty)
+                data[key] = {
+                    "samples": hist.samples,
+                    "p50_ms": hist.percentile(0.5),
+                    "p90_ms": hist.percentile(0.9),
+                    "p99_ms": hist.percentile(0.99),
+                    "timeout_s": self._timeouts.get(key),
+                }
+            return data
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._timeouts.clear()
+
+
+LATENCY = LatencyTracker()
@@ -1,23 +1,37 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
 from urllib.parse import urlparse
-import statistics
 import time
-from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import asyncio
+from datetime import datetime
 import logging
-from .search_providers import search_amazon, search_flipkart, search_ajio, search_snapdeal, search_croma, search_myntra
+from .search_providers import (
+    ASYNC_SEARCHES, PROVIDER_CACHE, PROVIDER_ERROR_TTL, breaker_states, fetch_timeout, hedge_stats, shutdown_fetch_loop,
+    shutdown_work_pool,
+)
+from .latency import LATENCY, TIMEOUT_HEADROOM, TIMEOUT_PERCENTILE
+from .browser_pool import BROWSER_POOL
+from .scheduler import HOST_LIMITER, SCHEDULER, RateLimited, host_key
 import os
 import io
 import csv
+import math
 import json
 import xml.etree.ElementTree as ET
 import requests
-from bs4 import BeautifulSoup
+from .dom import ENGINE as HTML_PARSER, parse_html
 
 # Database
-from .database import init_db, save_price, get_price_history, bulk_upsert_products, search_products_by_name
+from .database import init_db, close_connections, pool_stats, get_price_history, get_price_stats, bulk_upsert_products, search_products_by_name, ROLLUP_TIERS
+from .price_recorder import PriceRecorder
+from .cache import TTLCache, make_cache
+from .singleflight import AsyncSingleFlight, SingleFlight
+from .canonical import canonical_query, canonical_url
+from .redirects import resolve_short_link
+from .sessions import aclose_sessions, close_sessions, http_get, session_stats
 
 # Scrapers
 from .amazon_api import fetch_amazon_product
@@ -36,6 +50,40 @@ app = FastAPI(title="PricePilot API", version="2.0.0")
 
 init_db()
 
+# Price observations from request handlers are written behind the response.
+price_recorder = PriceRecorder(
+    max_batch=int(os.getenv("PRICEPILOT_RECORDER_BATCH", "200")),
+    flush_interval=float(os.getenv("PRICEPILOT_RECORDER_INTERVAL", "1.0")),
+)
+
+
+@app.on_event("startup")
+def _startup():
+    price_recorder.start()
+    SEARCH_CACHE.start_sweeper()
+    PROVIDER_CACHE.start_sweeper()
+
+
+@app.on_event("shutdown")
+def _shutdown():
+    SCHEDULER.shutdown()
+    shutdown_fetch_loop()
+    shutdown_work_pool()
+    SEARCH_CACHE.stop_sweeper()
+    PROVIDER_CACHE.stop_sweeper()
+    price_recorder.stop()
+    BROWSER_POOL.stop()
+    close_sessions()
+    close_connections()
+
+
+@app.on_event("shutdown")
+async def _shutdown_async():
+    for task in list(_REFRESH_TASKS) + list(_STRAGGLERS):
+        task.cancel()
+    await aclose_sessions()
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -83,9 +131,19 @@ GENERIC_HEADERS = {
 }
 
 
+def _rate_limited(e: RateLimited) -> HTTPException:
+    """429 for a request refused by a retailer's host budget."""
+    return HTTPException(
+        status_code=429, detail=str(e), headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+    )
+
+
 def _generic_scrape(url: str) -> dict:
     try:
-        resp = requests.get(url, headers=GENERIC_HEADERS, timeout=10)
+        host = host_key(url)
+        resp = LATENCY.timed(
+            f"fetch:{host}:requests", fetch_timeout(host, "requests"), http_get, url, headers=GENERIC_HEADERS
+        )
         if resp.status_code != 200:
             return {
                 "title": "Unavailable",
@@ -93,23 +151,24 @@ def _generic_scrape(url: str) -> dict:
                 "image": "",
                 "source": f"Generic error: HTTP {resp.status_code}",
             }
-        soup = BeautifulSoup(resp.text, "html.parser")
+        soup = parse_html(resp.text)
         title = None
         price = None
         image = None
-        og_title = soup.find("meta", property="og:title")
+        og_title = soup.select_one("meta[property='og:title']")
         if og_title and og_title.get("content"):
             title = og_title["content"].strip()
-        if not title and soup.title and soup.title.string:
-            title = soup.title.string.strip()
+        title_el = soup.select_one("title")
+        if not title and title_el and title_el.get_text(strip=True):
+            title = title_el.get_text(strip=True)
         price_meta = (
-            soup.find("meta", property="product:price:amount")
-            or soup.find("meta", property="og:price:amount")
-            or soup.find("meta", itemprop="price")
+            soup.select_one("meta[property='product:price:amount']")
+            or soup.select_one("meta[property='og:price:amount']")
+            or soup.select_one("meta[itemprop='price']")
         )
         if price_meta and price_meta.get("content"):
             price = price_meta["content"].strip()
-        og_image = soup.find("meta", property="og:image")
+        og_image = soup.select_one("meta[property='og:image']")
         if og_image and og_image.get("content"):
             image = og_image["content"].strip()
         return {
@@ -118,6 +177,8 @@ def _generic_scrape(url: str) -> dict:
             "image": image or "",
             "source": "Generic Scraper",
         }
+    except RateLimited:
+        raise
     except Exception as e:
         return {
             "title": "Unavailable",
@@ -130,6 +191,7 @@ def _generic_scrape(url: str) -> dict:
 # ===================== LOGIC =====================
 
 def scrape_logic(url: str, use_mock: bool = False):
+    """Scrape url as given (short links already resolved)."""
     if use_mock:
         return MockScraper().fetch_product(url)
 
@@ -152,6 +214,13 @@ def scrape_logic(url: str, use_mock: bool = False):
         result["price"] = "Unavailable"
     return result
 
+def scrape_shared(url: str, use_mock: bool = False):
+    """scrape_logic on the shared scrape scheduler, with concurrent scrapes
+    of the same product coalesced. url is fetched as given; only the
+    coalescing key uses its canonical_url()."""
+    result = INFLIGHT.do(("scrape", canonical_url(url), use_mock), SCHEDULER.run, scrape_logic, url, use_mock)
+    return dict(result)
+
 def _guess_feed_format(name: Optional[str], explicit: Optional[str]) -> str:
     if explicit:
         return explicit.lower()
@@ -168,8 +237,7 @@ def _guess_feed_format(name: Optional[str], explicit: Optional[str]) -> str:
 def _parse_csv_feed(data: bytes):
     text = data.decode("utf-8", errors="ignore")
     buf = io.StringIO(text)
-    reader = csv.DictReader(buf)
-    return [row for row in reader]
+    return csv.DictReader(buf)
 
 
 def _parse_json_feed(data: bytes):
@@ -251,6 +319,28 @@ def _normalize_feed_record(source: str, raw: dict):
     }
 
 
+def _import_feed_items(source: str, raw_items, dry_run: bool):
+    """Stream raw feed items through normalization into the catalog.
+
+    Returns (total raw items, per-chunk imported counts)."""
+    seen = {"total": 0}
+
+    def normalized():
+        for raw in raw_items:
+            seen["total"] += 1
+            if not isinstance(raw, dict):
+                continue
+            rec = _normalize_feed_record(source, raw)
+            if rec:
+                yield rec
+
+    if dry_run:
+        chunks = [sum(1 for _ in normalized())]
+    else:
+        chunks = bulk_upsert_products(source, normalized())
+    return seen["total"], chunks
+
+
 def _feed_rows_to_results(rows):
     results = []
     for row in rows:
@@ -279,8 +369,28 @@ def _feed_rows_to_results(rows):
 
 
 # ===================== ROUTES =====================
-SEARCH_CACHE = {}
+# Entries younger than CACHE_TTL are fresh. Up to CACHE_STALE_TTL they are
+# still served immediately while a background refresh runs; after that a
+# search waits for the live fan-out again.
 CACHE_TTL = 60 * 60 * 24
+CACHE_STALE_TTL = CACHE_TTL + int(os.getenv("PRICEPILOT_CACHE_STALE_WINDOW", str(60 * 60 * 24)))
+CACHE_REFRESH_INTERVAL = int(os.getenv("PRICEPILOT_CACHE_REFRESH_INTERVAL", "300"))
+# Shared by all workers unless PRICEPILOT_CACHE_BACKEND=memory (see cache.py).
+SEARCH_CACHE = make_cache(
+    "search",
+    ttl=CACHE_STALE_TTL,
+    max_entries=int(os.getenv("PRICEPILOT_CACHE_MAX_ENTRIES", "2000")),
+    max_bytes=int(os.getenv("PRICEPILOT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    sweep_interval=float(os.getenv("PRICEPILOT_CACHE_SWEEP_INTERVAL", "300")),
+)
+# Keys refreshed within the last CACHE_REFRESH_INTERVAL seconds.
+_REFRESH_MARKS = TTLCache(max_entries=10000, ttl=CACHE_REFRESH_INTERVAL)
+REFRESH_STATS = {"stale_hits": 0, "refreshes": 0, "refresh_skipped": 0, "refresh_errors": 0}
+HISTORY_RESOLUTIONS = ["auto", "raw"] + list(ROLLUP_TIERS)
+INFLIGHT = SingleFlight()
+# Async routes coalesce on the event loop instead of blocking threads.
+AINFLIGHT = AsyncSingleFlight()
+_REFRESH_TASKS = set()
 
 @app.get("/")
 def root():
@@ -295,17 +405,23 @@ def root():
 @app.post("/compare-advanced", response_model=ComparisonResponse)
 def compare_advanced(payload: ProductPayload, mock_mode: bool = False):
     product = payload.dict()
+    # Fetch the link's real target; history and the response use its canonical form.
+    target = resolve_short_link(product["url"])
+    product["url"] = canonical_url(target)
 
     # 1. Data Collection
     if product["price"] in ["Unavailable", "", None] or mock_mode:
-        scraped_data = scrape_logic(product["url"], use_mock=mock_mode)
+        try:
+            scraped_data = scrape_shared(target, use_mock=mock_mode)
+        except RateLimited as e:
+            raise _rate_limited(e)
         product.update(scraped_data)
 
     # 2. Data Processing & Validation
     current_price_float = DataProcessor.normalize_price(product["price"])
     
     # 3. History & Analysis
-    history = get_price_history(product["url"])
+    history = get_price_history(product["url"], resolution="auto")
     deal_analysis = {
         "score": 0,
         "label": "No Data",
@@ -314,26 +430,24 @@ def compare_advanced(payload: ProductPayload, mock_mode: bool = False):
     }
 
     if current_price_float:
+        # Calculate Stats (running record of every earlier observation)
+        stats = get_price_stats(product["url"])
+
+        # Use the current price if there is no history yet
+        avg_price = stats["average"] if stats else current_price_float
+
         # Save valid price
-        save_price(product["url"], product["title"], product["price"])
-        
-        # Calculate Stats
-        historical_prices = []
-        for entry in history:
-            p = DataProcessor.normalize_price(entry["price"])
-            if p:
-                historical_prices.append(p)
-        
-        # Include current price in stats if history is empty
-        if not historical_prices:
-            historical_prices = [current_price_float]
-            
-        avg_price = statistics.mean(historical_prices)
+        price_recorder.record(product["url"], product["title"], product["price"])
         
         # 4. Deal Scoring
         deal_metrics = DataProcessor.calculate_deal_score(current_price_float, avg_price)
         deal_analysis.update(deal_metrics)
         deal_analysis["average_price"] = round(avg_price, 2)
+        if stats:
+            deal_analysis["trend_price"] = stats["ewma"]
+            deal_analysis["lowest_price"] = stats["min"]
+            deal_analysis["highest_price"] = stats["max"]
+            deal_analysis["observations"] = stats["count"]
 
     return {
         "product": product,
@@ -347,17 +461,42 @@ def compare_advanced_get(url: str, mock_mode: bool = False):
 
 # ---------- UTILITIES ----------
 
+def _parse_time_param(name: str, value: Optional[str]) -> Optional[int]:
+    """Accept epoch seconds or an ISO-8601 date/datetime."""
+    if value is None or value == "":
+        return None
+    try:
+        return int(float(value))
+    except ValueError:
+        pass
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: {value}")
+
+
 @app.get("/price-history")
-def price_history(product_url: str):
-    return get_price_history(product_url)
+def price_history(product_url: str, resolution: str = "auto", since: Optional[str] = None, until: Optional[str] = None):
+    if resolution not in HISTORY_RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {', '.join(HISTORY_RESOLUTIONS)}")
+    return get_price_history(
+        product_url,
+        resolution=resolution,
+        since=_parse_time_param("since", since),
+        until=_parse_time_param("until", until),
+    )
 
 @app.get("/scrape")
 def scrape_product(url: str, mock: bool = False):
-    result = scrape_logic(url, use_mock=mock)
+    target = resolve_short_link(url)
+    try:
+        result = scrape_shared(target, use_mock=mock)
+    except RateLimited as e:
+        raise _rate_limited(e)
     
     # Save if successful
     if result["price"] not in ["Unavailable", "", None]:
-        save_price(url, result["title"], result["price"])
+        price_recorder.record(canonical_url(target), result["title"], result["price"])
         
     return result
 
@@ -366,133 +505,427 @@ def health_check():
     return {"status": "healthy", "services": ["api", "database", "scrapers"], "runtime_flags": RUNTIME_FLAGS}
 
 
+@app.get("/admin/latency")
+def admin_latency():
+    """Latency percentiles per provider and endpoint, and the timeout each
+    one currently gets (timeout_s, null until a call has asked for one)."""
+    return {
+        "timeout_percentile": TIMEOUT_PERCENTILE,
+        "timeout_headroom": TIMEOUT_HEADROOM,
+        "providers": {site: provider_budget(site) for site, _ in ASYNC_SEARCHES},
+        "keys": LATENCY.snapshot(),
+    }
+
+
+@app.get("/admin/stats")
+def admin_stats():
+    return {
+        "database": pool_stats(),
+        "price_recorder": price_recorder.stats(),
+        "search_cache": {**SEARCH_CACHE.stats(), **REFRESH_STATS},
+        "provider_cache": PROVIDER_CACHE.stats(),
+        "breakers": breaker_states(),
+        "inflight": INFLIGHT.stats(),
+        "inflight_async": AINFLIGHT.stats(),
+        "search": {"budget_s": SEARCH_BUDGET, "budget_min_s": SEARCH_BUDGET_MIN, "stragglers": len(_STRAGGLERS)},
+        "scheduler": SCHEDULER.stats(),
+        "hosts": HOST_LIMITER.stats(),
+        "http": session_stats(),
+        "hedging": hedge_stats(),
+        "latency": LATENCY.snapshot(),
+        "browser_pool": BROWSER_POOL.stats(),
+        "html_parser": HTML_PARSER,
+    }
+
+
 @app.post("/admin/import-feed")
 async def import_feed(source: str = Form(...), fmt: Optional[str] = Form(None), file: UploadFile = File(...), dry_run: bool = Form(False)):
     resolved_fmt = _guess_feed_format(file.filename, fmt)
     content = await file.read()
-    raw_items = _parse_feed_bytes(content, resolved_fmt)
-    normalized = []
-    for raw in raw_items:
-        if not isinstance(raw, dict):
-            continue
-        rec = _normalize_feed_record(source, raw)
-        if rec:
-            normalized.append(rec)
-    if dry_run:
-        imported = len(normalized)
-    else:
-        imported = bulk_upsert_products(source, normalized)
+    # Parsing and the catalog upserts run in a worker thread so a large feed
+    # does not stall the searches and streams sharing the event loop.
+    total, chunks = await asyncio.to_thread(
+        lambda: _import_feed_items(source, _parse_feed_bytes(content, resolved_fmt), dry_run)
+    )
     return {
         "source": source,
         "format": resolved_fmt,
-        "total": len(raw_items),
-        "imported": imported,
+        "total": total,
+        "imported": sum(chunks),
+        "chunks": chunks,
         "dry_run": dry_run,
     }
 
 
+FEED_TIMEOUT = float(os.getenv("PRICEPILOT_FEED_TIMEOUT", "30"))
+FEED_TIMEOUT_MIN = float(os.getenv("PRICEPILOT_FEED_TIMEOUT_MIN", "5"))
+FEED_TIMEOUT_MAX = float(os.getenv("PRICEPILOT_FEED_TIMEOUT_MAX", "60"))
+
+
 @app.post("/admin/import-feed-from-url")
 def import_feed_from_url(payload: ImportFeedRequest, dry_run: bool = False):
     resolved_fmt = _guess_feed_format(payload.url, payload.fmt)
     try:
-        resp = requests.get(payload.url, timeout=30)
+        key = f"feed:{host_key(payload.url)}"
+        timeout = LATENCY.timeout(key, FEED_TIMEOUT, FEED_TIMEOUT_MIN, FEED_TIMEOUT_MAX)
+        resp = LATENCY.timed(key, timeout, http_get, payload.url)
+    except RateLimited as e:
+        raise _rate_limited(e)
     except requests.RequestException as e:
         raise HTTPException(status_code=502, detail=f"Failed to fetch feed: {str(e)}")
     if resp.status_code != 200:
         raise HTTPException(status_code=resp.status_code, detail="Failed to fetch feed")
     raw_items = _parse_feed_bytes(resp.content, resolved_fmt)
-    normalized = []
-    for raw in raw_items:
-        if not isinstance(raw, dict):
-            continue
-        rec = _normalize_feed_record(payload.source, raw)
-        if rec:
-            normalized.append(rec)
-    if dry_run:
-        imported = len(normalized)
-    else:
-        imported = bulk_upsert_products(payload.source, normalized)
+    total, chunks = _import_feed_items(payload.source, raw_items, dry_run)
     return {
         "source": payload.source,
         "format": resolved_fmt,
-        "total": len(raw_items),
-        "imported": imported,
+        "total": total,
+        "imported": sum(chunks),
+        "chunks": chunks,
         "dry_run": dry_run,
     }
 
 
-def run_all_search(q: str):
-    sites = [
-        ("Amazon", search_amazon),
-        ("Flipkart", search_flipkart),
-        ("Ajio", search_ajio),
-        ("Snapdeal", search_snapdeal),
-        ("Croma", search_croma),
-        ("Myntra", search_myntra),
-    ]
-    with ThreadPoolExecutor(max_workers=5) as ex:
-        future_map = {site: ex.submit(fn, q) for site, fn in sites}
-        results = []
-        for site, fut in future_map.items():
-            try:
-                r = fut.result(timeout=6)
-                if r:
-                    if isinstance(r, dict) and "origin" not in r:
-                        r["origin"] = "live"
-                    results.append(r)
-            except TimeoutError:
-                results.append({"origin": "live", "source": site, "title": "Unavailable", "price": "Unavailable", "image": "", "url": "", "error": "Timeout"})
-            except Exception as e:
-                results.append({"origin": "live", "source": site, "title": "Unavailable", "price": "Unavailable", "image": "", "url": "", "error": str(e)})
-        return results
+def _error_result(site: str, error: str) -> dict:
+    return {"origin": "live", "source": site, "title": "Unavailable", "price": "Unavailable", "image": "", "url": "", "error": error}
+
+
+# Every provider gets its own latency budget, learned from how long its
+# live searches take (LATENCY "search:<name>") and capped by SEARCH_BUDGET,
+# so a stuck fast provider is given up on early instead of holding the
+# search to the slowest provider's budget. Results are collected as they
+# complete; a provider still running past its budget is reported as a
+# timeout and abandoned rather than waited for. Abandoned fetches that do
+# finish still fill PROVIDER_CACHE for the next search.
+SEARCH_BUDGET = float(os.getenv("PRICEPILOT_SEARCH_BUDGET", "6"))
+SEARCH_BUDGET_MIN = float(os.getenv("PRICEPILOT_SEARCH_BUDGET_MIN", "1.5"))
+_STRAGGLERS = set()
+
+
+def provider_budget(site: str, budget: float = None) -> float:
+    """Seconds to wait for site's result; an explicit budget applies to every provider."""
+    if budget is not None:
+        return budget
+    return LATENCY.timeout(f"search:{site}", SEARCH_BUDGET, SEARCH_BUDGET_MIN, SEARCH_BUDGET)
+
+
+def _timeout_result(site: str, limit: float, learn: bool = True) -> dict:
+    # A timed-out provider is observed at its budget so a provider that has
+    # slowed down earns a longer one.
+    if learn:
+        LATENCY.observe(f"search:{site}", limit * 1000)
+    return {**_error_result(site, "Timeout"), "elapsed_ms": round(limit * 1000, 1)}
+
+
+def _abandon(fetch):
+    # Keep the fetch referenced until it finishes; it only fills the caches now.
+    _STRAGGLERS.add(fetch)
+    fetch.add_done_callback(_settle_straggler)
+
+
+def _settle_straggler(fetch):
+    _STRAGGLERS.discard(fetch)
+    if not fetch.cancelled():
+        fetch.exception()  # retrieved, so a failed straggler is not logged as unhandled
+
+
+def _live_result(site: str, r, started: float) -> dict:
+    r = dict(r) if isinstance(r, dict) else _error_result(site, "Empty result")
+    r.setdefault("origin", "live")
+    r["elapsed_ms"] = round((time.monotonic() - started) * 1000, 1)
+    return r
+
+
+async def aiter_all_search(q: str, budget: float = None):
+    """Yield provider results as they complete, and a Timeout result for
+    each provider as soon as its live fetch runs past its budget. Cache
+    hits and open breakers answer at once; a provider's budget starts when
+    its fetch gets a scrape slot, not while it queues for one."""
+    async def one(site, fn, limit):
+        started = time.monotonic()
+        fetching = asyncio.get_running_loop().create_future()
+
+        def on_fetch():
+            if not fetching.done():
+                fetching.set_result(time.monotonic())
+
+        fetch = asyncio.ensure_future(fn(q, on_fetch=on_fetch))
+        try:
+            await asyncio.wait({fetch, fetching}, return_when=asyncio.FIRST_COMPLETED)
+            if not fetch.done():
+                started = fetching.result()
+                done, _ = await asyncio.wait({fetch}, timeout=limit - (time.monotonic() - started))
+                if not done:
+                    _abandon(fetch)
+                    return _timeout_result(site, limit, learn=budget is None)
+            elif fetching.done():
+                started = fetching.result()
+            r = fetch.result()
+        except asyncio.CancelledError:
+            if not fetch.done():
+                _abandon(fetch)
+            raise
+        except Exception as e:
+            r = _error_result(site, str(e))
+        return _live_result(site, r, started)
+
+    pending = {asyncio.create_task(one(site, fn, provider_budget(site, budget))) for site, fn in ASYNC_SEARCHES}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        # Also reached when a streaming client disconnects mid-search; the
+        # fetches themselves keep running and still fill PROVIDER_CACHE.
+        for task in pending:
+            task.cancel()
+
+
+async def arun_all_search(q: str, budget: float = None):
+    """Every provider's result (or Timeout), in provider order. Providers run
+    concurrently as coroutines, with no thread per outbound request."""
+    order = {site: i for i, (site, _) in enumerate(ASYNC_SEARCHES)}
+    results = [r async for r in aiter_all_search(q, budget)]
+    return sorted(results, key=lambda r: order.get(r.get("source"), len(order)))
+
+
 @app.get("/providers-health")
-def providers_health(q: str = "iphone"):
-    data = run_all_search(q)
-    status = []
-    for item in data:
-        status.append({
-            "source": item.get("source"),
-            "ok": bool(item.get("title") not in ["Unavailable", None] or item.get("price") not in ["Unavailable", None]),
-            "error": item.get("error"),
-            "url": item.get("url"),
-        })
-    return {"query": q, "flags": RUNTIME_FLAGS, "status": status}
-
-def _search_compare_core(q: str):
-    key = q.lower()
-    now = time.time()
-    cached = SEARCH_CACHE.get(key)
-    if cached and (now - cached["ts"]) < CACHE_TTL:
-        logging.info(f"cache_hit query={q} count={len(cached['data'])}")
-        return cached["data"]
-    feed_rows = search_products_by_name(q, limit=10)
-    feed_results = _feed_rows_to_results(feed_rows)
-    live_results = run_all_search(q)
-    combined = []
+async def providers_health(q: str = "iphone", live: bool = False):
+    """Circuit breaker state per provider. Only with live=true does this
+    also run a real fan-out for q (which records into the breakers)."""
+    by_source = {item.get("source"): item for item in await arun_all_search(q)} if live else None
+    status = breaker_states()
+    for item in status:
+        item["ok"] = item["state"] == "closed" and item["error_rate"] < 0.5
+    if live:
+        for item in status:
+            result = by_source.get(item["source"]) or {}
+            item["live"] = {
+                "ok": bool(result.get("title") not in ["Unavailable", None] or result.get("price") not in ["Unavailable", None]),
+                "error": result.get("error"),
+                "url": result.get("url"),
+                "elapsed_ms": result.get("elapsed_ms"),
+            }
+    return {"query": q if live else None, "flags": RUNTIME_FLAGS, "status": status}
+
+
+def _search_key(q: str) -> str:
+    # "iPhone 15 128GB" and "128 gb iphone 15" share cache and flight keys.
+    return canonical_query(q) or q.lower()
+
+
+async def _cached_search(q: str, key: str):
+    """Cached results for key, or None. Stale entries are still returned;
+    the caller schedules their refresh when this returns stale=True."""
+    entry = await SEARCH_CACHE.aget_entry(key)
+    if entry is None:
+        return None, False
+    stale = SEARCH_CACHE.clock() - entry.stored_at >= CACHE_TTL
+    if stale:
+        REFRESH_STATS["stale_hits"] += 1
+    logging.info(f"cache_hit query={q} count={len(entry.value)}")
+    return entry.value, stale
+
+
+async def _asearch_compare_core(q: str):
+    key = _search_key(q)
+    cached, stale = await _cached_search(q, key)
+    if cached is not None:
+        if stale and _claim_refresh(key):
+            task = asyncio.create_task(_arefresh_search(q, key))
+            _REFRESH_TASKS.add(task)
+            task.add_done_callback(_REFRESH_TASKS.discard)
+        return cached
+    return await AINFLIGHT.do(("search", key), _asearch_compare_live, q, key)
+
+
+def _claim_refresh(key: str) -> bool:
+    """Refresh a stale entry at most once per CACHE_REFRESH_INTERVAL per key
+    and never alongside a live fetch."""
+    if key in _REFRESH_MARKS or AINFLIGHT.in_flight(("search", key)):
+        REFRESH_STATS["refresh_skipped"] += 1
+        return False
+    _REFRESH_MARKS.set(key, True)
+    REFRESH_STATS["refreshes"] += 1
+    return True
+
+
+async def _arefresh_search(q: str, key: str):
+    try:
+        await AINFLIGHT.do(("search", key), _asearch_compare_live, q, key)
+    except Exception as e:
+        REFRESH_STATS["refresh_errors"] += 1
+        logging.warning(f"cache_refresh_failed query={q} error={e}")
+
+
+async def _asearch_compare_live(q: str, key: str):
+    feed_rows = await asyncio.to_thread(search_products_by_name, q, 10)
+    live_results = await arun_all_search(q)
+    return await _store_search(q, key, _feed_rows_to_results(feed_rows) + live_results)
+
+
+async def _store_search(q: str, key: str, results):
+    """Dedupe by canonical URL, cache, and queue prices for history."""
     seen_urls = set()
-    for item in feed_results + live_results:
-        url = item.get("url") or ""
-        key_url = url.lower()
-        if key_url:
-            if key_url in seen_urls:
-                continue
-            seen_urls.add(key_url)
-        combined.append(item)
-    SEARCH_CACHE[key] = {"ts": now, "data": combined}
+    combined = [item for item in results if _first_sighting(item, seen_urls)]
+    await SEARCH_CACHE.aset(key, combined, ttl=_search_ttl(combined))
     logging.info(f"search query={q} count={len(combined)}")
     for item in combined:
         if item.get("price") not in [None, "", "Unavailable", "Sold Out"]:
-            save_price(item.get("url", key), item.get("title", q), str(item.get("price")))
+            price_recorder.record(item.get("url", key), item.get("title", q), item.get("price"))
     return combined
 
+def _search_ttl(results):
+    """A search where any provider errored, timed out or was served degraded
+    is only kept for PROVIDER_ERROR_TTL, so the next search picks up that
+    provider's recovery (or its straggler's cached result) instead of
+    replaying the failure for a whole CACHE_TTL. One that hit our own host
+    rate limit is only kept until the longest retry_after has passed."""
+    retry_after = [item["retry_after"] for item in results if item.get("retry_after") is not None]
+    if retry_after:
+        return max(max(retry_after), 1)
+    if any(item.get("error") or item.get("degraded") for item in results):
+        return PROVIDER_ERROR_TTL
+    return None
+
+
+def _first_sighting(item: dict, seen_urls: set) -> bool:
+    """False if another result already pointed at the same product."""
+    key_url = canonical_url(item.get("url") or "").lower()
+    if not key_url:
+        return True
+    if key_url in seen_urls:
+        return False
+    seen_urls.add(key_url)
+    return True
+
+
+# ---------- STREAMING SEARCH ----------
+
+def _stream_event(fmt: str, event: str, data) -> str:
+    payload = json.dumps(data, default=str)
+    if fmt == "sse":
+        return f"event: {event}\ndata: {payload}\n\n"
+    return json.dumps({"event": event, "data": data}, default=str) + "\n"
+
+
+class _SearchProgress:
+    """Results of one streamed search as they arrive, replayed to every
+    stream subscribed to it."""
+
+    def __init__(self):
+        self.items = []
+        self.done = False
+        self._changed = asyncio.Event()
+
+    def add(self, item: dict):
+        self.items.append(item)
+        self._wake()
+
+    def finish(self):
+        self.done = True
+        self._wake()
+
+    def _wake(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self):
+        i = 0
+        while True:
+            while i < len(self.items):
+                yield self.items[i]
+                i += 1
+            if self.done:
+                return
+            await self._changed.wait()
+
+
+# Streamed searches in flight, by search key.
+_STREAMS = {}
+
+
+async def _astream_search_live(q: str, key: str, progress: _SearchProgress):
+    """_asearch_compare_live that publishes each result to progress as it
+    arrives. It runs as the AINFLIGHT task for key, so it finishes and is
+    cached even if every stream watching it disconnects."""
+    try:
+        feed_rows = await asyncio.to_thread(search_products_by_name, q, 10)
+        for item in _feed_rows_to_results(feed_rows):
+            progress.add(item)
+        async for item in aiter_all_search(q):
+            progress.add(item)
+        return await _store_search(q, key, progress.items)
+    finally:
+        progress.finish()
+        if _STREAMS.get(key) is progress:
+            del _STREAMS[key]
+
+
+async def _search_compare_events(q: str, fmt: str):
+    """Catalog hits first, then each live provider as it completes, then a
+    summary. A cached search is replayed at once. Identical searches share
+    one fetch: streams follow the one already in flight from its first
+    result, and a plain /search-compare fetch is waited for."""
+    started = time.monotonic()
+    key = _search_key(q)
+    cached, stale = await _cached_search(q, key)
+    progress = _STREAMS.get(key)
+    if cached is None and progress is None and AINFLIGHT.in_flight(("search", key)):
+        cached, stale = await AINFLIGHT.do(("search", key), _asearch_compare_live, q, key), False
+    if cached is not None:
+        if stale and _claim_refresh(key):
+            task = asyncio.create_task(_arefresh_search(q, key))
+            _REFRESH_TASKS.add(task)
+            task.add_done_callback(_REFRESH_TASKS.discard)
+        for item in cached:
+            yield _stream_event(fmt, "result", item)
+        yield _stream_event(fmt, "done", {
+            "query": q, "count": len(cached), "cached": True,
+            "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+        })
+        return
+
+    if progress is None:
+        progress = _STREAMS[key] = _SearchProgress()
+    fetch = AINFLIGHT.start(("search", key), _astream_search_live, q, key, progress)
+    seen_urls = set()
+    async for item in progress.follow():
+        if _first_sighting(item, seen_urls):
+            yield _stream_event(fmt, "result", item)
+    combined = await asyncio.shield(fetch)
+    yield _stream_event(fmt, "done", {
+        "query": q, "count": len(combined), "cached": False,
+        "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+    })
+
+
+@app.get("/search-compare/stream")
+async def search_compare_stream(q: str, format: str = "ndjson"):
+    """Progressive /search-compare: NDJSON lines by default, or Server-Sent
+    Events with format=sse. Each line/event is a "result" until the final
+    "done" summary."""
+    fmt = format.lower()
+    if fmt not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be ndjson or sse")
+    media_type = "text/event-stream" if fmt == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        _search_compare_events(q.strip(), fmt),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/search-compare", response_model=SearchCompareResponse)
-def search_compare(payload: SearchPayload):
+async def search_compare(payload: SearchPayload):
     q = payload.name.strip()
-    data = _search_compare_core(q)
+    data = await _asearch_compare_core(q)
     return {"query": q, "results": data}
 
 @app.get("/search-compare", response_model=SearchCompareResponse)
-def search_compare_get(q: str):
+async def search_compare_get(q: str):
     q = q.strip()
-    data = _search_compare_core(q)
+    data = await _asearch_compare_core(q)
     return {"query": q, "results": data}
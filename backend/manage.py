@@ -0,0 +1,58 @@
+"""Maintenance commands: python -m backend.manage <command> [options]"""
+import argparse
+import logging
+
+from . import database
+
+
+def _progress(table, position):
+    logging.info(f"{table} processed up to {position}")
+
+
+def cmd_migrate(args):
+    before = database.schema_version()
+    applied = database.migrate(batch_size=args.batch_size, progress=_progress)
+    print(f"schema version {before} -> {database.schema_version()} (applied: {applied or 'none'})")
+
+
+def cmd_compact_history(args):
+    deleted = database.compact_history(batch_size=args.batch_size, progress=_progress)
+    print(f"deleted {deleted} repeated price_history rows")
+
+
+def cmd_backfill_stats(args):
+    rebuilt = database.backfill_price_stats(batch_size=args.batch_size, progress=_progress)
+    print(f"rebuilt price_stats for {rebuilt} products")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m backend.manage")
+    parser.add_argument("--db", help="database path (defaults to PRICEPILOT_DB)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("migrate", help="upgrade the database schema in batches")
+    p.add_argument("--batch-size", type=int, default=database.MIGRATION_BATCH_SIZE)
+    p.set_defaults(func=cmd_migrate)
+
+    p = sub.add_parser(
+        "compact-history",
+        help="drop history rows that repeat the previous price (for PRICEPILOT_HISTORY_MODE=changes)",
+    )
+    p.add_argument("--batch-size", type=int, default=database.MIGRATION_BATCH_SIZE)
+    p.set_defaults(func=cmd_compact_history)
+
+    p = sub.add_parser("backfill-stats", help="rebuild per-product running price stats")
+    p.add_argument("--batch-size", type=int, default=database.MIGRATION_BATCH_SIZE)
+    p.set_defaults(func=cmd_backfill_stats)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    if args.db:
+        database.DB_NAME = args.db
+    database.init_db(run_migrations=False)
+    args.func(args)
+    database.close_connections()
+
+
+if __name__ == "__main__":
+    main()
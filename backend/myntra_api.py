@@ -1,5 +1,6 @@
+from .dom import parse_html
+from .scheduler import RateLimited
 from .search_providers import _get_html, _headless_html, _norm_price, _jsonld_product
-from bs4 import BeautifulSoup
 import json
 
 def fetch_myntra_product(url: str):
@@ -9,7 +10,8 @@ def fetch_myntra_product(url: str):
         if not html:
             html = _get_html(url, referer="https://www.myntra.com/")
             
-        jld = _jsonld_product(html or "", "https://www.myntra.com", "Myntra")
+        soup = parse_html(html)
+        jld = _jsonld_product(soup, "https://www.myntra.com", "Myntra")
         if jld and jld.get("title") != "Unavailable":
             return {
                 "title": jld["title"],
@@ -18,8 +20,6 @@ def fetch_myntra_product(url: str):
                 "source": "Myntra Scraper"
             }
 
-        soup = BeautifulSoup(html or "", "html.parser")
-        
         # PDP selectors
         title_el = soup.select_one("h1.pdp-name")
         brand_el = soup.select_one("h1.pdp-title")
@@ -49,6 +49,8 @@ def fetch_myntra_product(url: str):
             "source": "Myntra Scraper"
         }
 
+    except RateLimited:
+        raise
     except Exception as e:
         return {
             "title": "Unavailable",
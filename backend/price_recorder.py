@@ -0,0 +1,145 @@
+import logging
+import queue
+import threading
+import time
+
+from .database import save_prices
+
+_STOP = object()
+
+
+class PriceRecorder:
+    """Write-behind buffer for price observations.
+
+    Request handlers call record(), which only enqueues. A background thread
+    writes queued observations in one transaction once max_batch of them are
+    waiting or flush_interval seconds have passed since the oldest one.
+    When the thread is not running (scripts, tests) record() writes through.
+    """
+
+    def __init__(self, max_batch: int = 200, flush_interval: float = 1.0, max_queue: int = 10000):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._stopping = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "recorded": 0,
+            "flushed": 0,
+            "dropped": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="price-recorder", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the writer thread and drain whatever is still queued."""
+        self._stopping.set()
+        if self._thread is not None:
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def record(self, product_url: str, title: str, price) -> bool:
+        obs = (product_url, title, str(price), time.time())
+        with self._stats_lock:
+            self._stats["recorded"] += 1
+        if not self.running:
+            self._write([obs])
+            return True
+        try:
+            self._queue.put_nowait(obs)
+            return True
+        except queue.Full:
+            with self._stats_lock:
+                self._stats["dropped"] += 1
+            logging.warning(f"price_recorder queue full, dropped url={product_url}")
+            return False
+
+    def flush(self):
+        """Synchronously write everything currently queued."""
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                continue
+            batch.append(item)
+            if len(batch) >= self.max_batch:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            data = dict(self._stats)
+        total_ms = data.pop("total_flush_ms")
+        data["avg_flush_ms"] = round(total_ms / data["flushes"], 3) if data["flushes"] else 0.0
+        data["queue_depth"] = self._queue.qsize()
+        data["running"] = self.running
+        return data
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._stopping.set()
+                    break
+                batch.append(item)
+            self._write(batch)
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        try:
+            with self._flush_lock:
+                save_prices(batch)
+        except Exception as e:
+            with self._stats_lock:
+                self._stats["failed_flushes"] += 1
+                self._stats["dropped"] += len(batch)
+            logging.error(f"price_recorder flush failed size={len(batch)} error={e}")
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._stats_lock:
+            self._stats["flushed"] += len(batch)
+            self._stats["flushes"] += 1
+            self._stats["last_flush_ms"] = round(elapsed, 3)
+            self._stats["max_flush_ms"] = round(max(self._stats["max_flush_ms"], elapsed), 3)
+            self._stats["total_flush_ms"] += elapsed
@@ -0,0 +1,48 @@
+import logging
+import os
+
+import requests
+
+from .cache import make_cache
+from .canonical import is_short_link
+from .scheduler import HOST_LIMITER, RateLimited
+from .sessions import requests_session
+
+# Short links (amzn.to, fkrt.it, ...) point at the same product for their
+# whole life, so their targets are cached for a long time and shared by
+# every worker through the configured cache backend.
+REDIRECT_TTL = int(os.getenv("PRICEPILOT_REDIRECT_TTL", str(30 * 86400)))
+REDIRECT_CACHE = make_cache("redirects", ttl=REDIRECT_TTL, max_entries=20000)
+
+_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    ),
+    "Accept-Language": "en-IN,en;q=0.9",
+}
+
+
+def resolve_short_link(url: str, timeout: float = 10) -> str:
+    """Final URL a short link redirects to; other URLs are returned as-is.
+    Failed lookups are not cached and return the short link itself."""
+    if not url or not is_short_link(url):
+        return url
+    cached = REDIRECT_CACHE.get(url)
+    if cached:
+        return cached
+    try:
+        HOST_LIMITER.acquire(url)
+        session = requests_session()
+        resp = session.head(url, headers=_HEADERS, allow_redirects=True, timeout=timeout)
+        if resp.status_code >= 400 or is_short_link(resp.url):
+            resp = session.get(url, headers=_HEADERS, allow_redirects=True, timeout=timeout)
+        target = resp.url
+    except (requests.RequestException, RateLimited) as e:
+        logging.warning(f"short link resolve failed url={url} error={e}")
+        return url
+    if not target or is_short_link(target):
+        return url
+    REDIRECT_CACHE.set(url, target)
+    return target
@@ -0,0 +1,295 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+# ===================== CONFIG =====================
+
+# Outbound scrapes running at once across the whole process: blocking
+# scrapes on threads and coroutines on every event loop share this one cap.
+MAX_WORKERS = int(os.getenv("PRICEPILOT_SCRAPE_WORKERS", "12"))
+# Per retailer: sustained requests/second and how many may go out back to back.
+HOST_RATE = float(os.getenv("PRICEPILOT_HOST_RATE", "4"))
+HOST_BURST = int(os.getenv("PRICEPILOT_HOST_BURST", "8"))
+# Overrides as "amazon.in:2,flipkart.com:3".
+HOST_RATES = {
+    host.strip().lower(): float(rate)
+    for host, _, rate in (
+        item.partition(":") for item in os.getenv("PRICEPILOT_HOST_RATES", "").split(",") if ":" in item
+    )
+}
+# A request that would have to wait longer than this for its host's token
+# fails fast with RateLimited instead of piling up behind the bucket.
+HOST_MAX_WAIT = float(os.getenv("PRICEPILOT_HOST_MAX_WAIT", "5"))
+
+
+class RateLimited(Exception):
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def host_key(url: str) -> str:
+    """Bucket key for a URL: the retailer's registrable domain, so
+    www.amazon.in, m.amazon.in and amazon.in share one budget."""
+    host = (urlparse(url).hostname or "").lower()
+    if host.replace(".", "").isdigit() or ":" in host:
+        return host
+    labels = host.split(".")
+    if len(labels) > 2 and labels[-2] in ("co", "com", "net", "org") and len(labels[-1]) == 2:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations: reserve() takes a token now
+    (letting the balance go negative) and returns how long the caller must
+    wait before using it, so waiters are served in arrival order."""
+
+    def __init__(self, rate: float, burst: int, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float = None):
+        """Seconds to wait for a token, or None (nothing reserved) if that
+        would exceed max_wait."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            elapsed = self._clock() - self._updated
+            return min(self.burst, self._tokens + elapsed * self.rate)
+
+    @property
+    def wait(self) -> float:
+        """Seconds until a reservation made now could be used."""
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class HostLimiter:
+    """One TokenBucket per retailer host, created on first use."""
+
+    def __init__(self, rate: float = HOST_RATE, burst: int = HOST_BURST,
+                 overrides=None, max_wait: float = HOST_MAX_WAIT):
+        self.rate = rate
+        self.burst = burst
+        self.overrides = dict(HOST_RATES if overrides is None else overrides)
+        self.max_wait = max_wait
+        self._buckets = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.overrides.get(host, self.rate), self.burst)
+                self._stats[host] = {"requests": 0, "delayed": 0, "wait_ms": 0.0, "rejected": 0}
+            return bucket
+
+    def _reserve(self, url):
+        host = host_key(url)
+        if not host:
+            return 0.0
+        wait = self._bucket(host).reserve(self.max_wait)
+        with self._lock:
+            stats = self._stats[host]
+            if wait is None:
+                stats["rejected"] += 1
+                raise RateLimited(f"rate limited: {host}", self._buckets[host].wait)
+            stats["requests"] += 1
+            if wait > 0:
+                stats["delayed"] += 1
+                stats["wait_ms"] += wait * 1000
+        return wait
+
+    def acquire(self, url: str):
+        """Block until url's host may be hit again; RateLimited if that is
+        further away than max_wait."""
+        wait = self._reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, url: str):
+        wait = self._reserve(url)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hosts = {h: dict(s) for h, s in self._stats.items()}
+            buckets = dict(self._buckets)
+        for host, data in hosts.items():
+            data["wait_ms"] = round(data["wait_ms"], 1)
+            data["tokens"] = round(buckets[host].tokens, 2)
+            data["rate"] = buckets[host].rate
+        return hosts
+
+
+class Slots:
+    """Counting semaphore shared by threads and by coroutines on any event
+    loop. Waiters of both kinds are served in arrival order; a released slot
+    is handed straight to the next waiter."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._free = size
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return
+            granted = threading.Event()
+            self._waiters.append(granted.set)
+        granted.wait()
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return
+            granted = loop.create_future()
+
+            def grant():
+                try:
+                    loop.call_soon_threadsafe(self._hand_over, granted)
+                except RuntimeError:  # the waiter's loop is closed
+                    self.release()
+
+            self._waiters.append(grant)
+        try:
+            await granted
+        except asyncio.CancelledError:
+            with self._lock:
+                if grant in self._waiters:
+                    self._waiters.remove(grant)
+                    raise
+            # The slot was already on its way to us.
+            if granted.done() and not granted.cancelled():
+                self.release()
+            raise
+
+    def _hand_over(self, granted):
+        if granted.done():  # cancelled while the slot was on its way
+            self.release()
+        else:
+            granted.set_result(None)
+
+    def release(self):
+        with self._lock:
+            if not self._waiters:
+                self._free += 1
+                return
+            grant = self._waiters.popleft()
+        grant()
+
+    @property
+    def free(self) -> int:
+        with self._lock:
+            return self._free
+
+
+class ScrapeScheduler:
+    """Process-wide cap on concurrent scrapes.
+
+    Blocking scrapes run on a thread pool and coroutines use slot(); both
+    take their slot from one Slots of max_workers, so no more than
+    max_workers scrapes run at once however the work is split. Queue depth
+    is whatever is submitted but not yet running.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self.max_workers = max_workers
+        self._slots = Slots(max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scrape")
+        self._lock = threading.Lock()
+        self._stats = {
+            "submitted": 0, "completed": 0, "running": 0, "queued": 0, "max_queued": 0,
+            "async_running": 0, "async_waiting": 0,
+        }
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["queued"] += 1
+            self._stats["max_queued"] = max(self._stats["max_queued"], self._stats["queued"])
+        return self._executor.submit(self._call, fn, args, kwargs)
+
+    def run(self, fn, *args, **kwargs):
+        """submit() and wait for the result."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def _call(self, fn, args, kwargs):
+        self._slots.acquire()
+        with self._lock:
+            self._stats["queued"] -= 1
+            self._stats["running"] += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._slots.release()
+            with self._lock:
+                self._stats["running"] -= 1
+                self._stats["completed"] += 1
+
+    def cancel(self, future) -> bool:
+        """Cancel a submitted scrape that has not started yet."""
+        if future.cancel():
+            with self._lock:
+                self._stats["queued"] -= 1
+            return True
+        return False
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the max_workers scrape slots from a coroutine."""
+        with self._lock:
+            self._stats["async_waiting"] += 1
+        try:
+            await self._slots.aacquire()
+        finally:
+            with self._lock:
+                self._stats["async_waiting"] -= 1
+        with self._lock:
+            self._stats["async_running"] += 1
+        try:
+            yield
+        finally:
+            self._slots.release()
+            with self._lock:
+                self._stats["async_running"] -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            data = dict(self._stats)
+        data["max_workers"] = self.max_workers
+        data["free_slots"] = self._slots.free
+        return data
+
+
+HOST_LIMITER = HostLimiter()
+SCHEDULER = ScrapeScheduler()
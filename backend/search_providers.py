@@ -2,20 +2,27 @@ import re
 import json
 import time
 import os
-from typing import Dict, Optional
-from bs4 import BeautifulSoup
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, NamedTuple, Optional
 import requests
 
+from .breaker import CircuitBreaker
+from .browser_pool import BROWSER_POOL
+from .cache import make_cache
+from .canonical import canonical_query
+from .dom import parse_html
+from .latency import LATENCY
+from .scheduler import SCHEDULER, RateLimited, host_key
+from .sessions import ahttp_get, aclose_sessions, aimpersonated_get
+
 try:
     from curl_cffi import requests as curl_requests
 except Exception:
     curl_requests = None
 
-try:
-    from playwright.sync_api import sync_playwright
-except Exception:
-    sync_playwright = None
-
 USE_IMPERSONATE = True
 ENABLE_HEADLESS = True
 
@@ -35,6 +42,111 @@ HEADERS = {
 }
 
 
+# ─── per-provider result cache ───────────────────────────────────────────────
+# Each provider's result is cached per normalized query, so a refresh only
+# re-fetches providers whose entry has expired. Error results are cached
+# for a much shorter time so a blocked provider is retried soon.
+
+PROVIDER_TTLS = {
+    "Amazon": 6 * 3600,
+    "Flipkart": 6 * 3600,
+    "Ajio": 12 * 3600,
+    "Snapdeal": 12 * 3600,
+    "Croma": 12 * 3600,
+    "Myntra": 12 * 3600,
+}
+for _name in PROVIDER_TTLS:
+    _env = os.getenv(f"PRICEPILOT_PROVIDER_TTL_{_name.upper()}")
+    if _env:
+        PROVIDER_TTLS[_name] = int(_env)
+PROVIDER_ERROR_TTL = int(os.getenv("PRICEPILOT_PROVIDER_ERROR_TTL", "600"))
+
+PROVIDER_CACHE = make_cache(
+    "providers",
+    ttl=max(PROVIDER_TTLS.values()),
+    max_entries=int(os.getenv("PRICEPILOT_PROVIDER_CACHE_MAX_ENTRIES", "10000")),
+)
+
+
+# The last good result per provider and query outlives the normal TTL so an
+# open circuit breaker has something to serve.
+PROVIDER_LAST_GOOD_TTL = int(os.getenv("PRICEPILOT_PROVIDER_LAST_GOOD_TTL", str(7 * 86400)))
+
+# ─── per-provider circuit breakers ───────────────────────────────────────────
+# A provider that keeps failing or crawling (blocked, JS wall, headless
+# escalation) is short-circuited: searches get its last good result, or an
+# error, at once instead of waiting out the fetch. See breaker.py.
+
+BREAKERS = {name: CircuitBreaker(name) for name in PROVIDER_TTLS}
+
+
+def breaker_states():
+    return [b.snapshot() for b in BREAKERS.values()]
+
+
+def _provider_cache_key(source: str, query: str) -> str:
+    return f"{source}:{canonical_query(query) or query.lower()}"
+
+
+def cached_provider(source: str):
+    """Serve an asearch_* function's result from PROVIDER_CACHE while fresh,
+    and put the provider's circuit breaker in front of live fetches. Only a
+    live fetch takes a SCHEDULER slot; on_fetch(), if given, is called once
+    it has one and the fetch starts."""
+    breaker = BREAKERS.setdefault(source, CircuitBreaker(source))
+
+    async def last_good(key, error, **extra):
+        last = await PROVIDER_CACHE.aget("last:" + key)
+        if last is not None:
+            return {**last, "origin": "cached", "degraded": True, **extra}
+        return {**_result(source, error=error), **extra}
+
+    async def store(key, result, started):
+        error = result.get("error")
+        elapsed_ms = (time.monotonic() - started) * 1000
+        breaker.record(not error, elapsed_ms, error)
+        if not error:
+            LATENCY.observe(f"search:{source}", elapsed_ms)
+        ttl = PROVIDER_ERROR_TTL if error else PROVIDER_TTLS.get(source, PROVIDER_CACHE.ttl)
+        await PROVIDER_CACHE.aset(key, result, ttl=ttl)
+        if not error:
+            await PROVIDER_CACHE.aset("last:" + key, result, ttl=PROVIDER_LAST_GOOD_TTL)
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(query: str, on_fetch: Callable[[], None] = None) -> Dict:
+            key = _provider_cache_key(source, query)
+            cached = await PROVIDER_CACHE.aget(key)
+            if cached is not None:
+                return dict(cached)
+            if not breaker.allow():
+                return await last_good(key, "Circuit open", breaker=breaker.state)
+            started = None
+            try:
+                async with SCHEDULER.slot():
+                    started = time.monotonic()
+                    if on_fetch is not None:
+                        on_fetch()
+                    result = await fn(query)
+            except RateLimited as e:
+                # Our own host budget said no: the provider was never asked,
+                # so this is neither a breaker failure nor worth caching.
+                breaker.release()
+                return await last_good(key, "Rate limited", retry_after=round(e.retry_after, 1))
+            except BaseException as e:
+                if started is None:
+                    breaker.release()
+                else:
+                    breaker.record(False, (time.monotonic() - started) * 1000, str(e) or type(e).__name__)
+                raise
+            await store(key, result, started)
+            return result
+
+        wrapper.uncached = fn
+        return wrapper
+    return decorator
+
+
 # ─── helpers ──────────────────────────────────────────────────────────────────
 
 def _norm_price(text: Optional[str]) -> Optional[str]:
@@ -60,64 +172,255 @@ def _result(source, title=None, price=None, image=None, url=None,
     }
 
 
-def _get_html(url: str, referer: str = "", timeout: int = 10) -> str:
-    """Fetch HTML — try curl_cffi impersonation first, fall back to requests."""
-    if USE_IMPERSONATE and curl_requests:
-        try:
-            r = curl_requests.get(url, impersonate="chrome124", timeout=timeout)
-            if r.status_code == 200 and len(r.text) > 500:
-                return r.text
-        except Exception:
-            pass
+# ─── hedged fetch ────────────────────────────────────────────────────────────
+# curl impersonation is tried first; when it has not answered within the
+# host's usual primary latency (its HEDGE_PERCENTILE, learned from past
+# fetches) the plain requests transport is started alongside it and the first
+# valid page wins. Only the slowest ~10% of fetches send a second request.
+
+HEDGE = os.getenv("PRICEPILOT_HEDGE", "true").lower() != "false"
+HEDGE_PERCENTILE = float(os.getenv("PRICEPILOT_HEDGE_PERCENTILE", "0.9"))
+HEDGE_DELAY_MS = float(os.getenv("PRICEPILOT_HEDGE_DELAY_MS", "1500"))  # until a host has enough samples
+HEDGE_MIN_DELAY_MS = float(os.getenv("PRICEPILOT_HEDGE_MIN_DELAY_MS", "200"))
+HEDGE_MAX_DELAY_MS = float(os.getenv("PRICEPILOT_HEDGE_MAX_DELAY_MS", "5000"))
+HEDGE_STATS = {"fetches": 0, "hedged": 0, "primary_wins": 0, "fallback_wins": 0, "no_valid": 0}
+_HEDGE_LOCK = threading.Lock()
+# Blocking callers (the product scrapers, on scrape threads) fetch through
+# _aget_html on one background event loop: a hedge's losing request is
+# cancelled there instead of running on in a thread, and every fetch shares
+# that loop's AsyncSessions.
+_FETCH_LOOP = None
+_FETCH_LOOP_LOCK = threading.Lock()
+
+
+def _hedge_count(field: str):
+    with _HEDGE_LOCK:
+        HEDGE_STATS[field] += 1
+
+
+def hedge_stats() -> Dict:
+    with _HEDGE_LOCK:
+        return dict(HEDGE_STATS)
+
+
+def _fetch_loop() -> asyncio.AbstractEventLoop:
+    global _FETCH_LOOP
+    with _FETCH_LOOP_LOCK:
+        if _FETCH_LOOP is None:
+            _FETCH_LOOP = asyncio.new_event_loop()
+            threading.Thread(target=_run_fetch_loop, args=(_FETCH_LOOP,), name="fetch-loop", daemon=True).start()
+        return _FETCH_LOOP
+
+
+def _run_fetch_loop(loop):
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_forever()
+    finally:
+        loop.close()
+
+
+def shutdown_fetch_loop():
+    """Close the fetch loop's sessions and stop it; the next _get_html starts a new one."""
+    global _FETCH_LOOP
+    with _FETCH_LOOP_LOCK:
+        loop, _FETCH_LOOP = _FETCH_LOOP, None
+    if loop is None:
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(aclose_sessions(), loop).result(timeout=5)
+    except Exception:
+        pass
+    loop.call_soon_threadsafe(loop.stop)
+
+
+def hedge_delay(host: str) -> float:
+    """Seconds to give curl impersonation on host before hedging."""
+    learned = LATENCY.percentile(f"fetch:{host}:impersonate", HEDGE_PERCENTILE)
+    ms = HEDGE_DELAY_MS if learned is None else learned
+    return min(max(ms, HEDGE_MIN_DELAY_MS), HEDGE_MAX_DELAY_MS) / 1000
+
+
+def _plain_headers(referer: str) -> Dict:
     hdrs = {**HEADERS}
     if referer:
         hdrs["Referer"] = referer
-    r = requests.get(url, headers=hdrs, timeout=timeout)
-    return r.text if r.status_code == 200 else ""
+    return hdrs
 
 
-def _headless_html(url: str, wait_for: str = "", timeout_ms: int = 15000) -> Optional[str]:
-    """Full Playwright headless fetch — use when normal HTTP is blocked."""
-    if not ENABLE_HEADLESS or not sync_playwright:
-        return None
+def _valid(r) -> bool:
+    return r.status_code == 200 and len(r.text) > 500
+
+
+# Fetch timeouts follow each host's latency per transport (LATENCY.timeout);
+# a timeout passed explicitly by the caller is used as is.
+FETCH_TIMEOUT = float(os.getenv("PRICEPILOT_FETCH_TIMEOUT", "10"))  # until a host has enough samples
+FETCH_TIMEOUT_MIN = float(os.getenv("PRICEPILOT_FETCH_TIMEOUT_MIN", "3"))
+FETCH_TIMEOUT_MAX = float(os.getenv("PRICEPILOT_FETCH_TIMEOUT_MAX", "20"))
+
+
+def fetch_timeout(host: str, transport: str) -> float:
+    return LATENCY.timeout(f"fetch:{host}:{transport}", FETCH_TIMEOUT, FETCH_TIMEOUT_MIN, FETCH_TIMEOUT_MAX)
+
+
+def _timed(host: str, transport: str, started: float, r):
+    """(valid, text) for a response; valid latencies feed hedge_delay() and
+    fetch_timeout()."""
+    if _valid(r):
+        LATENCY.observe(f"fetch:{host}:{transport}", (time.monotonic() - started) * 1000)
+        return True, r.text
+    return False, r.text if r.status_code == 200 else ""
+
+
+def _timed_out(host: str, transport: str, started: float, timeout: float):
+    # Record a call that ran into its timeout at the time it was cut off.
+    elapsed = time.monotonic() - started
+    if elapsed >= timeout * 0.95:
+        LATENCY.observe(f"fetch:{host}:{transport}", elapsed * 1000)
+
+
+async def _afetch_impersonated(url: str, host: str, timeout=None) -> tuple:
+    timeout = timeout or fetch_timeout(host, "impersonate")
+    started = time.monotonic()
+    try:
+        r = await aimpersonated_get(url, impersonate="chrome124", timeout=timeout)
+    except Exception:
+        _timed_out(host, "impersonate", started, timeout)
+        raise
+    return _timed(host, "impersonate", started, r)
+
+
+async def _afetch_plain(url: str, host: str, referer: str, timeout=None) -> tuple:
+    timeout = timeout or fetch_timeout(host, "requests")
+    started = time.monotonic()
+    try:
+        r = await ahttp_get(url, headers=_plain_headers(referer), timeout=timeout)
+    except Exception:
+        _timed_out(host, "requests", started, timeout)
+        raise
+    return _timed(host, "requests", started, r)
+
+
+def _get_html(url: str, referer: str = "", timeout: float = None) -> str:
+    """Fetch HTML from a blocking caller: _aget_html on the shared fetch loop."""
+    return asyncio.run_coroutine_threadsafe(_aget_html(url, referer, timeout), _fetch_loop()).result()
+
+
+async def _aget_html(url: str, referer: str = "", timeout: float = None) -> str:
+    """Fetch HTML — try curl_cffi impersonation first, fall back to plain
+    HTTP (hedged: the fallback starts early if impersonation is slow, and
+    the losing request is cancelled). RateLimited is raised when the host
+    has no token for the first request."""
+    host = host_key(url)
+    if not (USE_IMPERSONATE and curl_requests):
+        return (await _afetch_plain(url, host, referer, timeout))[1]
+    _hedge_count("fetches")
+    if not HEDGE:
+        try:
+            valid, text = await _afetch_impersonated(url, host, timeout)
+            if valid:
+                return text
+        except RateLimited:
+            raise
+        except Exception:
+            pass
+        return (await _afetch_plain(url, host, referer, timeout))[1]
+
+    primary = asyncio.ensure_future(_afetch_impersonated(url, host, timeout))
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=hedge_delay(host))
+    except asyncio.CancelledError:
+        primary.cancel()
+        raise
+    if done:
+        try:
+            valid, text = primary.result()
+            if valid:
+                _hedge_count("primary_wins")
+                return text
+        except RateLimited:
+            raise
+        except Exception:
+            pass
+        return (await _afetch_plain(url, host, referer, timeout))[1]
+
+    _hedge_count("hedged")
+    fallback = asyncio.ensure_future(_afetch_plain(url, host, referer, timeout))
+    pending = {primary, fallback}
+    text = ""
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(
-                headless=True,
-                args=["--no-sandbox", "--disable-blink-features=AutomationControlled"],
-            )
-            ctx = browser.new_context(
-                user_agent=UA,
-                viewport={"width": 1366, "height": 768},
-                locale="en-IN",
-            )
-            page = ctx.new_page()
-            page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
-            if wait_for:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
                 try:
-                    page.wait_for_selector(wait_for, timeout=8000)
+                    valid, body = task.result()
                 except Exception:
-                    pass
-            else:
-                time.sleep(2)
-            html = page.content()
-            browser.close()
-            return html if len(html) > 500 else None
-    except Exception:
-        return None
+                    continue
+                if valid:
+                    _hedge_count("primary_wins" if task is primary else "fallback_wins")
+                    return body
+                if task is fallback:
+                    text = body
+    finally:
+        for task in pending:
+            task.cancel()
+    _hedge_count("no_valid")
+    return text
+
+
+HEADLESS_TIMEOUT_MIN_MS = float(os.getenv("PRICEPILOT_HEADLESS_TIMEOUT_MIN_MS", "6000"))
+HEADLESS_TIMEOUT_MAX_MS = float(os.getenv("PRICEPILOT_HEADLESS_TIMEOUT_MAX_MS", "30000"))
+
 
+# Headless renders block for tens of seconds and parses are CPU work, so
+# provider searches run both on their own bounded pool; asyncio.to_thread's
+# default pool stays free for short cache and database calls.
+PROVIDER_WORKERS = int(os.getenv("PRICEPILOT_PROVIDER_WORKERS", "8"))
+_WORK_POOL = None
+_WORK_POOL_LOCK = threading.Lock()
 
-def _jsonld_product(html: str, base_url: str, source: str) -> Optional[Dict]:
-    """Extract product data from JSON-LD structured data."""
+
+async def _run_work(fn, *args):
+    """fn(*args) on the provider work pool."""
+    global _WORK_POOL
+    with _WORK_POOL_LOCK:
+        if _WORK_POOL is None:
+            _WORK_POOL = ThreadPoolExecutor(max_workers=PROVIDER_WORKERS, thread_name_prefix="provider-work")
+        pool = _WORK_POOL
+    return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+
+
+def shutdown_work_pool():
+    """Stop the provider work pool; the next _run_work starts a new one."""
+    global _WORK_POOL
+    with _WORK_POOL_LOCK:
+        pool, _WORK_POOL = _WORK_POOL, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _headless_html(url: str, wait_for: str = "", timeout_ms: int = 15000) -> Optional[str]:
+    """Headless render through the shared browser pool — use when normal HTTP is blocked.
+    timeout_ms only applies until the host's render latency has been learned."""
+    if not ENABLE_HEADLESS or not BROWSER_POOL.available:
+        return None
+    key = f"headless:{host_key(url)}"
+    timeout_ms = 1000 * LATENCY.timeout(
+        key, timeout_ms / 1000, HEADLESS_TIMEOUT_MIN_MS / 1000, HEADLESS_TIMEOUT_MAX_MS / 1000
+    )
+    started = time.monotonic()
+    html = BROWSER_POOL.fetch(url, wait_for=wait_for, timeout_ms=timeout_ms)
+    elapsed_ms = (time.monotonic() - started) * 1000
+    if html or elapsed_ms >= timeout_ms * 0.95:
+        LATENCY.observe(key, elapsed_ms)
+    return html
+
+
+def _jsonld_product(html, base_url: str, source: str) -> Optional[Dict]:
+    """Extract product data from JSON-LD structured data. html may be a
+    Document from parse_html() so the caller's CSS path reuses the parse."""
     try:
-        soup = BeautifulSoup(html, "html.parser")
-        for tag in soup.find_all("script", {"type": "application/ld+json"}):
-            if not tag.string:
-                continue
-            try:
-                data = json.loads(tag.string)
-            except Exception:
-                continue
+        for data in parse_html(html).jsonld():
             nodes = data if isinstance(data, list) else [data]
             for node in nodes:
                 if not isinstance(node, dict):
@@ -148,256 +451,344 @@ def _jsonld_product(html: str, base_url: str, source: str) -> Optional[Dict]:
     return None
 
 
-# ─── Amazon ───────────────────────────────────────────────────────────────────
+# ─── provider specs ───────────────────────────────────────────────────────────
+# Fetching and parsing are split: the asearch_* functions fetch on the
+# event loop and run the parse_* functions on the provider work pool.
+# A parser returns None when the page holds no result, which triggers the
+# headless fallback (or the provider's error result).
+
+class Provider(NamedTuple):
+    name: str
+    search_url: str
+    referer: str
+    parse: Callable[[str], Optional[Dict]]
+    wait_for: str
+    error: str
+    headless_first: bool = False
+    timeout_ms: int = 15000
+
+
+def _search_url(provider: Provider, query: str) -> str:
+    return provider.search_url.format(
+        q=requests.utils.quote(query),
+        slug=requests.utils.quote(query.replace(" ", "-")),
+    )
 
-def search_amazon(query: str) -> Dict:
-    url = f"https://www.amazon.in/s?k={requests.utils.quote(query)}&ref=nb_sb_noss"
+
+async def _asearch(provider: Provider, query: str) -> Dict:
+    """Search provider for query on the event loop: HTTP through the loop's
+    AsyncSession; parsing and Playwright run on the provider work pool so the loop never blocks."""
+    url = _search_url(provider, query)
     try:
-        html = _get_html(url, referer="https://www.amazon.in/")
-        soup = BeautifulSoup(html, "html.parser")
-        item = soup.select_one("div[data-component-type='s-search-result']")
-        if not item:
-            # Try headless
-            html = _headless_html(url, wait_for="div[data-component-type='s-search-result']") or ""
-            soup = BeautifulSoup(html, "html.parser")
-            item = soup.select_one("div[data-component-type='s-search-result']")
-        if not item:
-            return _result("Amazon", error="Blocked or no results")
-
-        title_el = item.select_one("h2 .a-link-normal span") or item.select_one("h2 span")
-        price_el = item.select_one(".a-price .a-offscreen") or item.select_one(".a-price-whole")
-        img_el = item.select_one("img.s-image")
-        link_el = item.select_one("h2 a.a-link-normal")
-        rating_el = item.select_one("span.a-icon-alt")
-
-        link = ("https://www.amazon.in" + link_el["href"]) if link_el and link_el.get("href") else ""
-        price_raw = price_el.get_text(strip=True) if price_el else None
-
-        return _result(
-            "Amazon",
-            title=title_el.get_text(strip=True) if title_el else None,
-            price=_norm_price(price_raw),
-            image=img_el.get("src") if img_el else None,
-            url=link,
-            rating=rating_el.get_text(strip=True).split()[0] if rating_el else None,
-            availability="In Stock",
-        )
+        html = None
+        if provider.headless_first:
+            html = await _run_work(_headless_html, url, provider.wait_for, provider.timeout_ms)
+        if not html:
+            html = await _aget_html(url, referer=provider.referer)
+        result = await _run_work(provider.parse, html or "")
+        if result is None and not provider.headless_first:
+            html = await _run_work(_headless_html, url, provider.wait_for, provider.timeout_ms) or ""
+            result = await _run_work(provider.parse, html)
+        return result or _result(provider.name, error=provider.error)
+    except RateLimited:
+        raise
     except Exception as e:
-        return _result("Amazon", error=str(e))
+        return _result(provider.name, error=str(e))
+
+
+# ─── Amazon ───────────────────────────────────────────────────────────────────
+
+def parse_amazon(html: str) -> Optional[Dict]:
+    soup = parse_html(html)
+    item = soup.select_one("div[data-component-type='s-search-result']")
+    if not item:
+        return None
+
+    title_el = item.select_one("h2 .a-link-normal span") or item.select_one("h2 span")
+    price_el = item.select_one(".a-price .a-offscreen") or item.select_one(".a-price-whole")
+    img_el = item.select_one("img.s-image")
+    link_el = item.select_one("h2 a.a-link-normal")
+    rating_el = item.select_one("span.a-icon-alt")
+
+    link = ("https://www.amazon.in" + link_el["href"]) if link_el and link_el.get("href") else ""
+    price_raw = price_el.get_text(strip=True) if price_el else None
+
+    return _result(
+        "Amazon",
+        title=title_el.get_text(strip=True) if title_el else None,
+        price=_norm_price(price_raw),
+        image=img_el.get("src") if img_el else None,
+        url=link,
+        rating=rating_el.get_text(strip=True).split()[0] if rating_el else None,
+        availability="In Stock",
+    )
+
+
+AMAZON = Provider(
+    name="Amazon",
+    search_url="https://www.amazon.in/s?k={q}&ref=nb_sb_noss",
+    referer="https://www.amazon.in/",
+    parse=parse_amazon,
+    wait_for="div[data-component-type='s-search-result']",
+    error="Blocked or no results",
+)
 
 
 # ─── Flipkart ─────────────────────────────────────────────────────────────────
 
-def search_flipkart(query: str) -> Dict:
-    url = f"https://www.flipkart.com/search?q={requests.utils.quote(query)}&sort=relevance"
-    try:
-        html = _get_html(url, referer="https://www.flipkart.com/")
-        soup = BeautifulSoup(html, "html.parser")
-
-        # Try JSON-LD first
-        jld = _jsonld_product(html, "https://www.flipkart.com", "Flipkart")
-        if jld and jld.get("title") != "Unavailable":
-            return jld
-
-        # Multiple selector variants Flipkart uses
-        item = (
-            soup.select_one("a[href*='/p/']") or
-            soup.select_one("div._1AtVbE a") or
-            soup.select_one("div.tUxRFH") or
-            soup.select_one("div._2kHMtA")
-        )
-
-        if not item:
-            html = _headless_html(url, wait_for="div._1AtVbE") or ""
-            soup = BeautifulSoup(html, "html.parser")
-            item = (
-                soup.select_one("a[href*='/p/']") or
-                soup.select_one("div._1AtVbE a")
-            )
-
-        if not item:
-            return _result("Flipkart", error="No results or JS-blocked")
-
-        title_el = soup.select_one("div._4rR01T") or soup.select_one("a.s1Q9rs") or soup.select_one("div.KzDlHZ")
-        price_el = soup.select_one("div._30jeq3") or soup.select_one("div.Nx9bqj")
-        img_el = soup.select_one("img._396cs4") or soup.select_one("img._2r_T1I") or soup.select_one("img.DByuf4")
-        rating_el = soup.select_one("div._3LWZlK") or soup.select_one("span.Y1HWO0")
-        href = item.get("href", "") if hasattr(item, "get") else ""
-        link = ("https://www.flipkart.com" + href) if href.startswith("/") else href
-
-        return _result(
-            "Flipkart",
-            title=title_el.get_text(strip=True) if title_el else None,
-            price=_norm_price(price_el.get_text(strip=True) if price_el else None),
-            image=img_el.get("src") if img_el else None,
-            url=link,
-            rating=rating_el.get_text(strip=True) if rating_el else None,
-            availability="In Stock",
-        )
-    except Exception as e:
-        return _result("Flipkart", error=str(e))
+def parse_flipkart(html: str) -> Optional[Dict]:
+    soup = parse_html(html)
+    # Try JSON-LD first
+    jld = _jsonld_product(soup, "https://www.flipkart.com", "Flipkart")
+    if jld and jld.get("title") != "Unavailable":
+        return jld
+
+    # Multiple selector variants Flipkart uses
+    item = (
+        soup.select_one("a[href*='/p/']") or
+        soup.select_one("div._1AtVbE a") or
+        soup.select_one("div.tUxRFH") or
+        soup.select_one("div._2kHMtA")
+    )
+    if not item:
+        return None
+
+    title_el = soup.select_one("div._4rR01T") or soup.select_one("a.s1Q9rs") or soup.select_one("div.KzDlHZ")
+    price_el = soup.select_one("div._30jeq3") or soup.select_one("div.Nx9bqj")
+    img_el = soup.select_one("img._396cs4") or soup.select_one("img._2r_T1I") or soup.select_one("img.DByuf4")
+    rating_el = soup.select_one("div._3LWZlK") or soup.select_one("span.Y1HWO0")
+    href = item.get("href", "")
+    link = ("https://www.flipkart.com" + href) if href.startswith("/") else href
+
+    return _result(
+        "Flipkart",
+        title=title_el.get_text(strip=True) if title_el else None,
+        price=_norm_price(price_el.get_text(strip=True) if price_el else None),
+        image=img_el.get("src") if img_el else None,
+        url=link,
+        rating=rating_el.get_text(strip=True) if rating_el else None,
+        availability="In Stock",
+    )
+
+
+FLIPKART = Provider(
+    name="Flipkart",
+    search_url="https://www.flipkart.com/search?q={q}&sort=relevance",
+    referer="https://www.flipkart.com/",
+    parse=parse_flipkart,
+    wait_for="div._1AtVbE",
+    error="No results or JS-blocked",
+)
 
 
 # ─── Ajio ─────────────────────────────────────────────────────────────────────
 
-def search_ajio(query: str) -> Dict:
-    url = f"https://www.ajio.com/search/?text={requests.utils.quote(query)}"
-    try:
-        # Ajio requires headless — it's a React SPA
-        html = _headless_html(url, wait_for=".item", timeout_ms=18000)
-        if not html:
-            html = _get_html(url, referer="https://www.ajio.com/")
-
-        jld = _jsonld_product(html or "", "https://www.ajio.com", "Ajio")
-        if jld and jld.get("title") != "Unavailable":
-            return jld
-
-        soup = BeautifulSoup(html or "", "html.parser")
-        item = (
-            soup.select_one("div.item") or
-            soup.select_one("div.preview-inner-container") or
-            soup.select_one("li.preview-item")
-        )
-        if not item:
-            return _result("Ajio", error="Login/JS wall")
-
-        title_el = item.select_one(".nameCls") or item.select_one(".name") or item.select_one(".brand")
-        price_el = item.select_one(".price") or item.select_one(".final-price") or item.select_one(".priceCol")
-        img_el = item.select_one("img")
-        link_el = item.select_one("a")
-        href = link_el.get("href", "") if link_el else ""
-        link = ("https://www.ajio.com" + href) if href.startswith("/") else href
-
-        return _result(
-            "Ajio",
-            title=title_el.get_text(strip=True) if title_el else None,
-            price=_norm_price(price_el.get_text(strip=True) if price_el else None),
-            image=img_el.get("src") if img_el else None,
-            url=link,
-            availability="In Stock",
-        )
-    except Exception as e:
-        return _result("Ajio", error=str(e))
+def parse_ajio(html: str) -> Optional[Dict]:
+    soup = parse_html(html)
+    jld = _jsonld_product(soup, "https://www.ajio.com", "Ajio")
+    if jld and jld.get("title") != "Unavailable":
+        return jld
+
+    item = (
+        soup.select_one("div.item") or
+        soup.select_one("div.preview-inner-container") or
+        soup.select_one("li.preview-item")
+    )
+    if not item:
+        return None
+
+    title_el = item.select_one(".nameCls") or item.select_one(".name") or item.select_one(".brand")
+    price_el = item.select_one(".price") or item.select_one(".final-price") or item.select_one(".priceCol")
+    img_el = item.select_one("img")
+    link_el = item.select_one("a")
+    href = link_el.get("href", "") if link_el else ""
+    link = ("https://www.ajio.com" + href) if href.startswith("/") else href
+
+    return _result(
+        "Ajio",
+        title=title_el.get_text(strip=True) if title_el else None,
+        price=_norm_price(price_el.get_text(strip=True) if price_el else None),
+        image=img_el.get("src") if img_el else None,
+        url=link,
+        availability="In Stock",
+    )
+
+
+# Ajio is a React SPA, so headless goes first.
+AJIO = Provider(
+    name="Ajio",
+    search_url="https://www.ajio.com/search/?text={q}",
+    referer="https://www.ajio.com/",
+    parse=parse_ajio,
+    wait_for=".item",
+    error="Login/JS wall",
+    headless_first=True,
+    timeout_ms=18000,
+)
 
 
 # ─── Snapdeal ─────────────────────────────────────────────────────────────────
 
-def search_snapdeal(query: str) -> Dict:
-    url = f"https://www.snapdeal.com/search?keyword={requests.utils.quote(query)}&sort=rlvncy"
-    try:
-        html = _get_html(url, referer="https://www.snapdeal.com/")
-        soup = BeautifulSoup(html, "html.parser")
-
-        item = soup.select_one(".product-tuple-listing") or soup.select_one("li.product-item")
-        if not item:
-            html = _headless_html(url, wait_for=".product-tuple-listing") or ""
-            soup = BeautifulSoup(html, "html.parser")
-            item = soup.select_one(".product-tuple-listing") or soup.select_one("li.product-item")
-
-        if not item:
-            return _result("Snapdeal", error="No results")
-
-        title_el = item.select_one(".product-title")
-        price_el = item.select_one(".product-price") or item.select_one(".lfloat .product-price")
-        img_el = item.select_one("img.product-image") or item.select_one("img.product-img")
-        link_el = item.select_one("a.dp-widget-link") or item.select_one("a")
-
-        return _result(
-            "Snapdeal",
-            title=title_el.get_text(strip=True) if title_el else None,
-            price=_norm_price(price_el.get_text(strip=True) if price_el else None),
-            image=img_el.get("src") if img_el else None,
-            url=link_el.get("href") if link_el else None,
-            availability="In Stock",
-        )
-    except Exception as e:
-        return _result("Snapdeal", error=str(e))
+def parse_snapdeal(html: str) -> Optional[Dict]:
+    soup = parse_html(html)
+    item = soup.select_one(".product-tuple-listing") or soup.select_one("li.product-item")
+    if not item:
+        return None
+
+    title_el = item.select_one(".product-title")
+    price_el = item.select_one(".product-price") or item.select_one(".lfloat .product-price")
+    img_el = item.select_one("img.product-image") or item.select_one("img.product-img")
+    link_el = item.select_one("a.dp-widget-link") or item.select_one("a")
+
+    return _result(
+        "Snapdeal",
+        title=title_el.get_text(strip=True) if title_el else None,
+        price=_norm_price(price_el.get_text(strip=True) if price_el else None),
+        image=img_el.get("src") if img_el else None,
+        url=link_el.get("href") if link_el else None,
+        availability="In Stock",
+    )
+
+
+SNAPDEAL = Provider(
+    name="Snapdeal",
+    search_url="https://www.snapdeal.com/search?keyword={q}&sort=rlvncy",
+    referer="https://www.snapdeal.com/",
+    parse=parse_snapdeal,
+    wait_for=".product-tuple-listing",
+    error="No results",
+)
 
 
 # ─── Croma ────────────────────────────────────────────────────────────────────
 
-def search_croma(query: str) -> Dict:
-    url = f"https://www.croma.com/search/?text={requests.utils.quote(query)}"
-    try:
-        html = _get_html(url, referer="https://www.croma.com/")
-        soup = BeautifulSoup(html, "html.parser")
-        item = soup.select_one("li.product-item") or soup.select_one("div.product-item")
-
-        if not item:
-            html = _headless_html(url, wait_for="li.product-item", timeout_ms=18000) or ""
-            soup = BeautifulSoup(html, "html.parser")
-            item = soup.select_one("li.product-item") or soup.select_one("div.product-item")
-
-        jld = _jsonld_product(html, "https://www.croma.com", "Croma")
-        if jld and jld.get("title") != "Unavailable":
-            return jld
-
-        if not item:
-            return _result("Croma", error="JS-rendered, no data extracted")
-
-        title_el = item.select_one("h3.product-title") or item.select_one("a.product-title") or item.find("h3")
-        price_el = (
-            item.select_one("span.amount") or
-            item.select_one("span.new-price") or
-            item.select_one("[class*='price']")
-        )
-        img_el = item.find("img")
-        link_el = item.select_one("a")
-        href = link_el.get("href", "") if link_el else ""
-        link = ("https://www.croma.com" + href) if href.startswith("/") else href
-
-        return _result(
-            "Croma",
-            title=title_el.get_text(strip=True) if title_el else None,
-            price=_norm_price(price_el.get_text(strip=True) if price_el else None),
-            image=img_el.get("src") if img_el else None,
-            url=link,
-            availability="In Stock",
-        )
-    except Exception as e:
-        return _result("Croma", error=str(e))
+def parse_croma(html: str) -> Optional[Dict]:
+    soup = parse_html(html)
+    jld = _jsonld_product(soup, "https://www.croma.com", "Croma")
+    if jld and jld.get("title") != "Unavailable":
+        return jld
+
+    item = soup.select_one("li.product-item") or soup.select_one("div.product-item")
+    if not item:
+        return None
+
+    title_el = item.select_one("h3.product-title") or item.select_one("a.product-title") or item.select_one("h3")
+    price_el = (
+        item.select_one("span.amount") or
+        item.select_one("span.new-price") or
+        item.select_one("[class*='price']")
+    )
+    img_el = item.select_one("img")
+    link_el = item.select_one("a")
+    href = link_el.get("href", "") if link_el else ""
+    link = ("https://www.croma.com" + href) if href.startswith("/") else href
+
+    return _result(
+        "Croma",
+        title=title_el.get_text(strip=True) if title_el else None,
+        price=_norm_price(price_el.get_text(strip=True) if price_el else None),
+        image=img_el.get("src") if img_el else None,
+        url=link,
+        availability="In Stock",
+    )
+
+
+CROMA = Provider(
+    name="Croma",
+    search_url="https://www.croma.com/search/?text={q}",
+    referer="https://www.croma.com/",
+    parse=parse_croma,
+    wait_for="li.product-item",
+    error="JS-rendered, no data extracted",
+    timeout_ms=18000,
+)
 
 
 # ─── Myntra ───────────────────────────────────────────────────────────────────
 
-def search_myntra(query: str) -> Dict:
-    url = f"https://www.myntra.com/{requests.utils.quote(query.replace(' ', '-'))}?rawQuery={requests.utils.quote(query)}"
-    try:
-        # Myntra is fully React — needs headless
-        html = _headless_html(url, wait_for="li.product-base", timeout_ms=18000)
-        if not html:
-            html = _get_html(url, referer="https://www.myntra.com/")
-
-        soup = BeautifulSoup(html or "", "html.parser")
-        item = soup.select_one("li.product-base")
-
-        if not item:
-            return _result("Myntra", error="JS-rendered, no results")
-
-        brand_el = item.select_one("h3.product-brand")
-        name_el = item.select_one("h4.product-product")
-        price_el = item.select_one("span.product-discountedPrice") or item.select_one("span.product-price")
-        img_el = item.select_one("img.img-responsive") or item.select_one("img")
-        link_el = item.select_one("a")
-
-        title = None
-        if brand_el and name_el:
-            title = f"{brand_el.get_text(strip=True)} {name_el.get_text(strip=True)}"
-        elif name_el:
-            title = name_el.get_text(strip=True)
-        elif brand_el:
-            title = brand_el.get_text(strip=True)
-
-        href = link_el.get("href", "") if link_el else ""
-        link = ("https://www.myntra.com/" + href.lstrip("/")) if href and not href.startswith("http") else href
-
-        return _result(
-            "Myntra",
-            title=title,
-            price=_norm_price(price_el.get_text(strip=True) if price_el else None),
-            image=img_el.get("src") if img_el else None,
-            url=link,
-            availability="In Stock",
-        )
-    except Exception as e:
-        return _result("Myntra", error=str(e))
+def parse_myntra(html: str) -> Optional[Dict]:
+    soup = parse_html(html)
+    item = soup.select_one("li.product-base")
+    if not item:
+        return None
+
+    brand_el = item.select_one("h3.product-brand")
+    name_el = item.select_one("h4.product-product")
+    price_el = item.select_one("span.product-discountedPrice") or item.select_one("span.product-price")
+    img_el = item.select_one("img.img-responsive") or item.select_one("img")
+    link_el = item.select_one("a")
+
+    title = None
+    if brand_el and name_el:
+        title = f"{brand_el.get_text(strip=True)} {name_el.get_text(strip=True)}"
+    elif name_el:
+        title = name_el.get_text(strip=True)
+    elif brand_el:
+        title = brand_el.get_text(strip=True)
+
+    href = link_el.get("href", "") if link_el else ""
+    link = ("https://www.myntra.com/" + href.lstrip("/")) if href and not href.startswith("http") else href
+
+    return _result(
+        "Myntra",
+        title=title,
+        price=_norm_price(price_el.get_text(strip=True) if price_el else None),
+        image=img_el.get("src") if img_el else None,
+        url=link,
+        availability="In Stock",
+    )
+
+
+# Myntra is fully React, so headless goes first.
+MYNTRA = Provider(
+    name="Myntra",
+    search_url="https://www.myntra.com/{slug}?rawQuery={q}",
+    referer="https://www.myntra.com/",
+    parse=parse_myntra,
+    wait_for="li.product-base",
+    error="JS-rendered, no results",
+    headless_first=True,
+    timeout_ms=18000,
+)
+
+
+# ─── search entry points ──────────────────────────────────────────────────────
+
+@cached_provider("Amazon")
+async def asearch_amazon(query: str) -> Dict:
+    return await _asearch(AMAZON, query)
+
+
+@cached_provider("Flipkart")
+async def asearch_flipkart(query: str) -> Dict:
+    return await _asearch(FLIPKART, query)
+
+
+@cached_provider("Ajio")
+async def asearch_ajio(query: str) -> Dict:
+    return await _asearch(AJIO, query)
+
+
+@cached_provider("Snapdeal")
+async def asearch_snapdeal(query: str) -> Dict:
+    return await _asearch(SNAPDEAL, query)
+
+
+@cached_provider("Croma")
+async def asearch_croma(query: str) -> Dict:
+    return await _asearch(CROMA, query)
+
+
+@cached_provider("Myntra")
+async def asearch_myntra(query: str) -> Dict:
+    return await _asearch(MYNTRA, query)
+
+
+ASYNC_SEARCHES = [
+    ("Amazon", asearch_amazon),
+    ("Flipkart", asearch_flipkart),
+    ("Ajio", asearch_ajio),
+    ("Snapdeal", asearch_snapdeal),
+    ("Croma", asearch_croma),
+    ("Myntra", asearch_myntra),
+]
@@ -0,0 +1,218 @@
+import asyncio
+import os
+import threading
+import weakref
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .scheduler import HOST_LIMITER
+
+try:
+    from curl_cffi import requests as curl_requests
+    from curl_cffi import CurlHttpVersion, CurlInfo, CurlOpt
+except Exception:
+    curl_requests = None
+
+# ===================== CONFIG =====================
+
+# requests keeps one urllib3 pool per host; POOL_HOSTS is how many host pools
+# stay open and POOL_SIZE how many idle keep-alive connections each keeps.
+POOL_HOSTS = int(os.getenv("PRICEPILOT_HTTP_POOL_HOSTS", "32"))
+POOL_SIZE = int(os.getenv("PRICEPILOT_HTTP_POOL_SIZE", "10"))
+# curl_cffi handles are not thread-safe, so each thread gets its own session;
+# CURL_MAX_CONNECTS bounds the connections each handle keeps alive.
+CURL_MAX_CONNECTS = int(os.getenv("PRICEPILOT_CURL_MAX_CONNECTS", "16"))
+# Concurrent transfers per event loop's AsyncSession.
+ASYNC_MAX_CLIENTS = int(os.getenv("PRICEPILOT_ASYNC_MAX_CLIENTS", "64"))
+HTTP2 = os.getenv("PRICEPILOT_HTTP2", "true").lower() != "false"
+DEFAULT_IMPERSONATE = "chrome124"
+
+_lock = threading.Lock()
+_local = threading.local()
+_requests_session = None
+_adapter = None
+_curl_sessions = []
+# AsyncSessions are bound to the event loop that created them.
+_async_sessions = weakref.WeakKeyDictionary()
+_curl_stats = {"requests": 0, "new_connections": 0, "errors": 0}
+
+
+# ===================== SESSIONS =====================
+
+def requests_session() -> requests.Session:
+    """Process-wide requests.Session with pooled keep-alive connections."""
+    global _requests_session, _adapter
+    if _requests_session is None:
+        with _lock:
+            if _requests_session is None:
+                adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_SIZE)
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _adapter = adapter
+                _requests_session = session
+    return _requests_session
+
+
+def curl_session(impersonate: str = DEFAULT_IMPERSONATE):
+    """This thread's curl_cffi Session for a browser profile, or None when
+    curl_cffi is not installed. HTTP/2 is negotiated unless disabled."""
+    if curl_requests is None:
+        return None
+    sessions = getattr(_local, "curl", None)
+    if sessions is None:
+        sessions = _local.curl = {}
+    session = sessions.get(impersonate)
+    if session is None:
+        session = curl_requests.Session(
+            impersonate=impersonate,
+            http_version=CurlHttpVersion.V2TLS if HTTP2 else CurlHttpVersion.V1_1,
+            curl_options={CurlOpt.MAXCONNECTS: CURL_MAX_CONNECTS},
+            curl_infos=[CurlInfo.NUM_CONNECTS],
+        )
+        sessions[impersonate] = session
+        with _lock:
+            _curl_sessions.append(session)
+    return session
+
+
+def http_get(url: str, headers=None, timeout: float = 10, **kwargs):
+    """GET through the shared requests session, within the host's rate."""
+    HOST_LIMITER.acquire(url)
+    return requests_session().get(url, headers=headers, timeout=timeout, **kwargs)
+
+
+def impersonated_get(url: str, impersonate: str = DEFAULT_IMPERSONATE, timeout: float = 10, **kwargs):
+    """GET through this thread's curl_cffi session (browser TLS fingerprint)."""
+    session = curl_session(impersonate)
+    if session is None:
+        raise RuntimeError("curl_cffi is not installed")
+    HOST_LIMITER.acquire(url)
+    try:
+        resp = session.get(url, timeout=timeout, **kwargs)
+    except Exception:
+        _count_curl(error=True)
+        raise
+    _count_curl(new_connections=resp.infos.get(CurlInfo.NUM_CONNECTS, 0))
+    return resp
+
+
+def async_curl_session(impersonate: Optional[str] = DEFAULT_IMPERSONATE):
+    """The running loop's curl_cffi AsyncSession for a browser profile
+    (None = plain curl, caller supplies headers), or None without curl_cffi.
+    One AsyncSession multiplexes every concurrent request on the loop."""
+    if curl_requests is None:
+        return None
+    loop = asyncio.get_running_loop()
+    sessions = _async_sessions.setdefault(loop, {})
+    session = sessions.get(impersonate)
+    if session is None:
+        session = curl_requests.AsyncSession(
+            impersonate=impersonate,
+            default_headers=impersonate is not None,
+            max_clients=ASYNC_MAX_CLIENTS,
+            http_version=CurlHttpVersion.V2TLS if HTTP2 else CurlHttpVersion.V1_1,
+            curl_options={CurlOpt.MAXCONNECTS: CURL_MAX_CONNECTS},
+            curl_infos=[CurlInfo.NUM_CONNECTS],
+        )
+        sessions[impersonate] = session
+    return session
+
+
+async def ahttp_get(url: str, headers=None, timeout: float = 10, **kwargs):
+    """Async GET with the caller's headers and no browser fingerprint."""
+    session = async_curl_session(None)
+    if session is None:
+        return await asyncio.to_thread(http_get, url, headers=headers, timeout=timeout, **kwargs)
+    return await _acurl_get(session, url, headers=headers, timeout=timeout, **kwargs)
+
+
+async def aimpersonated_get(url: str, impersonate: str = DEFAULT_IMPERSONATE, timeout: float = 10, **kwargs):
+    """Async GET through the running loop's impersonating AsyncSession."""
+    session = async_curl_session(impersonate)
+    if session is None:
+        raise RuntimeError("curl_cffi is not installed")
+    return await _acurl_get(session, url, timeout=timeout, **kwargs)
+
+
+async def _acurl_get(session, url, **kwargs):
+    await HOST_LIMITER.aacquire(url)
+    try:
+        resp = await session.get(url, **kwargs)
+    except Exception:
+        _count_curl(error=True)
+        raise
+    _count_curl(new_connections=resp.infos.get(CurlInfo.NUM_CONNECTS, 0))
+    return resp
+
+
+def _count_curl(new_connections: int = 0, error: bool = False):
+    with _lock:
+        _curl_stats["requests"] += 1
+        _curl_stats["new_connections"] += new_connections
+        if error:
+            _curl_stats["errors"] += 1
+
+
+async def aclose_sessions():
+    """Close the running loop's AsyncSessions."""
+    sessions = _async_sessions.pop(asyncio.get_running_loop(), {})
+    for s in sessions.values():
+        try:
+            await s.close()
+        except Exception:
+            pass
+
+
+def close_sessions():
+    global _requests_session, _adapter
+    with _lock:
+        sessions, _curl_sessions[:] = list(_curl_sessions), []
+        session, _requests_session, _adapter = _requests_session, None, None
+    for s in sessions:
+        try:
+            s.close()
+        except Exception:
+            pass
+    if session is not None:
+        session.close()
+    _local.__dict__.clear()
+
+
+def session_stats() -> dict:
+    """Requests sent vs. connections opened; the difference went over an
+    already-open keep-alive connection and skipped the TCP+TLS handshake."""
+    hosts = []
+    if _adapter is not None:
+        pools = _adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            hosts.append({
+                "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+                "requests": pool.num_requests,
+                "new_connections": pool.num_connections,
+                "reused": pool.num_requests - pool.num_connections,
+                "idle": pool.pool.qsize() if pool.pool is not None else 0,
+            })
+    with _lock:
+        curl = dict(_curl_stats)
+        curl["sessions"] = len(_curl_sessions)
+        curl["async_sessions"] = sum(len(v) for v in list(_async_sessions.values()))
+    curl["reused"] = max(curl["requests"] - curl["errors"] - curl["new_connections"], 0)
+    total_requests = sum(h["requests"] for h in hosts)
+    total_new = sum(h["new_connections"] for h in hosts)
+    return {
+        "requests": {
+            "requests": total_requests,
+            "new_connections": total_new,
+            "reused": total_requests - total_new,
+            "pool_hosts": POOL_HOSTS,
+            "pool_size": POOL_SIZE,
+            "hosts": hosts,
+        },
+        "curl": {**curl, "http2": HTTP2, "max_connects": CURL_MAX_CONNECTS},
+    }
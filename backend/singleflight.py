@@ -0,0 +1,113 @@
+import asyncio
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight block until it finishes and receive the same result (or
+    exception). Nothing is cached once the call completes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {"executed": 0, "shared": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats["executed"] += 1
+            else:
+                call.waiters += 1
+                self._stats["shared"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def in_flight(self, key) -> bool:
+        with self._lock:
+            return key in self._calls
+
+    def stats(self) -> dict:
+        with self._lock:
+            data = dict(self._stats)
+            data["in_flight"] = len(self._calls)
+            data["waiting"] = sum(c.waiters for c in self._calls.values())
+        return data
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines on one event loop.
+
+    The first caller's coroutine runs as a task that every caller awaits
+    through asyncio.shield, so a caller that disconnects does not cancel the
+    fetch the others are waiting on.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self._waiters = {}
+        self._stats = {"executed": 0, "shared": 0}
+
+    async def do(self, key, fn, *args, **kwargs):
+        return await asyncio.shield(self.start(key, fn, *args, **kwargs))
+
+    def start(self, key, fn, *args, **kwargs) -> asyncio.Task:
+        """The task running fn for key, started now unless one already is.
+        It runs to completion whether or not anyone awaits it."""
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._tasks[key] = task
+            self._waiters[key] = 0
+            self._stats["executed"] += 1
+            task.add_done_callback(lambda t, key=key: self._done(key, t))
+        else:
+            self._waiters[key] += 1
+            self._stats["shared"] += 1
+        return task
+
+    def _done(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+            self._waiters.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # retrieved, so an unawaited failure is not logged
+
+    def in_flight(self, key) -> bool:
+        return key in self._tasks
+
+    def stats(self) -> dict:
+        data = dict(self._stats)
+        data["in_flight"] = len(self._tasks)
+        data["waiting"] = sum(self._waiters.values())
+        return data
@@ -1,5 +1,6 @@
+from .dom import parse_html
+from .scheduler import RateLimited
 from .search_providers import _get_html, _headless_html, _norm_price, _jsonld_product
-from bs4 import BeautifulSoup
 
 def fetch_snapdeal_product(url: str):
     try:
@@ -7,7 +8,8 @@ def fetch_snapdeal_product(url: str):
         if len(html) < 2000:
             html = _headless_html(url, wait_for="h1.pdp-e-i-head") or html
             
-        jld = _jsonld_product(html, "https://www.snapdeal.com", "Snapdeal")
+        soup = parse_html(html)
+        jld = _jsonld_product(soup, "https://www.snapdeal.com", "Snapdeal")
         if jld and jld.get("title") != "Unavailable":
             return {
                 "title": jld["title"],
@@ -16,8 +18,6 @@ def fetch_snapdeal_product(url: str):
                 "source": "Snapdeal Scraper"
             }
 
-        soup = BeautifulSoup(html, "html.parser")
-        
         # PDP selectors
         title_el = soup.select_one("h1.pdp-e-i-head") or soup.select_one(".pdp-product-title")
         title = title_el.get_text(strip=True) if title_el else "Unavailable"
@@ -35,6 +35,8 @@ def fetch_snapdeal_product(url: str):
             "source": "Snapdeal Scraper"
         }
 
+    except RateLimited:
+        raise
     except Exception as e:
         return {
             "title": "Unavailable",
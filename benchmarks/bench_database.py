@@ -0,0 +1,64 @@
+"""Requests/second on the DB-bound endpoints, pooled vs. connect-per-call.
+
+Usage: python -m benchmarks.bench_database [--requests 2000] [--concurrency 8]
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("PRICEPILOT_DB", os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from backend import database  # noqa: E402
+from backend.main import app  # noqa: E402
+
+URLS = [f"https://www.example.com/product/{i}" for i in range(50)]
+
+
+def _compare(client, i):
+    url = URLS[i % len(URLS)]
+    r = client.post(
+        "/compare-advanced",
+        json={"url": url, "title": "Bench Product", "price": str(1000 + i % 97)},
+    )
+    r.raise_for_status()
+
+
+def _history(client, i):
+    r = client.get("/price-history", params={"product_url": URLS[i % len(URLS)]})
+    r.raise_for_status()
+
+
+def run(fn, total, concurrency):
+    client = TestClient(app)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        list(ex.map(lambda i: fn(client, i), range(total)))
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"db={database.DB_NAME} requests={args.requests} concurrency={args.concurrency}")
+    for label, fn in [("POST /compare-advanced", _compare), ("GET /price-history", _history)]:
+        rates = {}
+        for pooled in (False, True):
+            database.DB_POOL = pooled
+            database.close_connections()
+            rates[pooled] = run(fn, args.requests, args.concurrency)
+        gain = (rates[True] / rates[False] - 1) * 100
+        print(
+            f"{label:24s} per-call={rates[False]:8.1f} req/s  "
+            f"pooled={rates[True]:8.1f} req/s  ({gain:+.0f}%)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Parse cost per page for each installed HTML parser engine.
+
+Runs the provider parsers (JSON-LD plus CSS selectors, sharing one parse)
+over saved pages and compares them with the old path, which built a
+BeautifulSoup html.parser tree for each step.
+
+Pages are read from benchmarks/data/pages/*.html (save search result pages
+from the browser there) or from the paths given; without any, a synthetic
+~1 MB Amazon-style result page is used.
+
+Usage: python -m benchmarks.bench_html_parser [page.html ...] [--rounds 5]
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+from backend import dom
+from backend import search_providers as sp
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), "data", "pages")
+
+CARD = """
+<div data-component-type="s-search-result" data-asin="B0{i:08d}" class="s-result-item">
+  <div class="sg-col-inner"><div class="a-section">
+    <h2><a class="a-link-normal" href="/dp/B0{i:08d}"><span>Product {i} with a long descriptive title</span></a></h2>
+    <span class="a-price"><span class="a-offscreen">&#8377;{price:,}</span></span>
+    <img class="s-image" src="https://m.media-amazon.com/images/I/{i}.jpg" alt="">
+    <span class="a-icon-alt">4.{r} out of 5 stars</span>
+    <ul>{bullets}</ul>
+  </div></div>
+</div>
+"""
+
+
+def synthetic_page(cards=120, script_kb=600):
+    bullets = "".join(f"<li><span class='a-list-item'>Feature {j}</span></li>" for j in range(40))
+    body = "".join(CARD.format(i=i, price=1000 + 37 * i, r=i % 10, bullets=bullets) for i in range(cards))
+    state = json.dumps({"items": ["x" * 64] * (script_kb * 16)})
+    jsonld = json.dumps({"@type": "ItemList", "itemListElement": [{"position": i} for i in range(cards)]})
+    return (
+        "<html><head><title>Results</title>"
+        f"<script>window.__STATE__ = {state};</script>"
+        f'<script type="application/ld+json">{jsonld}</script>'
+        f"</head><body>{body}</body></html>"
+    )
+
+
+def scrape(html, engine, shared):
+    """JSON-LD then CSS selectors, as parse_flipkart/parse_croma do. Unshared
+    is the old behaviour: each step builds its own tree."""
+    dom.ENGINE = engine
+    doc = dom.parse_html(html) if shared else html
+    sp._jsonld_product(doc, "https://www.amazon.in", "Amazon")
+    sp.parse_amazon(doc)
+
+
+def timed(fn, pages, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for html in pages:
+            fn(html)
+    return (time.perf_counter() - start) / (rounds * len(pages)) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("pages", nargs="*")
+    ap.add_argument("--rounds", type=int, default=5)
+    args = ap.parse_args()
+
+    paths = args.pages or sorted(glob.glob(os.path.join(PAGES_DIR, "*.html")))
+    if paths:
+        pages = [open(p, encoding="utf-8", errors="replace").read() for p in paths]
+    else:
+        pages = [synthetic_page()]
+    size_kb = sum(len(p) for p in pages) / len(pages) / 1024
+    print(f"pages={len(pages) if paths else 'synthetic'} avg_size={size_kb:.0f}KB engines={dom.AVAILABLE}")
+
+    baseline = timed(lambda html: scrape(html, "bs4", shared=False), pages, args.rounds)
+    print(f"{'bs4, 2 parses':16s} {baseline:8.1f} ms/page")
+    for engine in dom.AVAILABLE:
+        ms = timed(lambda html: scrape(html, engine, shared=True), pages, args.rounds)
+        print(f"{engine:16s} {ms:8.1f} ms/page  {baseline / ms:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Replay a query log and compare search-cache hit rates for the old
+lowercase cache key and the canonical key.
+
+Usage: python -m benchmarks.bench_query_canonical [query_log.txt]
+"""
+import os
+import sys
+import time
+
+from backend.canonical import canonical_query
+
+DEFAULT_LOG = os.path.join(os.path.dirname(__file__), "data", "query_log.txt")
+
+
+def replay(queries, key_fn):
+    seen = set()
+    hits = 0
+    for q in queries:
+        key = key_fn(q)
+        if key in seen:
+            hits += 1
+        else:
+            seen.add(key)
+    return hits, len(seen)
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_LOG
+    with open(path, encoding="utf-8") as f:
+        queries = [line.strip() for line in f if line.strip()]
+
+    print(f"log={path} queries={len(queries)}")
+    for label, key_fn in [("q.lower()", lambda q: q.lower()), ("canonical_query", canonical_query)]:
+        start = time.perf_counter()
+        hits, keys = replay(queries, key_fn)
+        us = (time.perf_counter() - start) / len(queries) * 1e6
+        print(
+            f"{label:16s} hit_rate={hits / len(queries):6.1%}  "
+            f"live_fanouts={keys:4d}  key_cost={us:6.1f}us/query"
+        )
+
+
+if __name__ == "__main__":
+    main()
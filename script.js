@@ -149,21 +149,51 @@ async function runAnalysis() {
       logSystem("SCANNING_REMOTE_RETAIL_NODE", "info");
       const res = await fetch(`${API_BASE}/compare-advanced`, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify({ url: query }), });
       const data = await res.json(); currentProductData = data.product || data; renderPrimary(currentProductData, query); if (data.history) renderChart(data.history);
-      const sRes = await fetch(`${API_BASE}/search-compare`, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify({ name: currentProductData.title }), });
-      results = (await sRes.json()).results || [];
+      revealDashboard();
+      results = await streamSearch(currentProductData.title, partial => renderTable(partial));
     } else {
       logSystem("SEARCHING_GLOBAL_MARKET_INDEX", "info");
-      const res = await fetch(`${API_BASE}/search-compare`, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify({ name: query }), });
-      results = (await res.json()).results || [];
-      if (results.length > 0) { currentProductData = results[0]; renderPrimary(currentProductData, currentProductData.url); fetchHistory(currentProductData.url); }
+      results = await streamSearch(query, partial => {
+        if (partial.length === 1) { currentProductData = partial[0]; renderPrimary(currentProductData, currentProductData.url); fetchHistory(currentProductData.url); toggleLoader(false); revealDashboard(); }
+        renderTable(partial);
+      });
     }
     if (results.length > 0) { renderTable(results); processMetrics(results); logSystem("MARKET_SCAN_COMPLETE", "success"); }
-    
-    ui.hero.style.opacity = "0"; ui.hero.style.transform = "translateY(-40px)";
-    setTimeout(() => { ui.hero.classList.add("hidden"); ui.dashboard.classList.remove("hidden"); ui.watchlistSec.classList.remove("hidden"); ui.dashboard.style.opacity = "1"; window.scrollTo({ top: 0, behavior: "smooth" }); }, 500);
+    revealDashboard();
   } catch (err) { logSystem(`NODE_FAULT: ${err.message}`, "alert"); toggleLoader(false); } finally { toggleLoader(false); }
 }
 
+function revealDashboard() {
+  if (!ui.dashboard.classList.contains("hidden")) return;
+  ui.hero.style.opacity = "0"; ui.hero.style.transform = "translateY(-40px)";
+  setTimeout(() => { ui.hero.classList.add("hidden"); ui.dashboard.classList.remove("hidden"); ui.watchlistSec.classList.remove("hidden"); ui.dashboard.style.opacity = "1"; window.scrollTo({ top: 0, behavior: "smooth" }); }, 500);
+}
+
+// Reads /search-compare/stream (NDJSON: catalog hits, then each store as it answers, then "done")
+// and calls onUpdate with everything received so far. Falls back to the buffered endpoint.
+async function streamSearch(name, onUpdate) {
+  const results = [];
+  try {
+    const res = await fetch(`${API_BASE}/search-compare/stream?q=${encodeURIComponent(name)}`);
+    if (!res.ok || !res.body) throw new Error(`STREAM_HTTP_${res.status}`);
+    const reader = res.body.getReader(); const decoder = new TextDecoder(); let buf = "";
+    while (true) {
+      const { value, done } = await reader.read(); if (done) break;
+      buf += decoder.decode(value, { stream: true }); const lines = buf.split("\n"); buf = lines.pop();
+      for (const line of lines) {
+        if (!line.trim()) continue; const msg = JSON.parse(line);
+        if (msg.event === "result") { results.push(msg.data); onUpdate(results); }
+        else if (msg.event === "done") logSystem(`STREAM_COMPLETE: ${msg.data.count}_NODES_${Math.round(msg.data.elapsed_ms)}MS`, "info");
+      }
+    }
+    return results;
+  } catch (e) {
+    if (results.length) return results;
+    const res = await fetch(`${API_BASE}/search-compare`, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify({ name }), });
+    return (await res.json()).results || [];
+  }
+}
+
 // ========== ADAPTIVE THEMING ==========
 function applyTheme(score) {
   let primary = "#cbb26a"; let glow = "rgba(203, 178, 106, 0.2)";
@@ -0,0 +1,72 @@
+import unittest
+
+from backend.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = _Clock()
+        self.breaker = CircuitBreaker(
+            "Amazon", window=60, min_calls=4, error_rate=0.5, slow_ms=1000,
+            slow_rate=0.75, cooldown=30, clock=self.clock,
+        )
+
+    def test_opens_on_error_rate(self):
+        for ok in (True, False, True):
+            self.breaker.record(ok, 100)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.breaker.record(False, 100, "Blocked or no results")
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow())
+        snap = self.breaker.snapshot()
+        self.assertEqual((snap["last_error"], snap["short_circuited"], snap["retry_in_s"]), ("Blocked or no results", 1, 30))
+
+    def test_opens_on_slow_calls(self):
+        for _ in range(4):
+            self.breaker.record(True, 5000)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_old_outcomes_leave_the_window(self):
+        for _ in range(3):
+            self.breaker.record(False, 100)
+        self.clock.now = 61
+        self.breaker.record(False, 100)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.snapshot()["calls"], 1)
+
+    def test_half_open_probe(self):
+        for _ in range(4):
+            self.breaker.record(False, 100)
+        self.clock.now = 31
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())  # one probe at a time
+        self.breaker.record(False, 100)
+        self.assertEqual(self.breaker.state, OPEN)
+
+        self.clock.now = 62
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record(True, 100)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.snapshot()["calls"], 0)
+
+    def test_released_probe_can_be_taken_again(self):
+        for _ in range(4):
+            self.breaker.record(False, 100)
+        self.clock.now = 31
+        self.assertTrue(self.breaker.allow())
+        self.breaker.release()
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertTrue(self.breaker.allow())
+
+
+if __name__ == "__main__":
+    unittest.main()
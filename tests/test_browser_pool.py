@@ -0,0 +1,142 @@
+import threading
+import unittest
+
+from backend.browser_pool import BrowserPool
+
+PAGE = "<html>" + "x" * 600 + "</html>"
+
+
+class _Request:
+    def __init__(self, resource_type):
+        self.resource_type = resource_type
+
+
+class _Route:
+    def __init__(self, resource_type):
+        self.request = _Request(resource_type)
+        self.outcome = None
+
+    def abort(self):
+        self.outcome = "abort"
+
+    def continue_(self):
+        self.outcome = "continue"
+
+
+class _Page:
+    def __init__(self, browser):
+        self.browser = browser
+
+    def goto(self, url, wait_until=None, timeout=None):
+        if "crash" in url:
+            self.browser.connected = False
+            raise RuntimeError("Target closed")
+        self.browser.fake.visits.append((threading.current_thread().name, url))
+
+    def wait_for_selector(self, selector, timeout=None):
+        pass
+
+    def wait_for_timeout(self, ms):
+        pass
+
+    def content(self):
+        return PAGE
+
+
+class _Context:
+    def __init__(self, browser):
+        self.browser = browser
+        browser.fake.open_contexts += 1
+
+    def route(self, pattern, handler):
+        self.browser.fake.route_handler = handler
+
+    def new_page(self):
+        return _Page(self.browser)
+
+    def close(self):
+        self.browser.fake.open_contexts -= 1
+
+
+class _Browser:
+    def __init__(self, fake):
+        self.fake = fake
+        self.connected = True
+
+    def new_context(self, **kwargs):
+        return _Context(self)
+
+    def is_connected(self):
+        return self.connected
+
+    def close(self):
+        self.connected = False
+        self.fake.closed += 1
+
+
+class _FakePlaywright:
+    """Stands in for sync_playwright(): factory() -> .start() -> .chromium.launch()."""
+
+    def __init__(self):
+        self.launches = 0
+        self.closed = 0
+        self.open_contexts = 0
+        self.visits = []
+        self.route_handler = None
+        self.chromium = self
+
+    def __call__(self):
+        return self
+
+    def start(self):
+        return self
+
+    def stop(self):
+        pass
+
+    def launch(self, **kwargs):
+        self.launches += 1
+        return _Browser(self)
+
+
+class TestBrowserPool(unittest.TestCase):
+    def setUp(self):
+        self.fake = _FakePlaywright()
+        self.pool = BrowserPool(size=1, recycle_after=3, playwright_factory=self.fake)
+
+    def tearDown(self):
+        self.pool.stop()
+
+    def test_browser_is_reused_and_recycled(self):
+        for i in range(4):
+            self.assertEqual(self.pool.fetch(f"https://example.com/{i}"), PAGE)
+        self.assertEqual(self.fake.launches, 2)
+        self.assertEqual(self.fake.open_contexts, 0)
+        self.assertEqual(self.pool.stats()["recycles"], 1)
+        self.assertEqual({name for name, _ in self.fake.visits}, {"browser-0"})
+
+    def test_crashed_browser_is_relaunched(self):
+        self.assertIsNone(self.pool.fetch("https://example.com/crash"))
+        self.assertEqual(self.pool.fetch("https://example.com/ok"), PAGE)
+        stats = self.pool.stats()
+        self.assertEqual((stats["crashes"], stats["launches"]), (1, 2))
+
+    def test_heavy_resources_are_blocked(self):
+        self.pool.fetch("https://example.com/")
+        routes = {t: _Route(t) for t in ("document", "image", "font", "media", "script")}
+        for route in routes.values():
+            self.fake.route_handler(route)
+        self.assertEqual(
+            {t: r.outcome for t, r in routes.items()},
+            {"document": "continue", "image": "abort", "font": "abort", "media": "abort", "script": "continue"},
+        )
+
+    def test_unavailable_without_playwright(self):
+        pool = BrowserPool(playwright_factory=None)
+        pool._factory = None
+        self.assertFalse(pool.available)
+        self.assertIsNone(pool.fetch("https://example.com/"))
+
+
+if __name__ == "__main__":
+    unittest.main()
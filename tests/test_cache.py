@@ -0,0 +1,213 @@
+import asyncio
+import os
+import socketserver
+import tempfile
+import threading
+import time
+import unittest
+
+from backend import cache as cache_module
+from backend.cache import RedisCache, SQLiteCache, TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_hit_miss_and_expiry(self):
+        cache = TTLCache(ttl=60)
+        cache.set("a", [1, 2])
+        self.assertEqual(cache.get("a"), [1, 2])
+        self.assertIsNone(cache.get("b"))
+        cache.set("c", "x", ttl=-1)
+        self.assertIsNone(cache.get("c"))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["expirations"]), (1, 2, 1))
+
+    def test_lru_eviction_by_count(self):
+        cache = TTLCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_eviction_by_bytes(self):
+        cache = TTLCache(max_bytes=100)
+        cache.set("a", "x" * 40)
+        cache.set("b", "y" * 40)
+        cache.set("c", "z" * 40)
+        self.assertEqual(len(cache), 2)
+        self.assertLessEqual(cache.stats()["bytes"], 100)
+        cache.set("huge", "x" * 1000)
+        self.assertIsNone(cache.get("huge"))
+
+    def test_sweeper_removes_expired(self):
+        cache = TTLCache(ttl=0.05, sweep_interval=0.02)
+        cache.set("a", 1)
+        cache.start_sweeper()
+        try:
+            deadline = time.time() + 2
+            while len(cache) and time.time() < deadline:
+                time.sleep(0.02)
+            self.assertEqual(len(cache), 0)
+            self.assertEqual(cache.stats()["bytes"], 0)
+        finally:
+            cache.stop_sweeper()
+
+
+class TestSQLiteCache(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "cache.db")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_shared_between_instances(self):
+        writer = SQLiteCache(self.path, namespace="search", ttl=60)
+        reader = SQLiteCache(self.path, namespace="search", ttl=60)
+        writer.set("iphone", [{"price": "100"}])
+        entry = reader.get_entry("iphone")
+        self.assertEqual(entry.value, [{"price": "100"}])
+        self.assertAlmostEqual(entry.stored_at, time.time(), delta=5)
+        self.assertIsNone(SQLiteCache(self.path, namespace="other").get("iphone"))
+
+    def test_expiry_replace_and_sweep(self):
+        cache = SQLiteCache(self.path, ttl=60)
+        cache.set("old", 1, ttl=-1)
+        self.assertIsNone(cache.get("old"))
+        cache.set("a", 1)
+        cache.set("a", 2)
+        self.assertEqual(cache.get("a"), 2)
+        self.assertEqual(cache.sweep(), 1)
+        self.assertEqual(cache.stats()["entries"], 1)
+
+    def test_entry_budget_evicts_lru_on_write(self):
+        cache = SQLiteCache(self.path, max_entries=2, ttl=60)
+        cache.ACCESS_RESOLUTION = 0
+        cache.set("old", 1, ttl=-1)
+        cache.set("a", 1)
+        cache.set("b", 2)  # over budget: the expired row goes first
+        self.assertEqual(cache.stats()["expirations"], 1)
+        cache.get("a")
+        cache.set("c", 3)  # "b" is least recently used now
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_byte_budget(self):
+        cache = SQLiteCache(self.path, max_bytes=250, ttl=60)
+        for i in range(5):
+            cache.set(f"k{i}", "x" * 100)
+        stats = cache.stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertLessEqual(stats["bytes"], 250)
+        self.assertEqual(cache.get("k4"), "x" * 100)
+        cache.set("huge", "x" * 1000)
+        self.assertIsNone(cache.get("huge"))
+
+    def test_async_interface_runs_off_the_event_loop(self):
+        cache = SQLiteCache(self.path, ttl=60)
+        threads = []
+        load = cache._load
+        cache._load = lambda key, now: threads.append(threading.get_ident()) or load(key, now)
+
+        async def main():
+            await cache.aset("k", [1])
+            return await cache.aget("k"), await cache.aget("missing", "default")
+
+        self.assertEqual(asyncio.run(main()), ([1], "default"))
+        self.assertNotIn(threading.get_ident(), threads)
+
+    def test_default_path_is_resolved_lazily_under_data_dir(self):
+        old = (cache_module.DATA_DIR, cache_module.CACHE_DB)
+        cache_module.DATA_DIR = os.path.join(self._tmp.name, "data")
+        cache_module.CACHE_DB = "search_cache.db"
+        try:
+            cache = cache_module.make_cache("search", ttl=60, backend="sqlite")
+            self.assertFalse(os.path.exists(cache_module.DATA_DIR))
+            cache.set("k", 1)
+            self.assertEqual(cache.path, os.path.join(self._tmp.name, "data", "search_cache.db"))
+            self.assertTrue(os.path.exists(cache.path))
+        finally:
+            cache_module.DATA_DIR, cache_module.CACHE_DB = old
+
+
+class _FakeRedisHandler(socketserver.StreamRequestHandler):
+    """Local stand-in speaking the RESP commands RedisCache uses."""
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            n = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(n + 2)[:-2])
+        return args
+
+    def _bulk(self, value):
+        if value is None:
+            return b"$-1\r\n"
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            cmd = args[0].upper()
+            now = time.time()
+            if cmd == b"SET":
+                store[args[1]] = (args[2], now + int(args[4]) / 1000)
+                reply = b"+OK\r\n"
+            elif cmd == b"GET":
+                value, expires = store.get(args[1], (None, 0))
+                reply = self._bulk(value if expires > now else None)
+            elif cmd == b"DEL":
+                n = sum(1 for k in args[1:] if store.pop(k, None))
+                reply = b":%d\r\n" % n
+            elif cmd == b"SCAN":
+                prefix = args[3].rstrip(b"*")
+                keys = [k for k in store if k.startswith(prefix)]
+                reply = b"*2\r\n" + self._bulk(b"0") + b"*%d\r\n" % len(keys)
+                reply += b"".join(self._bulk(k) for k in keys)
+            else:
+                reply = b"-ERR unknown command\r\n"
+            self.wfile.write(reply)
+
+
+class TestRedisCache(unittest.TestCase):
+    def setUp(self):
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _FakeRedisHandler)
+        self.server.daemon_threads = True
+        self.server.store = {}
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = "redis://127.0.0.1:%d/0" % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_round_trip_and_clear(self):
+        cache = RedisCache(self.url, namespace="search", ttl=60)
+        cache.set("iphone", {"results": [1, 2]})
+        self.assertEqual(RedisCache(self.url, namespace="search").get("iphone"), {"results": [1, 2]})
+        cache.set("gone", 1, ttl=0.001)
+        time.sleep(0.01)
+        self.assertIsNone(cache.get("gone"))
+        cache.clear()
+        self.assertIsNone(cache.get("iphone"))
+
+    def test_unreachable_server_is_a_miss(self):
+        self.server.shutdown()
+        self.server.server_close()
+        cache = RedisCache("redis://127.0.0.1:1/0", ttl=60, timeout=0.2)
+        cache.set("k", 1)
+        self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.stats()["errors"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+
+from backend.canonical import canonical_query, canonical_url, is_short_link, query_terms
+
+# Each group holds spellings of the same search that must share a key.
+EQUIVALENT = [
+    ["iPhone 15 128GB", "iphone  15 128 gb", "128gb iphone 15", "Buy iPhone 15 (128 GB) online", "IPHONE 15 128 Gigs"],
+    ['Samsung 55" 4K TV', "samsung 55 inch 4k tv", "4K TV Samsung 55 Inches"],
+    ["Galaxy S23+", "galaxy s23 plus", "Samsung Galaxy S23+".replace("Samsung ", "")],
+    ["redmi 10000 mAh power bank", "Redmi 10,000mAh Power Bank", "power bank redmi 10000mah"],
+    ["boAt Airdopes 141", "boat airdopes 141", "Airdopes 141 boAt"],
+    ["Prestige 1.50 L kettle", "prestige kettle 1.5 litre", "prestige 1.5ltr kettle"],
+    ["ｉＰｈｏｎｅ １５", "iphone 15"],
+    ["Oneplus 12 256 GB for gaming", "oneplus 12 256gb gaming"],
+]
+
+# Searches that must NOT collapse into one key.
+DISTINCT = [
+    "iphone 15", "iphone 15 128gb", "iphone 15 256gb", "iphone 15 plus",
+    "galaxy a15 5g", "galaxy a15", "55 inch tv", "65 inch tv", "the", "1 kg", "10 kg",
+]
+
+# Brand and model names containing shopping words must keep them.
+BRAND_NAMES = [
+    ("new balance shoes", "balance shoes"),
+    ("india gate basmati rice", "gate basmati rice"),
+    ("best choice baby wipes", "choice baby wipes"),
+    ("latest trends kurti", "trends kurti"),
+    ("cheap monday jeans", "monday jeans"),
+]
+
+
+class TestCanonicalQuery(unittest.TestCase):
+    def test_equivalent_spellings_share_a_key(self):
+        for group in EQUIVALENT:
+            keys = {canonical_query(q) for q in group}
+            self.assertEqual(len(keys), 1, f"{group} -> {keys}")
+
+    def test_distinct_searches_keep_distinct_keys(self):
+        keys = [canonical_query(q) for q in DISTINCT]
+        self.assertEqual(len(set(keys)), len(keys), keys)
+
+    def test_brand_names_keep_shopping_words(self):
+        for brand, stripped in BRAND_NAMES:
+            self.assertNotEqual(canonical_query(brand), canonical_query(stripped), brand)
+        self.assertEqual(canonical_query("buy new balance shoes online"), canonical_query("new balance shoes"))
+
+    def test_terms_keep_order_and_units(self):
+        self.assertEqual(query_terms("Buy iPhone 15 128 GB"), ["iphone", "15", "128gb"])
+        self.assertEqual(query_terms("the"), ["the"])
+        self.assertEqual(query_terms(""), [])
+
+
+# Each group holds links to the same product that must share a history key.
+SAME_PRODUCT = [
+    [
+        "https://www.amazon.in/Apple-iPhone-15-128-GB/dp/B0CHX1W1XY/ref=sr_1_1?crid=2X&keywords=iphone&qid=1700&sr=8-1",
+        "https://amazon.in/dp/b0chx1w1xy?th=1&psc=1",
+        "https://www.amazon.in/gp/product/B0CHX1W1XY/ref=ppx_yo_dt_b_asin_title",
+        "https://www.amazon.in/gp/aw/d/B0CHX1W1XY?tag=affiliate-21",
+    ],
+    [
+        "https://www.flipkart.com/apple-iphone-15-black-128-gb/p/itm6ac6485515ae4?pid=MOBGTAGPTB3VS24W&lid=LSTMOB1&marketplace=FLIPKART&q=iphone",
+        "https://dl.flipkart.com/dl/apple-iphone-15-black-128-gb/p/itm6ac6485515ae4?pid=MOBGTAGPTB3VS24W&affid=x",
+    ],
+    [
+        "https://www.myntra.com/tshirts/roadster/roadster-men-tshirt/1234567/buy?utm_source=share",
+        "https://www.myntra.com/1234567",
+    ],
+    [
+        "https://www.snapdeal.com/product/boat-airdopes/6480?utm_source=a&fbclid=z#reviews",
+        "https://www.snapdeal.com/product/boat-airdopes/6480/",
+    ],
+]
+
+
+class TestCanonicalUrl(unittest.TestCase):
+    def test_variants_share_a_key(self):
+        for group in SAME_PRODUCT:
+            keys = {canonical_url(u) for u in group}
+            self.assertEqual(len(keys), 1, f"{group} -> {keys}")
+
+    def test_retailer_forms(self):
+        self.assertEqual(canonical_url(SAME_PRODUCT[0][0]), "https://www.amazon.in/dp/B0CHX1W1XY")
+        self.assertEqual(
+            canonical_url(SAME_PRODUCT[1][0]),
+            "https://www.flipkart.com/apple-iphone-15-black-128-gb/p/itm6ac6485515ae4?pid=MOBGTAGPTB3VS24W",
+        )
+
+    def test_product_params_are_kept(self):
+        self.assertNotEqual(
+            canonical_url("https://shop.example.com/item?id=1"),
+            canonical_url("https://shop.example.com/item?id=2"),
+        )
+
+    def test_retailer_params_kept_on_other_sites(self):
+        for param in ("store", "tag", "keywords", "sr", "fm", "ref"):
+            self.assertNotEqual(
+                canonical_url(f"https://shop.example.com/item?{param}=1"),
+                canonical_url(f"https://shop.example.com/item?{param}=2"),
+                param,
+            )
+        self.assertEqual(
+            canonical_url("https://shop.example.com/item?id=1&utm_source=x&gclid=y"),
+            "https://shop.example.com/item?id=1",
+        )
+        self.assertEqual(
+            canonical_url("https://www.amazon.in/s?k=tv&ref=nb_sb_noss&crid=2X"),
+            "https://www.amazon.in/s?k=tv",
+        )
+
+    def test_ports_kept_and_credentials_dropped(self):
+        self.assertEqual(
+            canonical_url("http://user:pw@Shop.Example.com:8080/item/1?id=5&utm_source=x"),
+            "http://shop.example.com:8080/item/1?id=5",
+        )
+        self.assertNotEqual(
+            canonical_url("http://shop.example.com:8080/item/1"),
+            canonical_url("http://shop.example.com:9090/item/1"),
+        )
+        self.assertEqual(
+            canonical_url("https://shop.example.com:443/item/1"),
+            canonical_url("https://shop.example.com/item/1"),
+        )
+
+    def test_short_links_and_non_urls_pass_through(self):
+        self.assertTrue(is_short_link("https://amzn.to/3abcDEF"))
+        self.assertEqual(canonical_url("https://amzn.to/3abcDEF"), "https://amzn.to/3abcDEF")
+        self.assertEqual(canonical_url("u"), "u")
+
+
+if __name__ == "__main__":
+    unittest.main()
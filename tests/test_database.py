@@ -0,0 +1,278 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from backend import database
+
+
+class DatabaseTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._old_db = database.DB_NAME
+        database.DB_NAME = os.path.join(self._tmp.name, "test.db")
+        database.init_db()
+
+    def tearDown(self):
+        database.close_connections()
+        database.DB_NAME = self._old_db
+        self._tmp.cleanup()
+
+
+class TestConnectionPool(DatabaseTestCase):
+    def test_connection_reused_per_thread(self):
+        self.assertIs(database.get_connection(), database.get_connection())
+
+        other = []
+        t = threading.Thread(target=lambda: other.append(database.get_connection()))
+        t.start()
+        t.join()
+        self.assertIsNot(other[0], database.get_connection())
+
+    def test_wal_mode(self):
+        mode = database.get_connection().execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode.lower(), "wal")
+
+    def test_close_connections_reopens(self):
+        first = database.get_connection()
+        database.close_connections()
+        self.assertIsNot(first, database.get_connection())
+
+    def test_save_and_read_history(self):
+        database.save_price("https://example.com/p", "Phone", "1,299")
+        database.save_price("https://example.com/p", "Phone", "1199")
+        history = database.get_price_history("https://example.com/p")
+        self.assertEqual([h["price"] for h in history], [1299, 1199])
+
+    def test_history_keyed_by_canonical_url(self):
+        database.save_price("https://www.amazon.in/Phone/dp/B0CHX1W1XY/ref=sr_1_1?qid=1", "Phone", "999")
+        database.save_price("https://www.amazon.in/dp/B0CHX1W1XY?tag=aff-21", "Phone", "949")
+        history = database.get_price_history("https://amazon.in/gp/product/B0CHX1W1XY")
+        self.assertEqual([h["price"] for h in history], [999, 949])
+        self.assertEqual(database.get_price_stats("https://www.amazon.in/dp/B0CHX1W1XY")["count"], 2)
+
+    def test_unpooled_mode(self):
+        database.DB_POOL = False
+        try:
+            database.save_price("https://example.com/q", "Phone", "999")
+            self.assertEqual(len(database.get_price_history("https://example.com/q")), 1)
+        finally:
+            database.DB_POOL = True
+
+
+class TestChangePointHistory(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        database.HISTORY_MODE = "changes"
+
+    def tearDown(self):
+        database.HISTORY_MODE = "all"
+        super().tearDown()
+
+    def _count(self):
+        return database.get_connection().execute("SELECT COUNT(*) FROM price_history").fetchone()[0]
+
+    def test_only_changes_are_stored(self):
+        database.save_prices([
+            ("u", "Phone", "1000", 100),
+            ("u", "Phone", "1000", 200),
+            ("u", "Phone", "900", 300),
+            ("u", "Phone", "900", 400),
+            ("u", "Phone", "900", 500),
+        ])
+        self.assertEqual(self._count(), 2)
+        history = database.get_price_history("u")
+        self.assertEqual([h["price"] for h in history], [1000, 900, 900])
+        self.assertEqual(history[-1]["date"], database._ts_to_iso(500))
+
+    def test_compact_existing_history(self):
+        database.HISTORY_MODE = "all"
+        database.save_prices([("u", "Phone", p, ts) for ts, p in enumerate(["5", "5", "6", "6", "5"], 1)])
+        self.assertEqual(self._count(), 5)
+        self.assertEqual(database.compact_history(batch_size=1), 2)
+        self.assertEqual([h["price"] for h in database.get_price_history("u")], [5, 6, 5])
+
+
+class TestHistoryRollups(DatabaseTestCase):
+    DAY = 86400
+
+    def setUp(self):
+        super().setUp()
+        # Four observations per day for 30 days, prices 100..103 each day.
+        database.save_prices(
+            ("u", "Phone", str(100 + i % 4), 1_699_920_000 + (i // 4) * self.DAY + (i % 4) * 3600)
+            for i in range(120)
+        )
+
+    def test_daily_buckets(self):
+        days = database.get_price_history("u", resolution="day")
+        self.assertEqual(len(days), 30)
+        self.assertEqual(
+            {k: days[0][k] for k in ("min", "max", "last", "count")},
+            {"min": 100, "max": 103, "last": 103, "count": 4},
+        )
+        self.assertEqual(days[0]["avg"], 101.5)
+
+    def test_auto_picks_fitting_tier(self):
+        self.assertEqual(len(database.get_price_history("u", resolution="auto")), 120)
+        daily = database.get_price_history("u", resolution="auto", max_points=50)
+        self.assertEqual(len(daily), 30)
+        merged = database.get_price_history("u", resolution="auto", max_points=2)
+        self.assertEqual(len(merged), 2)
+        self.assertEqual(sum(b["count"] for b in merged), 120)
+
+    def test_since_until(self):
+        since = 1_699_920_000 + 10 * self.DAY
+        raw = database.get_price_history("u", since=since, until=since + self.DAY - 1)
+        self.assertEqual([h["price"] for h in raw], [100, 101, 102, 103])
+
+    def test_running_stats(self):
+        stats = database.get_price_stats("u")
+        self.assertEqual(
+            {k: stats[k] for k in ("count", "average", "min", "max", "last")},
+            {"count": 120, "average": 101.5, "min": 100, "max": 103, "last": 103},
+        )
+        self.assertIsNone(database.get_price_stats("missing"))
+
+    def test_backfill_matches_incremental_stats(self):
+        before = database.get_price_stats("u")
+        self.assertEqual(database.backfill_price_stats(batch_size=1), 1)
+        self.assertEqual(database.get_price_stats("u"), before)
+
+
+class TestTypedHistoryMigration(DatabaseTestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._old_db = database.DB_NAME
+        database.DB_NAME = os.path.join(self._tmp.name, "legacy.db")
+        conn = sqlite3.connect(database.DB_NAME)
+        conn.execute(
+            "CREATE TABLE price_history (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "product_url TEXT, title TEXT, price TEXT, date TEXT)"
+        )
+        conn.executemany(
+            "INSERT INTO price_history (product_url, title, price, date) VALUES (?, ?, ?, ?)",
+            [
+                ("u1", "A", "Rs. 1,299", "2024-01-02T10:00:00"),
+                ("u1", "A", "1199", "2024-01-01T10:00:00"),
+                ("u1", "A", "Unavailable", "2024-01-03T10:00:00"),
+                ("u2", "B", "12.50", "2024-01-01T10:00:00"),
+            ],
+        )
+        conn.commit()
+        conn.close()
+
+    def test_migrates_in_batches(self):
+        database.init_db(run_migrations=False)
+        self.assertEqual(database.schema_version(), 0)
+        seen = []
+        database.migrate(batch_size=1, progress=lambda table, last_id: seen.append((table, last_id)))
+        self.assertEqual([i for t, i in seen if t == "price_history"], [1, 2, 3, 4])
+        self.assertEqual(database.schema_version(), database.SCHEMA_VERSION)
+
+        history = database.get_price_history("u1")
+        self.assertEqual([h["price"] for h in history], [1199, 1299])
+        self.assertEqual(history[0]["date"], "2024-01-01T10:00:00")
+        self.assertEqual(database.get_price_history("u2")[0]["price"], 12.5)
+
+    def test_raw_urls_are_rekeyed(self):
+        database.init_db(run_migrations=False)
+        conn = database.get_connection()
+        conn.execute(
+            "UPDATE price_history SET product_url = 'https://www.amazon.in/x/dp/B0CHX1W1XY?ref=a' "
+            "WHERE product_url = 'u2'"
+        )
+        conn.commit()
+        database.migrate(batch_size=2)
+        history = database.get_price_history("https://www.amazon.in/dp/B0CHX1W1XY")
+        self.assertEqual([h["price"] for h in history], [12.5])
+        self.assertEqual(database.get_price_stats("https://www.amazon.in/dp/B0CHX1W1XY")["count"], 1)
+
+    def test_startup_refuses_an_unmigrated_database(self):
+        with self.assertRaises(database.SchemaOutdated) as ctx:
+            database.init_db()
+        self.assertIn("backend.manage migrate", str(ctx.exception))
+        self.assertEqual(database.schema_version(), 0)
+        self.assertNotIn("price_minor", database._columns(database.get_connection(), "price_history"))
+
+        database.init_db(run_migrations=True)
+        database.init_db()
+        self.assertEqual([h["price"] for h in database.get_price_history("u1")], [1199, 1299])
+
+    def test_history_lookup_uses_index(self):
+        database.init_db(run_migrations=True)
+        plan = database.get_connection().execute(
+            "EXPLAIN QUERY PLAN SELECT price_minor, ts FROM price_history "
+            "WHERE product_url = ? ORDER BY ts",
+            ("u1",),
+        ).fetchall()
+        self.assertIn("idx_price_history_url_ts", " ".join(str(row) for row in plan))
+
+
+class TestCatalogSearch(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        database.bulk_upsert_products(
+            "feed",
+            [
+                {"external_id": "1", "title": "Airdopes 141 Earbuds", "brand": "boAt", "category": "Audio"},
+                {"external_id": "2", "title": "Rockerz 450 Headphones", "brand": "boAt", "category": "Audio"},
+                {"external_id": "3", "title": "Galaxy Buds", "brand": "Samsung", "category": "Audio"},
+            ],
+        )
+
+    def test_fts_index_exists(self):
+        self.assertTrue(database._has_fts(database.get_connection()))
+
+    def test_all_terms_must_match_across_columns(self):
+        rows = database.search_products_by_name("boat airdopes")
+        self.assertEqual([r["external_id"] for r in rows], ["1"])
+
+    def test_prefix_match_and_limit(self):
+        self.assertEqual(len(database.search_products_by_name("audi", limit=2)), 2)
+        self.assertEqual(database.search_products_by_name("galax")[0]["brand"], "Samsung")
+
+    def test_upsert_keeps_index_in_sync(self):
+        database.bulk_upsert_products(
+            "feed", [{"external_id": "3", "title": "Galaxy Watch", "brand": "Samsung", "category": "Wearables"}]
+        )
+        self.assertEqual(database.search_products_by_name("buds"), [])
+        self.assertEqual(database.search_products_by_name("watch")[0]["external_id"], "3")
+
+    def test_number_units_match_either_spelling(self):
+        database.bulk_upsert_products(
+            "feed",
+            [
+                {"external_id": "4", "title": "iPhone 15 (128 GB) Black", "brand": "Apple"},
+                {"external_id": "5", "title": "iPhone 15 256GB Blue", "brand": "Apple"},
+            ],
+        )
+        self.assertEqual([r["external_id"] for r in database.search_products_by_name("iphone 15 128gb")], ["4"])
+        self.assertEqual([r["external_id"] for r in database.search_products_by_name("buy 256 gb iphone")], ["5"])
+
+    def test_plus_models_match_with_or_without_the_plus(self):
+        database.bulk_upsert_products(
+            "feed", [{"external_id": "6", "title": "Samsung Galaxy S24+ 256GB", "brand": "Samsung"}]
+        )
+        for query in ("galaxy s24+", "s24+", "galaxy s24"):
+            with self.subTest(query=query):
+                self.assertEqual([r["external_id"] for r in database.search_products_by_name(query)], ["6"])
+
+    def test_bare_numbers_match_exactly(self):
+        database.bulk_upsert_products("feed", [{"external_id": "4", "title": "iPhone 15 Black", "brand": "Apple"}])
+        self.assertEqual(database.search_products_by_name("iphone 1"), [])
+        self.assertEqual([r["external_id"] for r in database.search_products_by_name("iphone 15")], ["4"])
+
+    def test_bulk_upsert_streams_in_chunks(self):
+        records = ({"external_id": str(i), "title": f"Cable {i}"} for i in range(5))
+        self.assertEqual(database.bulk_upsert_products("bulk", records, chunk_size=2), [2, 2, 1])
+        self.assertEqual(len(database.search_products_by_name("cable", limit=10)), 5)
+        self.assertEqual(database.bulk_upsert_products("bulk", []), [])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(database.search_products_by_name('"boat" OR NEAR('), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import os
+import unittest
+
+from backend import dom
+from backend import search_providers as sp
+
+PAGE = """
+<html><head><title> Results </title>
+<script type="application/ld+json">{"@type": "Product", "name": "Phone", "offers": {"price": "1,299"}}</script>
+<script type="application/ld+json">{not json</script>
+</head><body>
+<div data-component-type="s-search-result">
+  <h2><a class="a-link-normal" href="/dp/B0TEST"><span>Apple</span> <span>iPhone</span></a></h2>
+  <span class="a-price"><span class="a-offscreen">&#8377;69,900</span></span>
+  <img class="s-image" src="https://m.media-amazon.com/i.jpg">
+  <li class="product-item"><h3>Croma TV</h3><span class="price-now">&#8377;9,999</span></li>
+</div>
+</body></html>
+"""
+
+
+# Markup the engines are known to disagree on unless dom.Node smooths it over.
+EDGE_PAGE = """
+<html><head><title>
+  Deals &amp; Offers </title>
+<script>window.__STATE__ = {"a": "<b>x</b> &amp; y"};</script>
+<script type="application/ld+json">
+  {"@type": "Product", "name": "Phone &amp; Case", "offers": {"price": "1,299"}}
+</script>
+</head><body>
+<div class="card priceBlock" id="c1"><span class="a-price"><span class="a-offscreen">&#8377;69,900</span></span>
+<span class="price-now"> &nbsp;&#8377;9,999&nbsp; </span><span class="old-price">x</span></div>
+<p class="desc">  Price:
+   <b> 1,299 </b>  only&nbsp;</p>
+<input disabled name="q" value="">
+</body></html>
+"""
+
+
+class EngineParity:
+    """The same fixtures through one engine; a subclass per engine, skipped
+    when that engine is not installed."""
+
+    engine = None
+
+    def parse(self, html):
+        return dom.parse_html(html, self.engine)
+
+    def test_selectors_and_text(self):
+        doc = self.parse(PAGE)
+        self.assertEqual(doc.select_one("title").get_text(strip=True), "Results")
+        self.assertEqual(doc.select_one("h2 a").get_text(strip=True), "AppleiPhone")
+        self.assertEqual(doc.select_one("h2 a")["href"], "/dp/B0TEST")
+        self.assertEqual(doc.select_one("[class*='price'] .a-offscreen").get_text(), "₹69,900")
+        self.assertEqual(len(doc.select("h2 span")), 2)
+        self.assertIsNone(doc.select_one("div.nothing"))
+        self.assertIsNone(self.parse("").select_one("a"))
+
+    def test_class_substring_selectors(self):
+        doc = self.parse(EDGE_PAGE)
+        self.assertEqual(
+            [n.get_text(strip=True) for n in doc.select("[class*='price']")],
+            ["₹69,900₹9,999x", "₹69,900", "₹9,999", "x"],
+        )
+        self.assertEqual([n.get("id") for n in doc.select("div[class*='price']")], ["c1"])
+        self.assertEqual(doc.select_one("div").get("class"), "card priceBlock")
+
+    def test_script_and_jsonld_text(self):
+        doc = self.parse(EDGE_PAGE)
+        self.assertEqual(doc.select_one("script").get_text(), 'window.__STATE__ = {"a": "<b>x</b> &amp; y"};')
+        self.assertEqual(doc.jsonld(), [{"@type": "Product", "name": "Phone &amp; Case", "offers": {"price": "1,299"}}])
+        self.assertEqual(self.parse(PAGE).jsonld(), [{"@type": "Product", "name": "Phone", "offers": {"price": "1,299"}}])
+
+    def test_get_text_whitespace(self):
+        doc = self.parse(EDGE_PAGE)
+        self.assertEqual(doc.select_one("title").get_text(), "\n  Deals & Offers ")
+        self.assertEqual(doc.select_one("title").get_text(strip=True), "Deals & Offers")
+        self.assertEqual(doc.select_one("p.desc").get_text(), "  Price:\n    1,299   only\xa0")
+        self.assertEqual(doc.select_one("p.desc").get_text(strip=True), "Price:1,299only")
+        self.assertEqual(doc.select_one(".price-now").get_text(strip=True), "₹9,999")
+
+    def test_missing_nodes_and_attributes(self):
+        doc = self.parse(EDGE_PAGE)
+        field = doc.select_one("input")
+        self.assertIsNone(field.get("missing"))
+        self.assertEqual(field.get("missing", ""), "")
+        self.assertEqual(field.get("value"), "")
+        self.assertEqual(field.get("disabled"), "disabled" if self.engine == "lxml" else "")
+        with self.assertRaises(KeyError):
+            field["missing"]
+        self.assertIsNone(doc.select_one(".missing"))
+        self.assertEqual(doc.select(".missing"), [])
+        self.assertIsNone(doc.select_one("div").select_one("input"))
+
+
+@unittest.skipUnless("selectolax" in dom.AVAILABLE, "selectolax is not installed")
+class TestSelectolax(EngineParity, unittest.TestCase):
+    engine = "selectolax"
+
+
+@unittest.skipUnless("lxml" in dom.AVAILABLE, "lxml/cssselect is not installed")
+class TestLxml(EngineParity, unittest.TestCase):
+    engine = "lxml"
+
+
+class TestBs4(EngineParity, unittest.TestCase):
+    engine = "bs4"
+
+
+class TestPickEngine(unittest.TestCase):
+    def setUp(self):
+        self._old = (dom.AVAILABLE, os.environ.get("PRICEPILOT_HTML_PARSER"))
+
+    def tearDown(self):
+        dom.AVAILABLE = self._old[0]
+        if self._old[1] is None:
+            os.environ.pop("PRICEPILOT_HTML_PARSER", None)
+        else:
+            os.environ["PRICEPILOT_HTML_PARSER"] = self._old[1]
+
+    def test_fastest_installed_engine_is_the_default(self):
+        os.environ["PRICEPILOT_HTML_PARSER"] = "auto"
+        for available, expected in (
+            (["selectolax", "lxml", "bs4"], "selectolax"),
+            (["lxml", "bs4"], "lxml"),
+            (["bs4"], "bs4"),
+        ):
+            dom.AVAILABLE = available
+            self.assertEqual(dom._pick_engine(), expected)
+
+    def test_forced_engine_that_is_missing_falls_back(self):
+        os.environ["PRICEPILOT_HTML_PARSER"] = "selectolax"
+        dom.AVAILABLE = ["lxml", "bs4"]
+        with self.assertLogs("backend.dom", "WARNING"):
+            self.assertEqual(dom._pick_engine(), "lxml")
+        dom.AVAILABLE = ["selectolax", "bs4"]
+        self.assertEqual(dom._pick_engine(), "selectolax")
+
+
+class TestDocument(unittest.TestCase):
+    def test_document_is_parsed_once(self):
+        doc = dom.parse_html(PAGE)
+        self.assertIs(dom.parse_html(doc), doc)
+        self.assertIs(doc.jsonld(), doc.jsonld())
+        self.assertEqual(sp._jsonld_product(doc, "https://www.croma.com", "Croma")["price"], "1299")
+        result = sp.parse_croma(doc)
+        self.assertEqual((result["title"], result["price"]), ("Phone", "1299"))
+
+
+if __name__ == "__main__":
+    unittest.main()
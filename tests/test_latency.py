@@ -0,0 +1,63 @@
+import time
+import unittest
+
+from backend.latency import LatencyHistogram, LatencyTracker
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_percentiles_within_bucket_resolution(self):
+        hist = LatencyHistogram()
+        for ms in range(1, 1001):
+            hist.observe(ms)
+        self.assertAlmostEqual(hist.percentile(0.5), 500, delta=100)
+        self.assertAlmostEqual(hist.percentile(0.9), 900, delta=180)
+        self.assertEqual(LatencyHistogram().percentile(0.5), 0.0)
+
+    def test_decay_follows_recent_latency(self):
+        hist = LatencyHistogram()
+        for _ in range(2000):
+            hist.observe(100)
+        for _ in range(4000):
+            hist.observe(3000)
+        self.assertGreater(hist.percentile(0.5), 2500)
+        self.assertLess(hist.weight, 1000)
+
+
+class TestLatencyTracker(unittest.TestCase):
+    def test_needs_min_samples(self):
+        tracker = LatencyTracker()
+        for _ in range(4):
+            tracker.observe("fetch:amazon.in:impersonate", 200)
+        self.assertIsNone(tracker.percentile("fetch:amazon.in:impersonate", 0.9, min_samples=5))
+        tracker.observe("fetch:amazon.in:impersonate", 200)
+        self.assertAlmostEqual(tracker.percentile("fetch:amazon.in:impersonate", 0.9, min_samples=5), 200, delta=40)
+        self.assertIsNone(tracker.percentile("fetch:flipkart.com:impersonate", 0.9))
+        self.assertEqual(tracker.snapshot()["fetch:amazon.in:impersonate"]["samples"], 5)
+
+    def test_timeout_learned_within_bounds(self):
+        tracker = LatencyTracker()
+        key = "search:Amazon"
+        self.assertEqual(tracker.timeout(key, 6, 1.5, 6), 6)
+        for _ in range(30):
+            tracker.observe(key, 1000)
+        self.assertAlmostEqual(tracker.timeout(key, 6, 1.5, 6), 1.5 * 1.0, delta=0.3)
+        for _ in range(30):
+            tracker.observe(key, 9000)
+        self.assertEqual(tracker.timeout(key, 6, 1.5, 6), 6)
+        self.assertEqual(tracker.snapshot()[key]["timeout_s"], 6)
+
+    def test_timed_records_cut_off_calls(self):
+        tracker = LatencyTracker()
+
+        def slow(timeout):
+            time.sleep(timeout)
+            raise TimeoutError("timed out")
+
+        with self.assertRaises(TimeoutError):
+            tracker.timed("feed:example.com", 0.05, slow)
+        self.assertEqual(tracker.timed("feed:example.com", 1, lambda timeout: "ok"), "ok")
+        self.assertEqual(tracker.snapshot()["feed:example.com"]["samples"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
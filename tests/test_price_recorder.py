@@ -0,0 +1,45 @@
+import unittest
+
+from backend import database
+from backend.price_recorder import PriceRecorder
+from tests.test_database import DatabaseTestCase
+
+
+class TestPriceRecorder(DatabaseTestCase):
+    def test_writes_through_when_not_started(self):
+        recorder = PriceRecorder()
+        recorder.record("u1", "Phone", "1,299")
+        self.assertEqual(database.get_price_history("u1")[0]["price"], 1299)
+        self.assertEqual(recorder.stats()["flushed"], 1)
+
+    def test_batches_and_drains_on_stop(self):
+        recorder = PriceRecorder(max_batch=50, flush_interval=60)
+        recorder.start()
+        for price in range(100, 110):
+            recorder.record("u2", "Phone", str(price))
+        recorder.stop()
+
+        history = database.get_price_history("u2")
+        self.assertEqual([h["price"] for h in history], list(range(100, 110)))
+        stats = recorder.stats()
+        self.assertEqual(stats["flushed"], 10)
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertFalse(stats["running"])
+
+    def test_flushes_on_batch_size(self):
+        recorder = PriceRecorder(max_batch=3, flush_interval=60)
+        recorder.start()
+        try:
+            for price in range(3):
+                recorder.record("u3", "Phone", str(100 + price))
+            for _ in range(100):
+                if recorder.stats()["flushes"]:
+                    break
+                recorder._stopping.wait(0.02)
+            self.assertEqual(recorder.stats()["flushes"], 1)
+        finally:
+            recorder.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import unittest
+
+from backend.scheduler import HostLimiter, RateLimited, ScrapeScheduler, TokenBucket, host_key
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_rate(self):
+        clock = _Clock()
+        bucket = TokenBucket(rate=2, burst=3, clock=clock)
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0.0, 0.0, 0.0])
+        # Reservations queue up behind each other at 1/rate intervals.
+        self.assertAlmostEqual(bucket.reserve(), 0.5)
+        self.assertAlmostEqual(bucket.reserve(), 1.0)
+        clock.now = 10
+        self.assertEqual(bucket.reserve(), 0.0)
+
+    def test_max_wait_rejects_without_reserving(self):
+        bucket = TokenBucket(rate=1, burst=1, clock=_Clock())
+        bucket.reserve()
+        self.assertIsNone(bucket.reserve(max_wait=0.5))
+        self.assertAlmostEqual(bucket.reserve(max_wait=1), 1.0)
+
+
+class TestHostLimiter(unittest.TestCase):
+    def test_hosts_share_registrable_domain(self):
+        self.assertEqual(host_key("https://www.amazon.in/s?k=tv"), "amazon.in")
+        self.assertEqual(host_key("https://dl.flipkart.com/dl/x"), "flipkart.com")
+        self.assertEqual(host_key("https://shop.example.co.uk/x"), "example.co.uk")
+
+    def test_rejects_past_max_wait(self):
+        limiter = HostLimiter(rate=1, burst=2, overrides={}, max_wait=0)
+        limiter.acquire("https://www.amazon.in/a")
+        limiter.acquire("https://amazon.in/b")
+        with self.assertRaises(RateLimited) as ctx:
+            limiter.acquire("https://m.amazon.in/c")
+        self.assertAlmostEqual(ctx.exception.retry_after, 1, delta=0.1)
+        limiter.acquire("https://www.flipkart.com/")
+        stats = limiter.stats()
+        self.assertEqual((stats["amazon.in"]["requests"], stats["amazon.in"]["rejected"]), (2, 1))
+        self.assertEqual(stats["flipkart.com"]["requests"], 1)
+
+    def test_overrides(self):
+        limiter = HostLimiter(rate=5, burst=1, overrides={"amazon.in": 0.5})
+        limiter.acquire("https://www.amazon.in/")
+        self.assertEqual(limiter.stats()["amazon.in"]["rate"], 0.5)
+
+
+class TestScrapeScheduler(unittest.TestCase):
+    def test_worker_cap_and_queue_depth(self):
+        scheduler = ScrapeScheduler(max_workers=2)
+        release = threading.Event()
+        futures = [scheduler.submit(release.wait, 2) for _ in range(5)]
+        while scheduler.stats()["running"] < 2:
+            pass
+        stats = scheduler.stats()
+        self.assertEqual((stats["running"], stats["queued"]), (2, 3))
+        self.assertTrue(scheduler.cancel(futures[-1]))
+        release.set()
+        for f in futures[:-1]:
+            f.result()
+        stats = scheduler.stats()
+        self.assertEqual((stats["running"], stats["queued"], stats["completed"], stats["max_queued"]), (0, 0, 4, 3))
+        scheduler.shutdown()
+
+    def test_async_slots(self):
+        scheduler = ScrapeScheduler(max_workers=2)
+        peak = []
+
+        async def job():
+            async with scheduler.slot():
+                peak.append(scheduler.stats()["async_running"])
+                await asyncio.sleep(0.01)
+
+        async def main():
+            await asyncio.gather(*(job() for _ in range(6)))
+
+        asyncio.run(main())
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(scheduler.stats()["async_running"], 0)
+        scheduler.shutdown()
+
+    def test_threads_and_coroutines_share_one_cap(self):
+        scheduler = ScrapeScheduler(max_workers=2)
+        release = threading.Event()
+        futures = [scheduler.submit(release.wait, 2) for _ in range(2)]
+        while scheduler.stats()["running"] < 2:
+            pass
+
+        async def main():
+            waiter = asyncio.ensure_future(self._hold(scheduler))
+            cancelled = asyncio.ensure_future(self._hold(scheduler))
+            await asyncio.sleep(0.02)
+            self.assertFalse(waiter.done())
+            self.assertEqual(scheduler.stats()["async_waiting"], 2)
+            cancelled.cancel()
+            release.set()
+            await waiter
+
+        asyncio.run(main())
+        for f in futures:
+            f.result()
+        self.assertEqual(scheduler.stats()["free_slots"], 2)
+        scheduler.shutdown()
+
+    @staticmethod
+    async def _hold(scheduler):
+        async with scheduler.slot():
+            await asyncio.sleep(0.01)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,481 @@
+import asyncio
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from backend import database
+from backend import search_providers as sp
+from backend.cache import TTLCache
+from backend.latency import LatencyTracker
+from backend.scheduler import RateLimited, ScrapeScheduler
+from backend.singleflight import AsyncSingleFlight
+
+# Importing the app runs init_db(); keep it off the working directory.
+_DB_DIR = tempfile.TemporaryDirectory()
+_OLD_DB, database.DB_NAME = database.DB_NAME, os.path.join(_DB_DIR.name, "test.db")
+from backend import main  # noqa: E402
+database.close_connections()
+database.DB_NAME = _OLD_DB
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class _Recorder:
+    def __init__(self):
+        self.records = []
+
+    def record(self, product_url, title, price):
+        self.records.append((product_url, title, price))
+        return True
+
+
+class SearchCompareTestCase(unittest.TestCase):
+    """main with an in-memory search cache on a fake clock, no catalog rows
+    and a fake live fan-out (self.live)."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        cache = TTLCache(max_entries=100, ttl=main.CACHE_STALE_TTL)
+        marks = TTLCache(max_entries=100, ttl=main.CACHE_REFRESH_INTERVAL)
+        cache.clock = marks.clock = self.clock
+        self.recorder = _Recorder()
+        self.calls = []
+        self.gate = None
+        self.down = False
+        self.timeouts = set()
+        self.limited = set()
+        patched = {
+            "SEARCH_CACHE": cache,
+            "_REFRESH_MARKS": marks,
+            "REFRESH_STATS": dict.fromkeys(main.REFRESH_STATS, 0),
+            "AINFLIGHT": AsyncSingleFlight(),
+            "price_recorder": self.recorder,
+            "search_products_by_name": lambda q, limit: [],
+            "arun_all_search": self.live,
+            "aiter_all_search": self.live_stream,
+        }
+        self._old = {name: getattr(main, name) for name in patched}
+        for name, value in patched.items():
+            setattr(main, name, value)
+
+    def tearDown(self):
+        for name, value in self._old.items():
+            setattr(main, name, value)
+
+    async def live(self, q, budget=None):
+        self.calls.append(q)
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.down:
+            raise RuntimeError("providers down")
+        return self.results(q)
+
+    async def live_stream(self, q, budget=None):
+        self.calls.append(q)
+        for i, item in enumerate(self.results(q)):
+            if i and self.gate is not None:
+                await self.gate.wait()
+            yield item
+
+    def results(self, q):
+        n = len(self.calls)
+        url = f"https://www.amazon.in/dp/{n}"
+        results = [
+            {"source": "Amazon", "title": f"{q} #{n}", "price": "100", "url": url},
+            {"source": "Flipkart", "title": f"{q} #{n}", "price": "95", "url": f"https://www.flipkart.com/p/{n}"},
+            {"source": "Amazon", "title": "duplicate", "price": "100", "url": url + "?utm_source=x"},
+        ]
+        for i, r in enumerate(results):
+            if r["source"] in self.timeouts:
+                results[i] = main._timeout_result(r["source"], 1, learn=False)
+            elif r["source"] in self.limited:
+                results[i] = {**sp._result(r["source"], error="Rate limited"), "retry_after": 2.2}
+        return results
+
+    def seed(self, q, title="cached"):
+        main.SEARCH_CACHE.set(main._search_key(q), [{"source": "Amazon", "title": title, "price": "90"}])
+
+    async def until_live(self, n):
+        while len(self.calls) < n:
+            await asyncio.sleep(0.001)
+
+    @staticmethod
+    async def settle():
+        while main._REFRESH_TASKS:
+            await asyncio.gather(*main._REFRESH_TASKS)
+
+
+class TestStaleWhileRevalidate(SearchCompareTestCase):
+    def test_soft_ttl_serves_stale_and_hard_ttl_waits_for_live(self):
+        async def scenario():
+            self.seed("iphone")
+            self.clock.advance(main.CACHE_TTL - 1)
+            fresh = await main._asearch_compare_core("iphone")
+            self.assertEqual((fresh[0]["title"], self.calls), ("cached", []))
+
+            self.clock.advance(2)
+            stale = await main._asearch_compare_core("iphone")
+            self.assertEqual(stale[0]["title"], "cached")
+            await self.settle()
+            self.assertEqual(self.calls, ["iphone"])
+            self.assertEqual(main.REFRESH_STATS["stale_hits"], 1)
+            refreshed = await main._asearch_compare_core("iphone")
+            self.assertEqual(refreshed[0]["title"], "iphone #1")
+
+            self.clock.advance(main.CACHE_STALE_TTL + 1)
+            expired = await main._asearch_compare_core("iphone")
+            self.assertEqual(expired[0]["title"], "iphone #2")
+            self.assertEqual(main.REFRESH_STATS["refreshes"], 1)
+
+        asyncio.run(scenario())
+
+    def test_stale_is_served_while_refresh_runs(self):
+        async def scenario():
+            self.gate = asyncio.Event()
+            self.seed("tv")
+            self.clock.advance(main.CACHE_TTL + 1)
+            first = await main._asearch_compare_core("tv")
+            await self.until_live(1)
+            second = await main._asearch_compare_core("tv")
+            self.assertEqual([first[0]["title"], second[0]["title"]], ["cached", "cached"])
+            self.assertEqual(self.calls, ["tv"])
+            self.assertTrue(main.AINFLIGHT.in_flight(("search", "tv")))
+
+            self.gate.set()
+            await self.settle()
+            self.assertEqual((await main._asearch_compare_core("tv"))[0]["title"], "tv #1")
+            self.assertEqual(main.REFRESH_STATS["refresh_skipped"], 1)
+
+        asyncio.run(scenario())
+
+    def test_refresh_is_rate_limited_per_key(self):
+        async def scenario():
+            self.down = True
+            self.seed("tv")
+            self.clock.advance(main.CACHE_TTL + 1)
+            await main._asearch_compare_core("tv")
+            await self.settle()
+            self.assertEqual(main.REFRESH_STATS["refresh_errors"], 1)
+
+            self.clock.advance(main.CACHE_REFRESH_INTERVAL - 1)
+            self.assertEqual((await main._asearch_compare_core("tv"))[0]["title"], "cached")
+            await self.settle()
+            self.assertEqual(len(self.calls), 1)
+            self.assertEqual(main.REFRESH_STATS["refresh_skipped"], 1)
+
+            self.clock.advance(2)
+            self.down = False
+            await main._asearch_compare_core("tv")
+            await self.settle()
+            self.assertEqual(len(self.calls), 2)
+            self.assertEqual((await main._asearch_compare_core("tv"))[0]["title"], "tv #2")
+
+        asyncio.run(scenario())
+
+    def test_no_refresh_while_a_live_fetch_is_in_flight(self):
+        async def scenario():
+            self.gate = asyncio.Event()
+            fetch = asyncio.ensure_future(main._asearch_compare_core("radio"))
+            await asyncio.sleep(0)
+            self.assertFalse(main._claim_refresh("radio"))
+            self.assertNotIn("radio", main._REFRESH_MARKS)
+            self.gate.set()
+            await fetch
+            self.assertTrue(main._claim_refresh("radio"))
+
+        asyncio.run(scenario())
+
+
+class TestSearchCacheTTL(SearchCompareTestCase):
+    def test_complete_results_are_kept_for_the_cache_ttl(self):
+        async def scenario():
+            first = await main.search_compare_get("tv")
+            self.clock.advance(main.CACHE_TTL - 1)
+            return first, await main.search_compare_get("tv")
+
+        first, second = asyncio.run(scenario())
+        self.assertEqual(first, second)
+        self.assertEqual(self.calls, ["tv"])
+
+    def test_partial_results_expire_with_the_provider_error_ttl(self):
+        self.timeouts = {"Flipkart"}
+
+        async def scenario():
+            first = await main.search_compare_get("tv")
+            self.clock.advance(main.PROVIDER_ERROR_TTL - 1)
+            cached = await main.search_compare_get("tv")
+            self.timeouts = set()
+            self.clock.advance(2)
+            return first, cached, await main.search_compare_get("tv")
+
+        first, cached, recovered = asyncio.run(scenario())
+        self.assertEqual([r.get("error") for r in first["results"]], [None, "Timeout"])
+        self.assertEqual(cached, first)
+        self.assertEqual([r.get("error") for r in recovered["results"]], [None, None])
+        self.assertEqual(self.calls, ["tv", "tv"])
+
+    def test_rate_limited_results_expire_with_their_retry_after(self):
+        self.limited = {"Flipkart"}
+
+        async def scenario():
+            first = await main.search_compare_get("tv")
+            self.limited = set()
+            self.clock.advance(3)
+            return first, await main.search_compare_get("tv")
+
+        first, recovered = asyncio.run(scenario())
+        self.assertEqual([r.get("error") for r in first["results"]], [None, "Rate limited"])
+        self.assertEqual([r.get("error") for r in recovered["results"]], [None, None])
+        self.assertEqual(self.calls, ["tv", "tv"])
+
+
+class TestSearchStream(SearchCompareTestCase):
+    @staticmethod
+    async def collect(q, fmt="ndjson"):
+        return [line async for line in main._search_compare_events(q, fmt)]
+
+    def test_ndjson_lines_end_with_a_done_summary(self):
+        lines = asyncio.run(self.collect("tv"))
+        self.assertTrue(all(line.endswith("\n") and line.count("\n") == 1 for line in lines))
+        events = [json.loads(line) for line in lines]
+        self.assertEqual([e["event"] for e in events], ["result", "result", "done"])
+        self.assertEqual([e["data"]["source"] for e in events[:2]], ["Amazon", "Flipkart"])
+        done = events[-1]["data"]
+        self.assertEqual((done["query"], done["count"], done["cached"]), ("tv", 2, False))
+        self.assertIsInstance(done["elapsed_ms"], float)
+        self.assertEqual(len(main.SEARCH_CACHE.get("tv")), 2)
+        self.assertEqual(len(self.recorder.records), 2)
+
+    def test_sse_framing(self):
+        lines = asyncio.run(self.collect("tv", "sse"))
+        self.assertEqual(lines[0].split("\n")[0], "event: result")
+        self.assertTrue(all(line.endswith("\n\n") for line in lines))
+        self.assertEqual(json.loads(lines[-1].split("data: ", 1)[1])["count"], 2)
+
+    def test_cache_hit_is_replayed_without_live_calls(self):
+        self.seed("tv")
+        events = [json.loads(line) for line in asyncio.run(self.collect("tv"))]
+        self.assertEqual([e["event"] for e in events], ["result", "done"])
+        self.assertEqual(events[0]["data"]["title"], "cached")
+        self.assertEqual((events[1]["data"]["count"], events[1]["data"]["cached"]), (1, True))
+        self.assertEqual(self.calls, [])
+
+    def test_concurrent_searches_follow_one_stream_fetch(self):
+        async def scenario():
+            self.gate = asyncio.Event()
+            first = main._search_compare_events("tv", "ndjson")
+            head = await first.__anext__()
+            rest = asyncio.ensure_future(self.collect("tv"))
+            plain = asyncio.ensure_future(main._asearch_compare_core("tv"))
+            await asyncio.sleep(0.01)
+            self.gate.set()
+            return [head] + [line async for line in first], await rest, await plain
+
+        first, second, plain = asyncio.run(scenario())
+        self.assertEqual(first, second[:-1] + [first[-1]])
+        self.assertEqual(json.loads(second[-1])["data"]["count"], 2)
+        self.assertEqual([r["source"] for r in plain], ["Amazon", "Flipkart"])
+        self.assertEqual(self.calls, ["tv"])
+
+    def test_results_are_stored_when_the_client_disconnects(self):
+        async def scenario():
+            self.gate = asyncio.Event()
+            stream = main._search_compare_events("tv", "ndjson")
+            await stream.__anext__()
+            await stream.aclose()
+            self.assertTrue(main.AINFLIGHT.in_flight(("search", "tv")))
+            self.gate.set()
+            while main.AINFLIGHT.in_flight(("search", "tv")):
+                await asyncio.sleep(0.001)
+
+        asyncio.run(scenario())
+        self.assertEqual([r["source"] for r in main.SEARCH_CACHE.get("tv")], ["Amazon", "Flipkart"])
+        self.assertEqual(main._STREAMS, {})
+
+
+class TestRateLimited(unittest.TestCase):
+    def setUp(self):
+        self._old = (main.http_get, main.scrape_logic, main.INFLIGHT)
+
+    def tearDown(self):
+        main.http_get, main.scrape_logic, main.INFLIGHT = self._old
+
+    @staticmethod
+    def refuse(*args, **kwargs):
+        raise RateLimited("rate limited: amazon.in", 2.2)
+
+    def assert_429(self, fn, *args, **kwargs):
+        with self.assertRaises(main.HTTPException) as ctx:
+            fn(*args, **kwargs)
+        self.assertEqual((ctx.exception.status_code, ctx.exception.headers), (429, {"Retry-After": "3"}))
+
+    def test_generic_scrape_lets_rate_limits_through(self):
+        main.http_get = self.refuse
+        with self.assertRaises(RateLimited):
+            main._generic_scrape("https://shop.example.com/p/1")
+
+    def test_scrape_routes_answer_429(self):
+        main.scrape_logic = self.refuse
+        main.INFLIGHT = main.SingleFlight()
+        self.assert_429(main.scrape_product, "https://www.amazon.in/dp/B0TEST")
+        self.assert_429(main.compare_advanced_get, "https://www.amazon.in/dp/B0TEST")
+
+    def test_feed_import_answers_429(self):
+        main.http_get = self.refuse
+        payload = main.ImportFeedRequest(source="shop", url="https://shop.example.com/feed.json")
+        self.assert_429(main.import_feed_from_url, payload)
+
+
+class TestScrapeUrls(unittest.TestCase):
+    def setUp(self):
+        self._old = (main.resolve_short_link, main.scrape_logic, main.INFLIGHT, main.price_recorder)
+        self.resolved, self.fetched = [], []
+        self.recorder = _Recorder()
+        main.INFLIGHT = main.SingleFlight()
+        main.price_recorder = self.recorder
+
+        def resolve(url):
+            self.resolved.append(url)
+            return "http://shop.example.com:8080/item/1?id=5&utm_source=x"
+
+        def scrape(url, use_mock=False):
+            self.fetched.append(url)
+            return {"title": "TV", "price": "9999"}
+
+        main.resolve_short_link, main.scrape_logic = resolve, scrape
+
+    def tearDown(self):
+        main.resolve_short_link, main.scrape_logic, main.INFLIGHT, main.price_recorder = self._old
+
+    def test_short_link_resolved_once_and_fetched_as_resolved(self):
+        main.scrape_product("https://amzn.to/3abcDEF")
+        self.assertEqual(self.resolved, ["https://amzn.to/3abcDEF"])
+        self.assertEqual(self.fetched, ["http://shop.example.com:8080/item/1?id=5&utm_source=x"])
+        self.assertEqual(self.recorder.records, [("http://shop.example.com:8080/item/1?id=5", "TV", "9999")])
+
+
+class TestFeedImport(unittest.TestCase):
+    def setUp(self):
+        self._old = main.bulk_upsert_products
+
+    def tearDown(self):
+        main.bulk_upsert_products = self._old
+
+    def test_upload_is_imported_off_the_event_loop(self):
+        threads = []
+
+        def upsert(source, products):
+            threads.append(threading.get_ident())
+            return [len(list(products))]
+
+        main.bulk_upsert_products = upsert
+        feed = main.UploadFile(file=io.BytesIO(b'[{"id": 1, "title": "TV", "price": "9,999"}]'), filename="feed.json")
+
+        async def scenario():
+            return threading.get_ident(), await main.import_feed(source="shop", fmt=None, file=feed, dry_run=False)
+
+        loop_thread, result = asyncio.run(scenario())
+        self.assertEqual((result["total"], result["imported"]), (1, 1))
+        self.assertNotIn(loop_thread, threads)
+
+
+class TestProviderBudgets(unittest.TestCase):
+    def setUp(self):
+        self._old = (main.ASYNC_SEARCHES, sp.PROVIDER_CACHE, sp.LATENCY, sp.SCHEDULER)
+        sp.PROVIDER_CACHE = TTLCache(ttl=3600)
+        sp.LATENCY = LatencyTracker()
+        sp.SCHEDULER = ScrapeScheduler(max_workers=4)
+        main.ASYNC_SEARCHES = [
+            ("Fast", self._provider("Fast", 0.01)),
+            ("Slow", self._provider("Slow", 0.4)),
+            ("Quick", self._provider("Quick", 0.02)),
+        ]
+
+    def tearDown(self):
+        sp.SCHEDULER.shutdown()
+        main.ASYNC_SEARCHES, sp.PROVIDER_CACHE, sp.LATENCY, sp.SCHEDULER = self._old
+        for source in ("Fast", "Slow", "Quick"):
+            sp.BREAKERS.pop(source, None)
+
+    @staticmethod
+    def _provider(source, delay):
+        @sp.cached_provider(source)
+        async def search(query):
+            await asyncio.sleep(delay)
+            return sp._result(source, title=f"{source} {query}", price="100")
+        return search
+
+    def test_slow_provider_times_out_at_its_budget(self):
+        async def scenario():
+            started = time.monotonic()
+            seen = []
+            async for item in main.aiter_all_search("tv", budget=0.15):
+                seen.append((item["source"], item.get("error"), time.monotonic() - started))
+            return seen
+
+        seen = asyncio.run(scenario())
+        self.assertEqual([s[:2] for s in seen], [("Fast", None), ("Quick", None), ("Slow", "Timeout")])
+        self.assertGreaterEqual(seen[-1][2], 0.15)
+        self.assertLess(seen[-1][2], 0.35)
+
+    def test_straggler_still_fills_the_provider_cache(self):
+        async def scenario():
+            results = await main.arun_all_search("tv", budget=0.15)
+            self.assertEqual([r["source"] for r in results], ["Fast", "Slow", "Quick"])
+            self.assertEqual(results[1]["error"], "Timeout")
+            self.assertEqual(len(main._STRAGGLERS), 1)
+            self.assertIsNone(sp.PROVIDER_CACHE.get(sp._provider_cache_key("Slow", "tv")))
+            await asyncio.gather(*main._STRAGGLERS)
+            return await main.arun_all_search("tv", budget=0.15)
+
+        again = asyncio.run(scenario())
+        self.assertEqual(sp.PROVIDER_CACHE.get(sp._provider_cache_key("Slow", "tv"))["title"], "Slow tv")
+        self.assertEqual([r.get("error") for r in again], [None, None, None])
+
+    def test_budget_starts_when_the_fetch_gets_a_slot(self):
+        sp.SCHEDULER = ScrapeScheduler(max_workers=1)
+        sp.PROVIDER_CACHE.set(sp._provider_cache_key("Fast", "tv"), sp._result("Fast", title="cached", price="90"))
+
+        async def scenario():
+            held, release = asyncio.Event(), asyncio.Event()
+
+            async def hold():
+                async with sp.SCHEDULER.slot():
+                    held.set()
+                    await release.wait()
+
+            holder = asyncio.ensure_future(hold())
+            await held.wait()
+            seen = []
+
+            async def consume():
+                async for item in main.aiter_all_search("tv", budget=0.15):
+                    seen.append((item["source"], item.get("error")))
+
+            search = asyncio.ensure_future(consume())
+            await asyncio.sleep(0.3)
+            # The cache hit did not queue; the others queued past their budget without timing out.
+            self.assertEqual(seen, [("Fast", None)])
+            release.set()
+            await asyncio.gather(search, holder, *main._STRAGGLERS)
+            return seen
+
+        seen = asyncio.run(scenario())
+        self.assertEqual(seen, [("Fast", None), ("Slow", "Timeout"), ("Quick", None)])
+
+
+if __name__ == "__main__":
+    unittest.main()
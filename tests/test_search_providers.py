@@ -0,0 +1,235 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from backend import search_providers as sp
+from backend.breaker import CircuitBreaker
+from backend.cache import TTLCache
+from backend.latency import LatencyTracker
+from backend.scheduler import RateLimited
+
+
+class TestProviderCache(unittest.TestCase):
+    def setUp(self):
+        self._old_cache = sp.PROVIDER_CACHE
+        sp.PROVIDER_CACHE = TTLCache(ttl=3600)
+        self._old_breaker = sp.BREAKERS["Amazon"]
+        sp.BREAKERS["Amazon"] = CircuitBreaker("Amazon", min_calls=2, cooldown=60)
+        self.calls = []
+
+    def tearDown(self):
+        sp.PROVIDER_CACHE = self._old_cache
+        sp.BREAKERS["Amazon"] = self._old_breaker
+
+    def _provider(self, outcomes):
+        @sp.cached_provider("Amazon")
+        async def search(query):
+            self.calls.append(query)
+            outcome = outcomes[min(len(self.calls), len(outcomes)) - 1]
+            if isinstance(outcome, Exception):
+                raise outcome
+            return dict(outcome)
+        return lambda query: asyncio.run(search(query))
+
+    def test_fresh_result_is_reused_per_normalized_query(self):
+        search = self._provider([sp._result("Amazon", title="Phone", price="100")])
+        search("iPhone 15")
+        self.assertEqual(search(" iphone   15 ")["title"], "Phone")
+        self.assertEqual(self.calls, ["iPhone 15"])
+        entry = sp.PROVIDER_CACHE.get_entry(sp._provider_cache_key("Amazon", "iphone 15"))
+        self.assertAlmostEqual(entry.expires_at - entry.stored_at, sp.PROVIDER_TTLS["Amazon"], delta=1)
+
+    def test_errors_use_short_ttl(self):
+        search = self._provider([sp._result("Amazon", error="Blocked or no results")])
+        search("tv")
+        entry = sp.PROVIDER_CACHE.get_entry(sp._provider_cache_key("Amazon", "tv"))
+        self.assertAlmostEqual(entry.expires_at - entry.stored_at, sp.PROVIDER_ERROR_TTL, delta=1)
+
+    def test_open_breaker_serves_last_good_result(self):
+        search = self._provider([sp._result("Amazon", title="Phone", price="100"), sp._result("Amazon", error="Blocked")])
+        key = sp._provider_cache_key("Amazon", "tv")
+        search("tv")
+        sp.PROVIDER_CACHE.delete(key)
+        self.assertEqual(search("tv")["error"], "Blocked")
+        self.assertEqual(sp.BREAKERS["Amazon"].state, "open")
+
+        sp.PROVIDER_CACHE.delete(key)
+        degraded = search("tv")
+        self.assertEqual((degraded["title"], degraded["degraded"]), ("Phone", True))
+        self.assertEqual(search("radio")["error"], "Circuit open")
+        self.assertEqual(len(self.calls), 2)
+
+    def test_own_rate_limit_is_not_cached_or_a_breaker_failure(self):
+        search = self._provider([sp._result("Amazon", title="Phone", price="100"), RateLimited("rate limited: amazon.in", 2.2)])
+        key = sp._provider_cache_key("Amazon", "tv")
+        search("tv")
+        sp.PROVIDER_CACHE.delete(key)
+        degraded = search("tv")
+        self.assertEqual((degraded["title"], degraded["degraded"], degraded["retry_after"]), ("Phone", True, 2.2))
+        limited = search("radio")
+        self.assertEqual((limited["error"], limited["retry_after"]), ("Rate limited", 2.2))
+        self.assertIsNone(sp.PROVIDER_CACHE.get(key))
+        self.assertIsNone(sp.PROVIDER_CACHE.get(sp._provider_cache_key("Amazon", "radio")))
+        self.assertEqual(sp.BREAKERS["Amazon"].snapshot()["calls"], 1)
+        self.assertEqual(len(self.calls), 3)
+
+
+AMAZON_HTML = """
+<div data-component-type="s-search-result">
+  <h2><a class="a-link-normal" href="/dp/B0CHX1W1XY"><span>Apple iPhone 15 (128 GB)</span></a></h2>
+  <span class="a-price"><span class="a-offscreen">&#8377;69,900</span></span>
+  <img class="s-image" src="https://m.media-amazon.com/i.jpg">
+  <span class="a-icon-alt">4.5 out of 5 stars</span>
+</div>
+"""
+
+
+class TestProviderFetchParse(unittest.TestCase):
+    def setUp(self):
+        self._old = (sp._aget_html, sp._headless_html)
+        self.fetched = []
+
+        async def fake_aget_html(url, referer="", timeout=10):
+            self.fetched.append(url)
+            return AMAZON_HTML if "amazon" in url else "<html></html>"
+
+        sp._aget_html = fake_aget_html
+        sp._headless_html = lambda url, wait_for="", timeout_ms=15000: None
+
+    def tearDown(self):
+        sp._aget_html, sp._headless_html = self._old
+
+    def test_parse_amazon(self):
+        result = sp.parse_amazon(AMAZON_HTML)
+        self.assertEqual(result["title"], "Apple iPhone 15 (128 GB)")
+        self.assertEqual(result["price"], "69900")
+        self.assertEqual(result["url"], "https://www.amazon.in/dp/B0CHX1W1XY")
+        self.assertEqual(result["rating"], "4.5")
+        self.assertIsNone(sp.parse_amazon("<html></html>"))
+
+    def test_async_search_fetches_and_parses(self):
+        result = asyncio.run(sp._asearch(sp.AMAZON, "iphone 15"))
+        self.assertEqual(result["price"], "69900")
+        self.assertEqual(self.fetched, ["https://www.amazon.in/s?k=iphone%2015&ref=nb_sb_noss"])
+
+    def test_async_search_reports_provider_error(self):
+        result = asyncio.run(sp._asearch(sp.MYNTRA, "red shirt"))
+        self.assertEqual(result["error"], "JS-rendered, no results")
+        self.assertEqual(self.fetched, ["https://www.myntra.com/red-shirt?rawQuery=red%20shirt"])
+
+    def test_parsing_runs_on_the_provider_work_pool(self):
+        threads = []
+
+        def parse(html):
+            threads.append(threading.current_thread().name)
+            return sp.parse_amazon(html)
+
+        result = asyncio.run(sp._asearch(sp.AMAZON._replace(parse=parse), "iphone 15"))
+        self.assertEqual(result["price"], "69900")
+        self.assertTrue(threads[0].startswith("provider-work"), threads)
+
+    def test_async_search_lets_rate_limits_through(self):
+        async def refuse(url, referer="", timeout=10):
+            raise RateLimited("rate limited: amazon.in", 2.2)
+
+        sp._aget_html = refuse
+        with self.assertRaises(RateLimited):
+            asyncio.run(sp._asearch(sp.AMAZON, "iphone 15"))
+
+
+class _Response:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+
+
+PAGE = "<html>" + "x" * 600 + "</html>"
+
+
+class TestHedgedFetch(unittest.TestCase):
+    """curl impersonation is the primary transport; requests is the hedge."""
+
+    def setUp(self):
+        self._old = (sp.aimpersonated_get, sp.ahttp_get, sp.LATENCY, sp.HEDGE, sp.curl_requests, dict(sp.HEDGE_STATS))
+        sp.LATENCY = LatencyTracker()
+        sp.HEDGE = True
+        sp.curl_requests = sp.curl_requests or object()
+        self.delays = {"impersonate": 0.0, "requests": 0.0}
+        self.bodies = {"impersonate": PAGE.replace("x", "i"), "requests": PAGE.replace("x", "r")}
+        self.started = []
+        self.cancelled = []
+
+        def fake(transport):
+            async def aget(url, **kwargs):
+                self.started.append(transport)
+                try:
+                    await asyncio.sleep(self.delays[transport])
+                except asyncio.CancelledError:
+                    self.cancelled.append(transport)
+                    raise
+                return _Response(self.bodies[transport])
+            return aget
+
+        sp.aimpersonated_get = fake("impersonate")
+        sp.ahttp_get = fake("requests")
+
+    def tearDown(self):
+        sp.shutdown_fetch_loop()
+        sp.aimpersonated_get, sp.ahttp_get, sp.LATENCY, sp.HEDGE, sp.curl_requests, stats = self._old
+        sp.HEDGE_STATS.update(stats)
+
+    def _learn(self, ms, n=30):
+        for _ in range(n):
+            sp.LATENCY.observe("fetch:amazon.in:impersonate", ms)
+
+    def test_hedge_delay_is_learned_and_clamped(self):
+        self.assertEqual(sp.hedge_delay("amazon.in"), sp.HEDGE_DELAY_MS / 1000)
+        self._learn(900)
+        self.assertAlmostEqual(sp.hedge_delay("amazon.in"), 0.9, delta=0.2)
+        self._learn(1, n=2000)
+        self.assertEqual(sp.hedge_delay("amazon.in"), sp.HEDGE_MIN_DELAY_MS / 1000)
+
+    def test_fast_primary_is_not_hedged(self):
+        self._learn(300)
+        self.assertEqual(sp._get_html("https://www.amazon.in/s?k=tv"), self.bodies["impersonate"])
+        self.assertEqual(self.started, ["impersonate"])
+
+    def test_slow_primary_is_hedged(self):
+        self._learn(200)
+        self.delays["impersonate"] = 1.0
+        started = time.monotonic()
+        self.assertEqual(sp._get_html("https://www.amazon.in/s?k=tv"), self.bodies["requests"])
+        self.assertLess(time.monotonic() - started, 0.8)
+        self.assertEqual(self.started, ["impersonate", "requests"])
+        self.assertEqual(sp.LATENCY.snapshot()["fetch:amazon.in:requests"]["samples"], 1)
+        deadline = time.monotonic() + 1
+        while not self.cancelled and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.assertEqual(self.cancelled, ["impersonate"])
+
+    def test_failed_primary_falls_back_at_once(self):
+        self.bodies["impersonate"] = "blocked"
+        self.assertEqual(sp._get_html("https://www.amazon.in/s?k=tv"), self.bodies["requests"])
+        self.assertEqual(self.started, ["impersonate", "requests"])
+
+    def test_async_hedge_cancels_the_loser(self):
+        self._learn(200)
+        self.delays["impersonate"] = 1.0
+        html = asyncio.run(sp._aget_html("https://www.amazon.in/s?k=tv"))
+        self.assertEqual(html, self.bodies["requests"])
+        self.assertEqual(self.cancelled, ["impersonate"])
+
+    def test_rate_limited_primary_is_not_retried_on_the_fallback(self):
+        async def refuse(url, **kwargs):
+            self.started.append("impersonate")
+            raise RateLimited("rate limited: amazon.in")
+
+        sp.aimpersonated_get = refuse
+        with self.assertRaises(RateLimited):
+            sp._get_html("https://www.amazon.in/s?k=tv")
+        self.assertEqual(self.started, ["impersonate"])
+
+
+if __name__ == "__main__":
+    unittest.main()
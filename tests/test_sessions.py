@@ -0,0 +1,63 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend import sessions
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"<html>" + b"x" * 600 + b"</html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSessions(unittest.TestCase):
+    def setUp(self):
+        sessions.close_sessions()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+
+    def tearDown(self):
+        sessions.close_sessions()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_requests_connections_are_reused(self):
+        for _ in range(3):
+            self.assertEqual(sessions.http_get(self.url).status_code, 200)
+        stats = sessions.session_stats()["requests"]
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["new_connections"], 1)
+        self.assertEqual(stats["reused"], 2)
+
+    def test_shared_session(self):
+        self.assertIs(sessions.requests_session(), sessions.requests_session())
+
+    @unittest.skipIf(sessions.curl_requests is None, "curl_cffi not installed")
+    def test_curl_session_per_thread(self):
+        for _ in range(3):
+            self.assertEqual(sessions.impersonated_get(self.url).status_code, 200)
+        stats = sessions.session_stats()["curl"]
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["sessions"], 1)
+        self.assertEqual(stats["new_connections"], 1)
+
+        other = []
+        t = threading.Thread(target=lambda: other.append(sessions.curl_session()))
+        t.start()
+        t.join()
+        self.assertIsNot(other[0], sessions.curl_session())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from backend.singleflight import AsyncSingleFlight, SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def work():
+            calls.append(1)
+            release.wait(2)
+            return {"n": len(calls)}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do("k", work))) for _ in range(5)]
+        for t in threads:
+            t.start()
+        while flight.stats()["waiting"] < 4:
+            time.sleep(0.01)
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertEqual(flight.stats(), {"executed": 1, "shared": 4, "in_flight": 0, "waiting": 0})
+
+    def test_errors_propagate_and_key_is_released(self):
+        flight = SingleFlight()
+
+        def boom():
+            raise ValueError("blocked")
+
+        with self.assertRaises(ValueError):
+            flight.do("k", boom)
+        self.assertFalse(flight.in_flight("k"))
+        self.assertEqual(flight.do("k", lambda: 7), 7)
+
+
+class TestAsyncSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"n": len(calls)}
+
+        async def main():
+            return await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+
+        results = asyncio.run(main())
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertEqual(flight.stats(), {"executed": 1, "shared": 4, "in_flight": 0, "waiting": 0})
+
+    def test_cancelled_caller_does_not_cancel_others(self):
+        flight = AsyncSingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return 7
+
+        async def main():
+            first = asyncio.create_task(flight.do("k", work))
+            second = asyncio.create_task(flight.do("k", work))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            return await second
+
+        self.assertEqual(asyncio.run(main()), 7)
+
+    def test_start_registers_the_task_before_anyone_awaits(self):
+        flight = AsyncSingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            return 3
+
+        async def main():
+            task = flight.start("k", work)
+            self.assertTrue(flight.in_flight("k"))
+            self.assertIs(flight.start("k", work), task)
+            return await flight.do("k", work), task.result()
+
+        self.assertEqual(asyncio.run(main()), (3, 3))
+        self.assertEqual(flight.stats()["executed"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()